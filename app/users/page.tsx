@@ -26,7 +26,7 @@ export default function UsersPage() {
           router.replace("/")
           return
         }
-        // Prefer admin full users list (includes password_hash)
+        // Prefer the admin users list; both endpoints are paged, apiFetchAll follows the cursor
         try {
           const full = await AdminApi.usersFull()
           setUsers(full)
@@ -1,38 +1,107 @@
+import string
 from typing import Optional
-from fastapi import APIRouter, Depends, status, HTTPException, Body
+from fastapi import APIRouter, Depends, status, HTTPException, Body, Query, Response
 from sqlalchemy.orm import Session
 from ..core.database import get_db
-from ..core.auth import oauth2_scheme, decode_token, get_password_hash
+from ..core.auth import get_password_hash
+from ..core.auth_context import require_admin, invalidate_user_role, auth_cache_stats
 from ..models.order import Order
 from ..models.order_item import OrderItem
 from ..models.product import Product
 from ..models.user import User
 from ..models.promo_code import PromoCode
-from ..schemas.product import ProductOut
+from ..schemas.product import ProductOut, ProductBulkSelect, ProductBulkUpdate
+from .products import apply_product_filters
+from ..core.leaderboard import leaderboard, TOP_K
+from ..core.analytics import cohort_report, ensure_fresh, refresh_customer_stats
+from ..models.customer_stats import CustomerStats
 
 
 router = APIRouter()
 
 
-from ..core.logger import audit
-
-def require_admin(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> int:
-    payload = decode_token(token)
-    sub = payload.get("sub")
-    if not sub:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user_id = int(sub)
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user or not bool(user.is_admin):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
-    return user_id
-
+from ..core.logger import audit, user_target
+from sqlalchemy import func as sa_func
 
 @router.get("/products", response_model=list[ProductOut])
 def admin_products(_user_id: int = Depends(require_admin), db: Session = Depends(get_db)):
     return db.query(Product).order_by(Product.created_at.desc()).all()
 
 
+def _effective_filters(payload: ProductBulkSelect) -> dict:
+    """Filter criteria that would actually narrow the query (apply_product_filters skips empty strings/lists)."""
+    filters = {}
+    for key, value in (payload.filter.model_dump(exclude_none=True) if payload.filter else {}).items():
+        if isinstance(value, list):
+            value = [v for v in value if v]
+        if value or isinstance(value, (int, float)):
+            filters[key] = value
+    return filters
+
+
+def _bulk_product_query(db: Session, payload: ProductBulkSelect):
+    """Resolve a bulk selector (explicit ids and/or a list_products-style filter) to one query."""
+    filters = _effective_filters(payload)
+    if not payload.ids and not filters:
+        raise HTTPException(status_code=400, detail="Provide ids or a non-empty filter")
+    query = db.query(Product)
+    if payload.ids:
+        query = query.filter(Product.id.in_(payload.ids))
+    status_filter = filters.pop("status", None)
+    if status_filter:
+        query = query.filter(Product.status == status_filter)
+    return apply_product_filters(query, **filters)
+
+
+def _bulk_selector_fields(payload: ProductBulkSelect) -> dict:
+    fields = {}
+    if payload.ids:
+        fields["ids"] = len(payload.ids)
+    if payload.filter:
+        fields["filter"] = payload.filter.model_dump_json(exclude_none=True)
+    return fields
+
+
+def _bulk_set_status(db: Session, payload: ProductBulkSelect, status_value: str, event: str, actor_id: int) -> dict:
+    updated = _bulk_product_query(db, payload).update({Product.status: status_value}, synchronize_session=False)
+    db.commit()
+    audit(event, actor_id=actor_id, count=updated, **_bulk_selector_fields(payload))
+    return {"status": "ok", "updated": updated}
+
+
+@router.post("/products/bulk/disable")
+def admin_bulk_disable_products(payload: ProductBulkSelect, _user_id: int = Depends(require_admin), db: Session = Depends(get_db)):
+    return _bulk_set_status(db, payload, "disabled", "product.bulk_disable", _user_id)
+
+
+@router.post("/products/bulk/enable")
+def admin_bulk_enable_products(payload: ProductBulkSelect, _user_id: int = Depends(require_admin), db: Session = Depends(get_db)):
+    return _bulk_set_status(db, payload, "active", "product.bulk_enable", _user_id)
+
+
+@router.post("/products/bulk/delete")
+def admin_bulk_delete_products(payload: ProductBulkSelect, _user_id: int = Depends(require_admin), db: Session = Depends(get_db)):
+    deleted = _bulk_product_query(db, payload).delete(synchronize_session=False)
+    db.commit()
+    audit("product.bulk_delete", actor_id=_user_id, count=deleted, **_bulk_selector_fields(payload))
+    return {"status": "ok", "deleted": deleted}
+
+
+@router.patch("/products/bulk")
+def admin_bulk_update_products(payload: ProductBulkUpdate, _user_id: int = Depends(require_admin), db: Session = Depends(get_db)):
+    changes = payload.model_dump(include={"price", "category", "tags"}, exclude_unset=True)
+    # products.price is NOT NULL; an explicit null only clears the nullable category/tags
+    if changes.get("price", 0) is None:
+        del changes["price"]
+    if not changes:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    values = {getattr(Product, k): v for k, v in changes.items()}
+    updated = _bulk_product_query(db, payload).update(values, synchronize_session=False)
+    db.commit()
+    audit("product.bulk_update", actor_id=_user_id, count=updated, fields=",".join(sorted(changes)), **_bulk_selector_fields(payload))
+    return {"status": "ok", "updated": updated}
+
+
 @router.post("/products/{product_id}/disable")
 def admin_disable_product(product_id: int, _user_id: int = Depends(require_admin), db: Session = Depends(get_db)):
     product = db.query(Product).filter(Product.id == product_id).first()
@@ -86,13 +155,18 @@ def get_stats(_user_id: int = Depends(require_admin), db: Session = Depends(get_
 
 @router.get("/recent-orders")
 def recent_orders(_user_id: int = Depends(require_admin), db: Session = Depends(get_db)):
-    orders = db.query(Order).order_by(Order.created_at.desc()).limit(8).all()
+    rows = (
+        db.query(Order, User.email)
+        .outerjoin(User, User.id == Order.user_id)
+        .order_by(Order.created_at.desc())
+        .limit(8)
+        .all()
+    )
     results = []
-    for o in orders:
-        user: Optional[User] = db.query(User).filter(User.id == o.user_id).first() if o.user_id else None
+    for o, email in rows:
         results.append({
             "id": o.id,
-            "customer": user.email if user else "Guest",
+            "customer": email or "Guest",
             "total": float(o.total or 0),
             "status": o.status,
             "created_at": o.created_at.isoformat() if o.created_at else None,
@@ -101,22 +175,110 @@ def recent_orders(_user_id: int = Depends(require_admin), db: Session = Depends(
 
 
 @router.get("/top-products")
-def top_products(_user_id: int = Depends(require_admin), db: Session = Depends(get_db)):
-    products = db.query(Product).order_by(Product.sales.desc()).limit(6).all()
+def top_products(
+    window: str = Query("all", pattern="^(7d|30d|all)$"),
+    limit: int = Query(6, ge=1, le=TOP_K),
+    _user_id: int = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    # Revenue/units come from order_items (price at time of sale), not Product.sales
+    top = leaderboard.top(db, window=window, limit=limit)
+    ids = [pid for pid, _units, _revenue in top]
+    names = dict(db.query(Product.id, Product.name).filter(Product.id.in_(ids)).all()) if ids else {}
     return [
         {
-            "id": p.id,
-            "name": p.name,
-            "sales": int(p.sales or 0),
-            "revenue": float((p.sales or 0) * float(p.price or 0)),
+            "id": pid,
+            "name": names.get(pid),
+            "sales": units,
+            "revenue": round(revenue, 2),
         }
-        for p in products
+        for pid, units, revenue in top
     ]
 
 
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _prefix_range(column, prefix: str):
+    """Case-insensitive prefix match as a range on the column's COLLATE NOCASE index.
+
+    NOCASE folds ASCII letters only, so the bounds are built from the folded
+    prefix: column >= prefix AND column < next string after prefix.
+    """
+    column = column.collate("NOCASE")
+    prefix = prefix.translate(_ASCII_LOWER)
+    # U+10FFFF has no successor: bump the last character before any trailing ones instead
+    stem = prefix.rstrip(chr(0x10FFFF))
+    if not stem:
+        return column >= prefix
+    bumped = chr(ord(stem[-1]) + 1)
+    if "A" <= bumped <= "Z":
+        # '@' + 1 is 'A', which NOCASE compares as 'a'; folded values never contain A-Z
+        bumped = "["
+    return (column >= prefix) & (column < stem[:-1] + bumped)
+
+
+@router.get("/users")
+def admin_users(
+    q: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    with_count: bool = False,
+    _user_id: int = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """Keyset-paginated user directory with case-insensitive prefix search on email and name.
+
+    Pass the returned next_cursor as after_id to fetch the following page.
+    Only the listed columns are loaded (no password hashes or reset tokens).
+    """
+    query = db.query(User.id, User.name, User.email, User.is_admin, User.avatar, User.created_at)
+    count_query = db.query(sa_func.count(User.id))
+    q = (q or "").strip()
+    if q:
+        clause = _prefix_range(User.email, q) | _prefix_range(User.name, q)
+        query = query.filter(clause)
+        count_query = count_query.filter(clause)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    rows = query.order_by(User.id.asc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    result = {
+        "items": [
+            {
+                "id": r.id,
+                "name": r.name,
+                "email": r.email,
+                "is_admin": bool(r.is_admin),
+                "avatar": r.avatar,
+                "created_at": r.created_at.isoformat() if r.created_at else None,
+            }
+            for r in rows
+        ],
+        "next_cursor": rows[-1].id if has_more and rows else None,
+    }
+    if with_count:
+        result["total"] = int(count_query.scalar() or 0)
+    return result
+
+
 @router.get("/users-full")
-def users_full(_user_id: int = Depends(require_admin), db: Session = Depends(get_db)):
-    users = db.query(User).order_by(User.id.asc()).all()
+def users_full(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    _user_id: int = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """Keyset-paginated user list with profile fields; pass X-Next-Cursor back as after_id."""
+    query = db.query(User.id, User.name, User.email, User.age, User.is_admin, User.avatar, User.created_at)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    rows = query.order_by(User.id.asc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
     return [
         {
             "id": u.id,
@@ -125,10 +287,9 @@ def users_full(_user_id: int = Depends(require_admin), db: Session = Depends(get
             "age": u.age,
             "is_admin": bool(u.is_admin),
             "avatar": u.avatar,
-            "created_at": u.created_at.isoformat() if getattr(u, "created_at", None) else None,
-            "password_hash": getattr(u, "password_hash", None),
+            "created_at": u.created_at.isoformat() if u.created_at else None,
         }
-        for u in users
+        for u in rows
     ]
 
 
@@ -141,7 +302,8 @@ def promote_user(email: str, _user_id: int = Depends(require_admin), db: Session
         return {"status": "ok", "message": "Already admin"}
     user.is_admin = True
     db.commit()
-    audit("admin.promote", actor_id=_user_id, target=email)
+    invalidate_user_role(user.id)
+    audit("admin.promote", actor_id=_user_id, target=user_target(user.id))
     return {"status": "ok", "message": "Promoted"}
 
 
@@ -154,7 +316,8 @@ def demote_user(email: str, _user_id: int = Depends(require_admin), db: Session
         return {"status": "ok", "message": "Already standard"}
     user.is_admin = False
     db.commit()
-    audit("admin.demote", actor_id=_user_id, target=email)
+    invalidate_user_role(user.id)
+    audit("admin.demote", actor_id=_user_id, target=user_target(user.id))
     return {"status": "ok", "message": "Demoted"}
 
 
@@ -170,13 +333,30 @@ def reset_password(
         raise HTTPException(status_code=404, detail="User not found")
     user.password_hash = get_password_hash(new_password)
     db.commit()
-    audit("admin.reset_password", actor_id=_user_id, target=email)
+    audit("admin.reset_password", actor_id=_user_id, target=user_target(user.id))
     return {"status": "ok", "message": "Password reset"}
 
 
 # Promo codes
 from ..schemas.promo_code import PromoCodeCreate, PromoCodeOut
-from ..core.logger import get_recent_logs
+from ..core.logger import query_logs, get_log_queue_stats, LOG_BUFFER
+from ..core import audit_store
+from ..core.log_stream import LOG_BROKER, compile_log_filter
+from ..core.sql_stats import SQL_STATS
+from ..core.profiler import PROFILE_STORE
+from ..core.error_spikes import error_spikes_stats
+from ..core.compression import COMPRESSED_CACHE
+from ..core.singleflight import singleflight_stats
+from ..core.concurrency import concurrency_stats
+from ..core.password_hashing import password_hashing_stats
+from ..core.rate_limit import rate_limit_stats
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+import json
+import os
+
+# Max entries buffered per live-tail connection before dropping
+LOG_TAIL_QUEUE_SIZE = int(os.getenv("LOG_TAIL_QUEUE_SIZE", "1000"))
 
 
 @router.post("/promo-codes", response_model=PromoCodeOut)
@@ -285,78 +465,244 @@ def sales_timeseries(
     return result
 
 
+@router.get("/analytics/cohorts")
+def analytics_cohorts(_user_id: int = Depends(require_admin), db: Session = Depends(get_db)):
+    ensure_fresh(db)
+    return cohort_report(db)
+
+
+@router.get("/analytics/ltv")
+def analytics_ltv(
+    limit: int = Query(20, ge=1, le=500),
+    _user_id: int = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    ensure_fresh(db)
+    rows = (
+        db.query(CustomerStats, User.email, User.name)
+        .join(User, User.id == CustomerStats.user_id)
+        .order_by(CustomerStats.lifetime_value.desc(), CustomerStats.user_id.asc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "user_id": s.user_id,
+            "email": email,
+            "name": name,
+            "cohort": s.cohort,
+            "orders": int(s.orders_count or 0),
+            "lifetime_value": float(s.lifetime_value or 0),
+            "first_order_at": s.first_order_at.isoformat() if s.first_order_at else None,
+            "last_order_at": s.last_order_at.isoformat() if s.last_order_at else None,
+        }
+        for s, email, name in rows
+    ]
+
+
+@router.post("/analytics/refresh")
+def analytics_refresh(full: bool = False, _user_id: int = Depends(require_admin), db: Session = Depends(get_db)):
+    processed = refresh_customer_stats(db, full=full)
+    audit("admin.analytics.refresh", actor_id=_user_id, full=full, processed=processed)
+    return {"status": "ok", "processed": processed}
+
+
+def _target_filter(target: Optional[str] = None, db: Session = Depends(get_db)) -> Optional[str]:
+    """Audit target filter; an email is resolved to the account's user_target() id."""
+    if target and "@" in target:
+        user_id = db.query(User.id).filter(User.email == target).scalar()
+        if user_id is not None:
+            return user_target(user_id)
+    return target
+
+
 @router.get("/logs")
 def admin_logs(
+    response: Response,
     limit: int = 200,
     event: Optional[str] = None,
     actor_id: Optional[int] = None,
-    target: Optional[str] = None,
+    target: Optional[str] = Depends(_target_filter),
     extras: Optional[str] = None,
+    level: Optional[str] = None,
+    logger: Optional[str] = None,
+    request_id: Optional[str] = None,
+    before: Optional[str] = None,
+    source: str = Query("buffer", pattern="^(buffer|audit)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
     _user_id: int = Depends(require_admin),
 ):
-    """Return recent logs with optional server-side filtering.
-    Filters are applied against structured fields when present (event, actor_id, target).
+    """Return recent logs (newest first) with optional server-side filtering.
+    event, actor_id, target, level, logger and request_id are exact matches served
+    from the log ring's indexes (a target email matches its account's "user:<id>");
+    extras is a free-text match over the message and structured extras. With
+    source=audit the persistent audit store is queried instead (event/actor_id/target
+    plus a start/end time range).
+    When more entries match, X-Next-Cursor holds the value to pass as `before`
+    for the next page.
     """
     limit = max(1, min(1000, limit))
-    # fetch a reasonable window to filter from (newest first)
-    items = get_recent_logs(1000)
+    if source == "audit":
+        store = audit_store.AUDIT_STORE
+        if store is None:
+            raise HTTPException(status_code=404, detail="Audit store is not enabled")
+        try:
+            items, next_cursor = store.query(
+                limit=limit,
+                before=before,
+                event=event,
+                actor_id=actor_id,
+                target=target,
+                start=start,
+                end=end,
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    else:
+        if before is not None and not before.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        items, next_cursor = query_logs(
+            limit=limit,
+            before=None if before is None else int(before),
+            text=extras,
+            event=event,
+            actor_id=actor_id,
+            target=target,
+            level=level.upper() if level else None,
+            logger=logger,
+            request_id=request_id,
+        )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return items
+
 
-    def matches(item: dict) -> bool:
+@router.get("/logs/tail")
+async def admin_logs_tail(
+    request: Request,
+    event: Optional[str] = None,
+    actor_id: Optional[int] = None,
+    target: Optional[str] = Depends(_target_filter),
+    extras: Optional[str] = None,
+    level: Optional[str] = None,
+    logger: Optional[str] = None,
+    request_id: Optional[str] = None,
+    backfill: int = Query(0, ge=0, le=1000),
+    _user_id: int = Depends(require_admin),
+):
+    """Server-Sent Events stream of new log entries matching the filters.
+    Each connection gets its own compiled filter and bounded queue; if the
+    client falls behind, entries are dropped and reported in a `dropped` event.
+    `backfill` first replays that many recent matching entries from the buffer.
+    """
+    exact = {
+        "event": event,
+        "actor_id": actor_id,
+        "target": target,
+        "level": level.upper() if level else None,
+        "logger": logger,
+        "request_id": request_id,
+    }
+    predicate = compile_log_filter(extras, **exact)
+
+    async def stream():
+        reported_drops = 0
+        # subscribed inside the generator so the finally below runs whenever a subscription exists,
+        # even if the backfill query raises or the client is gone before the first chunk
+        sub = LOG_BROKER.subscribe(predicate, maxsize=LOG_TAIL_QUEUE_SIZE)
         try:
-            # event filter: exact match if structured, otherwise substring match on message
-            if event:
-                if item.get("event"):
-                    if item.get("event") != event:
-                        return False
-                else:
-                    if event.lower() not in (item.get("message", "").lower()):
-                        return False
-            if actor_id is not None:
-                if item.get("actor_id") is None:
-                    # fallback: try parsing actor_id from message
-                    if f"actor_id={actor_id}" not in item.get("message", ""):
-                        return False
-                else:
-                    if int(item.get("actor_id")) != int(actor_id):
-                        return False
-            if target:
-                t = (item.get("target") or "")
-                if target.lower() not in t.lower() and target.lower() not in item.get("message", "").lower():
-                    return False
-            if extras:
-                # check parsed extras dict for substring or exact key=value
-                e_lower = extras.lower()
-                parsed_extras = item.get("extras") or {}
-                # as JSON substring
-                if e_lower in (str(parsed_extras).lower()):
-                    pass
-                elif e_lower in item.get("message", "").lower():
-                    pass
-                else:
-                    # support key=value matching: require all pairs to match if multiple provided separated by space
-                    parts = extras.split()
-                    ok = True
-                    for p in parts:
-                        if "=" in p:
-                            k, v = p.split("=", 1)
-                            sval = str(parsed_extras.get(k)) if k in parsed_extras else None
-                            if sval is None or v.lower() not in sval.lower():
-                                ok = False
-                                break
-                        else:
-                            # simple substring on extras values
-                            found = any(p.lower() in str(v).lower() for v in parsed_extras.values())
-                            if not found:
-                                ok = False
-                                break
-                    if not ok:
-                        return False
-            return True
-        except Exception:
-            return False
-
-    filtered = [it for it in items if matches(it)]
-    return filtered[:limit]
+            recent = query_logs(limit=backfill, text=extras, **exact)[0] if backfill else []
+            yield ": connected\n\n"
+            for entry in reversed(recent):
+                yield f"id: {entry['id']}\nevent: log\ndata: {json.dumps(entry, default=str)}\n\n"
+            while not await request.is_disconnected():
+                entries = await sub.get(timeout=15.0)
+                if not entries:
+                    yield ": keepalive\n\n"
+                    continue
+                yield "".join(
+                    f"id: {e['id']}\nevent: log\ndata: {json.dumps(e, default=str)}\n\n" for e in entries
+                )
+                if sub.dropped != reported_drops:
+                    reported_drops = sub.dropped
+                    yield f"event: dropped\ndata: {json.dumps({'dropped': reported_drops})}\n\n"
+        finally:
+            LOG_BROKER.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/logs/stats")
+def admin_logs_stats(_user_id: int = Depends(require_admin)):
+    store = audit_store.AUDIT_STORE
+    return {
+        "buffer": {"size": len(LOG_BUFFER), "capacity": LOG_BUFFER.maxlen},
+        "queue": get_log_queue_stats(),
+        "audit_store": store.stats() if store is not None else {"enabled": False},
+        "tail_subscribers": len(LOG_BROKER),
+        "error_spikes": error_spikes_stats(),
+        "compression_cache": COMPRESSED_CACHE.stats(),
+        "singleflight": singleflight_stats(),
+        "concurrency": concurrency_stats(),
+        "auth_cache": auth_cache_stats(),
+        "password_hashing": password_hashing_stats(),
+        "rate_limit": rate_limit_stats(),
+    }
+
+
+@router.get("/sql-stats")
+def admin_sql_stats(
+    sort: str = Query("total", pattern="^(total|count|mean|p95|p99|max)$"),
+    limit: int = Query(50, ge=1, le=1000),
+    _user_id: int = Depends(require_admin),
+):
+    """Per-fingerprint SQL timings collected since startup (or the last reset)."""
+    return SQL_STATS.snapshot(sort=sort, limit=limit)
+
+
+@router.delete("/sql-stats")
+def admin_reset_sql_stats(_user_id: int = Depends(require_admin)):
+    removed = SQL_STATS.reset()
+    audit("admin.sql_stats.reset", actor_id=_user_id, removed=removed)
+    return {"status": "ok", "removed": removed}
+
+
+@router.get("/profiles")
+def admin_profiles(_user_id: int = Depends(require_admin)):
+    """Recently captured request profiles (send X-Profile: 1 as an admin to capture one)."""
+    return PROFILE_STORE.list()
+
+
+@router.get("/profiles/{request_id}")
+def admin_profile(
+    request_id: str,
+    format: str = Query("collapsed", pattern="^(collapsed|json)$"),
+    _user_id: int = Depends(require_admin),
+):
+    """Download one profile as collapsed stacks (flamegraph.pl / speedscope) or a JSON summary."""
+    profile = PROFILE_STORE.get(request_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "json":
+        return {**profile.summary(), "top": profile.top_functions()}
+    filename = f"profile-{request_id}.collapsed".replace('"', "")
+    return Response(
+        profile.collapsed(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.delete("/profiles")
+def admin_clear_profiles(_user_id: int = Depends(require_admin)):
+    removed = PROFILE_STORE.clear()
+    audit("admin.profiles.clear", actor_id=_user_id, removed=removed)
+    return {"status": "ok", "removed": removed}
 
 
 @router.delete("/logs")
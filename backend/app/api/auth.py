@@ -1,17 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from datetime import timedelta, datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from datetime import timedelta
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from ..core.database import get_db
 from ..models.user import User
 from ..schemas.user import UserOut, UserCreate, Token, UserUpdate, ForgotPassword, ResetPassword
-from ..core.auth import get_password_hash, verify_password, create_access_token, oauth2_scheme, decode_token, generate_reset_token
-from ..core.logger import audit
+from ..core.auth import get_password_hash, create_access_token, oauth2_scheme, decode_token
+from ..core.auth_context import verify_token
+from ..core.password_hashing import verify_and_update
+from ..core.rate_limit import rate_limit
+from ..core.reset_tokens import issue_reset_token, consume_reset_token
+from ..core.logger import audit, user_target
 
 router = APIRouter()
 
 @router.post("/register", response_model=UserOut)
-def register(payload: UserCreate, db: Session = Depends(get_db)):
+def register(payload: UserCreate, request: Request, response: Response, db: Session = Depends(get_db)):
+    rate_limit(request, response, "register", email=payload.email)
     existing = db.query(User).filter(User.email == payload.email).first()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -26,22 +31,31 @@ def register(payload: UserCreate, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(user)
     try:
-        audit("auth.register", actor_id=user.id, target=user.email)
+        audit("auth.register", actor_id=user.id, target=user_target(user.id))
     except Exception:
         pass
     return user
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login(request: Request, response: Response, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     # We use 'username' field to pass email for OAuth2PasswordRequestForm
+    # Throttle before any bcrypt work; failed and successful attempts both count
+    rate_limit(request, response, "login", email=form_data.username)
     user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = verify_and_update(form_data.password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        # stored with an outdated cost factor: upgrade it now that we know the password
+        user.password_hash = new_hash
+        db.commit()
 
     token = create_access_token({"sub": str(user.id)})
     # Audit successful login (do not log passwords)
     try:
-        audit("auth.login", actor_id=user.id, target=user.email)
+        audit("auth.login", actor_id=user.id, target=user_target(user.id))
     except Exception:
         # avoid failing the request if auditing fails
         pass
@@ -65,7 +79,7 @@ def refresh(token: str = Depends(oauth2_scheme)):
 
 @router.get("/me", response_model=UserOut)
 def me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    payload = decode_token(token)
+    payload = verify_token(token)
     sub = payload.get("sub")
     if not sub:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
@@ -77,7 +91,7 @@ def me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
 @router.put("/me", response_model=UserOut)
 def update_me(payload: UserUpdate, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     payload_dict = payload.model_dump(exclude_unset=True)
-    data = decode_token(token)
+    data = verify_token(token)
     sub = data.get("sub")
     if not sub:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
@@ -94,25 +108,21 @@ def update_me(payload: UserUpdate, token: str = Depends(oauth2_scheme), db: Sess
     return user
 
 @router.post("/forgot-password")
-def forgot_password(payload: ForgotPassword, db: Session = Depends(get_db)):
+def forgot_password(payload: ForgotPassword, request: Request, response: Response, db: Session = Depends(get_db)):
     """Request password reset - generates a reset token"""
+    rate_limit(request, response, "forgot_password", email=payload.email)
     user = db.query(User).filter(User.email == payload.email).first()
     
     # Always return success to prevent email enumeration
     if not user:
         return {"message": "If the email exists, a reset link has been sent"}
     
-    # Generate reset token and set expiration (1 hour)
-    reset_token = generate_reset_token()
-    user.reset_token = reset_token
-    user.reset_token_expires = datetime.now(timezone.utc) + timedelta(hours=1)
-    db.commit()
+    # Only the token's SHA-256 is stored; it expires after RESET_TOKEN_TTL_MINUTES (1 hour by default)
+    reset_token = issue_reset_token(db, user.id)
     
-    # In production, send email with reset link
-    # For development, we'll log the token
+    # In production, send email with reset link (the token itself is never logged)
     try:
-        audit("auth.forgot_password", actor_id=user.id, target=user.email, 
-              metadata={"reset_token": reset_token})
+        audit("auth.forgot_password", actor_id=user.id, target=user_target(user.id))
     except Exception:
         pass
     
@@ -130,34 +140,17 @@ def forgot_password(payload: ForgotPassword, db: Session = Depends(get_db)):
 @router.post("/reset-password")
 def reset_password(payload: ResetPassword, db: Session = Depends(get_db)):
     """Reset password using a valid reset token"""
-    user = db.query(User).filter(User.reset_token == payload.token).first()
-    
+    # Primary-key lookup on the token hash; expired tokens never match
+    user = consume_reset_token(db, payload.token)
     if not user:
         raise HTTPException(status_code=400, detail="Invalid or expired reset token")
     
-    # Check if token is expired
-    if not user.reset_token_expires:
-        raise HTTPException(status_code=400, detail="Reset token has expired")
-    
-    # Handle both timezone-aware and timezone-naive datetimes
-    now = datetime.now(timezone.utc)
-    expires = user.reset_token_expires
-    
-    # If expires is naive, make it timezone-aware (assume UTC)
-    if expires.tzinfo is None:
-        expires = expires.replace(tzinfo=timezone.utc)
-    
-    if expires < now:
-        raise HTTPException(status_code=400, detail="Reset token has expired")
-    
-    # Update password and clear reset token
+    # Update password; the token rows were deleted by consume_reset_token in the same commit
     user.password_hash = get_password_hash(payload.new_password)
-    user.reset_token = None
-    user.reset_token_expires = None
     db.commit()
     
     try:
-        audit("auth.password_reset", actor_id=user.id, target=user.email)
+        audit("auth.password_reset", actor_id=user.id, target=user_target(user.id))
     except Exception:
         pass
     
@@ -2,7 +2,7 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from ..core.database import get_db
-from ..core.auth import oauth2_scheme, decode_token
+from ..core.auth_context import require_user
 from ..models.cart_item import CartItem
 from ..models.product import Product
 from ..schemas.cart import CartItemOut, CartItemCreate, CartItemUpdate, CartResponseExpanded, CartItemWithProduct, ProductMini
@@ -11,14 +11,6 @@ from ..schemas.cart import CartItemOut, CartItemCreate, CartItemUpdate, CartResp
 router = APIRouter()
 
 
-def require_user(token: str = Depends(oauth2_scheme)) -> int:
-    payload = decode_token(token)
-    sub = payload.get("sub")
-    if not sub:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    return int(sub)
-
-
 def compute_totals(items: List[CartItem]) -> tuple[float, float]:
     subtotal = 0.0
     for it in items:
@@ -28,21 +20,26 @@ def compute_totals(items: List[CartItem]) -> tuple[float, float]:
 
 @router.get("", response_model=CartResponseExpanded)
 def get_cart(user_id: int = Depends(require_user), db: Session = Depends(get_db)):
-    rows = db.query(CartItem).filter(CartItem.user_id == user_id).all()
+    # products joined in, not fetched per cart line; lines whose product is gone are skipped
+    rows = (
+        db.query(CartItem, Product)
+        .join(Product, Product.id == CartItem.product_id)
+        .filter(CartItem.user_id == user_id)
+        .order_by(CartItem.id.asc())
+        .all()
+    )
     items: list[CartItemWithProduct] = []
     subtotal = 0.0
-    for it in rows:
-        product = db.query(Product).filter(Product.id == it.product_id).first()
-        if product:
-            pmini = ProductMini(
-                id=product.id,
-                name=product.name,
-                category=product.category,
-                price=float(product.price),
-                image=product.image,
-            )
-            items.append(CartItemWithProduct(id=it.id, product=pmini, quantity=it.quantity))
-            subtotal += float(product.price) * it.quantity
+    for it, product in rows:
+        pmini = ProductMini(
+            id=product.id,
+            name=product.name,
+            category=product.category,
+            price=float(product.price),
+            image=product.image,
+        )
+        items.append(CartItemWithProduct(id=it.id, product=pmini, quantity=it.quantity))
+        subtotal += float(product.price) * it.quantity
     return CartResponseExpanded(items=items, subtotal=subtotal, total=subtotal)
 
 
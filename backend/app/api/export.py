@@ -0,0 +1,182 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from ..core.database import SessionLocal
+from ..core.logger import audit
+from ..models.order import Order
+from ..models.order_item import OrderItem
+from ..core.auth_context import require_admin
+
+
+router = APIRouter()
+
+# Rows fetched per round-trip from the server-side cursor
+YIELD_PER = 1000
+# Flush the text buffer to the client once it grows past this many bytes
+CHUNK_SIZE = 64 * 1024
+
+CSV_COLUMNS = [
+    "order_id", "user_id", "created_at", "status", "subtotal", "discount", "tax", "total",
+    "item_id", "product_id", "quantity", "price",
+]
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def _num(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _utc_naive(value: datetime) -> datetime:
+    """orders.created_at is stored as naive UTC (SQLite CURRENT_TIMESTAMP); compare like with like."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+def _bound(name: str, value: Optional[str]) -> tuple[Optional[datetime], bool]:
+    """Parse a start/end query value: (naive UTC datetime, whether it was a bare date)."""
+    if value is None or value == "":
+        return None, False
+    try:
+        if len(value) == 10:
+            return datetime.combine(date.fromisoformat(value), datetime.min.time()), True
+        return _utc_naive(datetime.fromisoformat(value)), False
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: expected YYYY-MM-DD or an ISO 8601 datetime")
+
+
+def _rows(start: Optional[datetime], end: Optional[datetime], end_exclusive: bool = False):
+    """Yield flat (order, item) rows ordered by order id without loading them all.
+
+    Uses a dedicated session because the generator outlives the request's
+    dependency scope; columns are selected directly so no ORM identity map
+    accumulates.
+    """
+    stmt = (
+        select(
+            Order.id, Order.user_id, Order.created_at, Order.status,
+            Order.subtotal, Order.discount, Order.tax, Order.total,
+            OrderItem.id, OrderItem.product_id, OrderItem.quantity, OrderItem.price,
+        )
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .order_by(Order.id, OrderItem.id)
+    )
+    # created_at is indexed (ix_orders_created_at)
+    if start is not None:
+        stmt = stmt.where(Order.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(Order.created_at < end if end_exclusive else Order.created_at <= end)
+    with SessionLocal() as db:
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=YIELD_PER))
+        for row in result:
+            yield row
+
+
+def _csv_lines(rows) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    for r in rows:
+        writer.writerow([
+            r[0], r[1], _iso(r[2]), r[3], _num(r[4]), _num(r[5]), _num(r[6]), _num(r[7]),
+            r[8], r[9], r[10], _num(r[11]),
+        ])
+        if buf.tell() >= CHUNK_SIZE:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+    yield buf.getvalue()
+
+
+def _ndjson_lines(rows) -> Iterator[str]:
+    """One JSON object per order with its items nested; relies on rows being ordered by order id."""
+    parts: list[str] = []
+    size = 0
+    current = None
+    for r in rows:
+        if current is None or current["id"] != r[0]:
+            if current is not None:
+                line = json.dumps(current) + "\n"
+                parts.append(line)
+                size += len(line)
+                if size >= CHUNK_SIZE:
+                    yield "".join(parts)
+                    parts, size = [], 0
+            current = {
+                "id": r[0],
+                "user_id": r[1],
+                "created_at": _iso(r[2]),
+                "status": r[3],
+                "subtotal": _num(r[4]),
+                "discount": _num(r[5]),
+                "tax": _num(r[6]),
+                "total": _num(r[7]),
+                "items": [],
+            }
+        if r[8] is not None:
+            current["items"].append({"id": r[8], "product_id": r[9], "quantity": r[10], "price": _num(r[11])})
+    if current is not None:
+        parts.append(json.dumps(current) + "\n")
+    yield "".join(parts)
+
+
+def _encode(chunks: Iterator[str], compress: bool) -> Iterator[bytes]:
+    if not compress:
+        for chunk in chunks:
+            if chunk:
+                yield chunk.encode("utf-8")
+        return
+    # wbits=31 -> gzip container, compressed incrementally per chunk
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = gz.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield gz.flush()
+
+
+@router.get("/orders")
+def export_orders(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    start: Optional[str] = Query(None, description="YYYY-MM-DD or ISO 8601 datetime (inclusive)"),
+    end: Optional[str] = Query(None, description="YYYY-MM-DD (the whole day) or ISO 8601 datetime (inclusive)"),
+    gzip: bool = False,
+    _user_id: int = Depends(require_admin),
+):
+    """Stream all orders with their items as CSV (one row per item) or NDJSON (one line per order).
+
+    Datetimes with an offset are converted to UTC; naive ones are taken as UTC.
+    """
+    start_at, _ = _bound("start", start)
+    end_at, end_is_date = _bound("end", end)
+    if end_is_date:
+        # a bare end date includes that whole day
+        end_at += timedelta(days=1)
+    rows = _rows(start_at, end_at, end_exclusive=end_is_date)
+    lines = _csv_lines(rows) if format == "csv" else _ndjson_lines(rows)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"orders.{format}"
+    if gzip:
+        media_type = "application/gzip"
+        filename += ".gz"
+    audit(
+        "admin.export.orders",
+        actor_id=_user_id,
+        format=format,
+        start=start,
+        end=end,
+    )
+    return StreamingResponse(
+        _encode(lines, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,20 @@
+import hmac
+import os
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+
+from ..core.metrics import REGISTRY
+
+router = APIRouter()
+
+# Optional bearer token for scrapers; empty leaves /metrics open (keep it off the public ingress then)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    if METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "")
+        if not hmac.compare_digest(supplied, f"Bearer {METRICS_TOKEN}"):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,60 +1,76 @@
+from collections import defaultdict
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from ..core.database import get_db
-from ..core.auth import oauth2_scheme, decode_token
+from ..core.auth_context import require_user
 from ..models.order import Order
 from ..models.order_item import OrderItem
 from ..models.product import Product
 from ..models.cart_item import CartItem
-from ..schemas.order import OrderCreate, OrderOut
+from ..schemas.order import OrderCreate, OrderItemOut, OrderOut
+from ..core.leaderboard import leaderboard
 
 
 router = APIRouter()
 
 
-def require_user(token: str = Depends(oauth2_scheme)) -> int:
-    payload = decode_token(token)
-    sub = payload.get("sub")
-    if not sub:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    return int(sub)
+def _order_out(order: Order, items: List[OrderItem]) -> OrderOut:
+    return OrderOut(
+        id=order.id,
+        subtotal=float(order.subtotal),
+        discount=float(order.discount),
+        tax=float(order.tax),
+        total=float(order.total),
+        status=order.status,
+        items=[OrderItemOut.model_validate(it) for it in items],
+    )
 
 
 @router.get("", response_model=List[OrderOut])
 def list_orders(user_id: int = Depends(require_user), db: Session = Depends(get_db)):
-    orders = db.query(Order).filter(Order.user_id == user_id).all()
-    # attach items
-    for o in orders:
-        _ = db.query(OrderItem).filter(OrderItem.order_id == o.id).all()
-    return orders
+    orders = db.query(Order).filter(Order.user_id == user_id).order_by(Order.id.asc()).all()
+    # one query for the items of every order instead of one per order
+    items_by_order: dict[int, List[OrderItem]] = defaultdict(list)
+    if orders:
+        rows = db.query(OrderItem).filter(OrderItem.order_id.in_([o.id for o in orders])).order_by(OrderItem.id.asc())
+        for it in rows:
+            items_by_order[it.order_id].append(it)
+    return [_order_out(o, items_by_order[o.id]) for o in orders]
 
 
 @router.post("", response_model=OrderOut, status_code=201)
 def create_order(payload: OrderCreate, user_id: int = Depends(require_user), db: Session = Depends(get_db)):
+    ids = {it.product_id for it in payload.items}
+    products = {p.id: p for p in db.query(Product).filter(Product.id.in_(ids))} if ids else {}
     subtotal = 0.0
-    items_models: List[OrderItem] = []
+    lines: List[dict] = []
     for it in payload.items:
-        product = db.query(Product).filter(Product.id == it.product_id).first()
+        product = products.get(it.product_id)
         if not product:
             raise HTTPException(status_code=404, detail=f"Product {it.product_id} not found")
         price = float(product.price)
         subtotal += price * it.quantity
-        items_models.append(OrderItem(product_id=product.id, quantity=it.quantity, price=price))
+        lines.append({"product_id": product.id, "quantity": it.quantity, "price": price})
     discount = payload.discount
     tax = payload.tax
     total = subtotal - discount + tax
 
     order = Order(user_id=user_id, subtotal=subtotal, discount=discount, tax=tax, total=total, status="paid")
     db.add(order)
-    db.commit()
-    db.refresh(order)
-
-    for im in items_models:
-        im.order_id = order.id
-        db.add(im)
-    db.commit()
-    # Clear user's cart after successful order
+    db.flush()
+    # one executemany for all lines (the ORM would insert them one by one to get their ids back),
+    # then a single read of the lines with their ids
+    if lines:
+        db.execute(insert(OrderItem), [{**line, "order_id": order.id} for line in lines])
+    items = db.query(OrderItem).filter(OrderItem.order_id == order.id).order_by(OrderItem.id.asc()).all()
+    out = _order_out(order, items)
+    # Clear user's cart with the order, in the same transaction
     db.query(CartItem).filter(CartItem.user_id == user_id).delete()
+    db.commit()
     db.refresh(order)
-    return order
+    leaderboard.record_order(
+        [(line["product_id"], line["quantity"], line["price"]) for line in lines], order.created_at, order_id=order.id
+    )
+    return out
@@ -4,48 +4,26 @@ from sqlalchemy.orm import Session
 from ..core.database import get_db
 from ..models.product import Product
 from ..schemas.product import ProductOut, ProductCreate, ProductUpdate
-from ..core.auth import oauth2_scheme, decode_token
+from ..core.auth_context import require_user, require_admin
 from ..models.user import User
 
 
 router = APIRouter()
 
 
-def require_user(token: str = Depends(oauth2_scheme)) -> int:
-    payload = decode_token(token)
-    sub = payload.get("sub")
-    if not sub:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    return int(sub)
-
-def require_admin(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> int:
-    payload = decode_token(token)
-    sub = payload.get("sub")
-    if not sub:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user_id = int(sub)
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user or not bool(user.is_admin):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
-    return user_id
-
-
-@router.get("", response_model=List[ProductOut])
-def list_products(
+def apply_product_filters(
+    query,
     q: Optional[str] = None,
-    categories: Optional[List[str]] = Query(None),
-    tags: Optional[List[str]] = Query(None),
-    programs: Optional[List[str]] = Query(None),
+    categories: Optional[List[str]] = None,
+    tags: Optional[List[str]] = None,
+    programs: Optional[List[str]] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     min_rating: Optional[float] = None,
     max_rating: Optional[float] = None,
-    sort: Optional[str] = None,
-    db: Session = Depends(get_db),
 ):
-    # Public listing: only active products are visible in the store
+    """Apply the catalog search criteria to a Product query (shared with admin bulk ops)."""
     from sqlalchemy import or_
-    query = db.query(Product).filter(or_(Product.status == "active", Product.status.is_(None)))
     if q:
         like = f"%{q}%"
         query = query.filter(
@@ -62,7 +40,6 @@ def list_products(
             like = f"%{t}%"
             clauses.append(Product.tags.ilike(like))
         if clauses:
-            from sqlalchemy import or_
             query = query.filter(or_(*clauses))
     if programs:
         clauses = []
@@ -70,7 +47,6 @@ def list_products(
             like = f"%{p}%"
             clauses.append(Product.programs.ilike(like))
         if clauses:
-            from sqlalchemy import or_
             query = query.filter(or_(*clauses))
     if min_price is not None:
         query = query.filter(Product.price >= min_price)
@@ -80,6 +56,36 @@ def list_products(
         query = query.filter(Product.rating >= min_rating)
     if max_rating is not None:
         query = query.filter(Product.rating <= max_rating)
+    return query
+
+
+@router.get("", response_model=List[ProductOut])
+def list_products(
+    q: Optional[str] = None,
+    categories: Optional[List[str]] = Query(None),
+    tags: Optional[List[str]] = Query(None),
+    programs: Optional[List[str]] = Query(None),
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    max_rating: Optional[float] = None,
+    sort: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    # Public listing: only active products are visible in the store
+    from sqlalchemy import or_
+    query = db.query(Product).filter(or_(Product.status == "active", Product.status.is_(None)))
+    query = apply_product_filters(
+        query,
+        q=q,
+        categories=categories,
+        tags=tags,
+        programs=programs,
+        min_price=min_price,
+        max_price=max_price,
+        min_rating=min_rating,
+        max_rating=max_rating,
+    )
     if sort == "price_asc":
         query = query.order_by(Product.price.asc())
     elif sort == "price_desc":
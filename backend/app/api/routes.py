@@ -6,6 +6,8 @@ from .cart import router as cart_router
 from .orders import router as orders_router
 from .admin import router as admin_router
 from .upload import router as upload_router
+from .export import router as export_router
+from .metrics import router as metrics_router
 
 api_router = APIRouter()
 api_router.include_router(auth_router, prefix="/auth", tags=["auth"]) 
@@ -16,4 +18,6 @@ api_router.include_router(products_router, prefix="/products", tags=["products"]
 api_router.include_router(cart_router, prefix="/cart", tags=["cart"]) 
 api_router.include_router(orders_router, prefix="/orders", tags=["orders"]) 
 api_router.include_router(admin_router, prefix="/admin", tags=["admin"])
+api_router.include_router(export_router, prefix="/admin/export", tags=["admin"])
 api_router.include_router(upload_router, prefix="/auth", tags=["auth"])
+api_router.include_router(metrics_router, tags=["health"])
@@ -1,26 +1,35 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from ..core.database import get_db
 from ..models.user import User
 from ..schemas.user import UserOut, UserCreate, UserUpdate
-from ..core.auth import decode_token, get_password_hash
+from ..core.auth import get_password_hash
+from ..core.auth_context import require_user, invalidate_user_role
+from ..core.analytics import forget_customer
+from ..core.reset_tokens import revoke_reset_tokens
+from ..core.logger import audit, user_target
 
 router = APIRouter()
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
-
-def require_user(token: str = Depends(oauth2_scheme)) -> int:
-    payload = decode_token(token)
-    sub = payload.get("sub")
-    if not sub:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    return int(sub)
 
 @router.get("", response_model=List[UserOut])
-def list_users(_: int = Depends(require_user), db: Session = Depends(get_db)):
-    return db.query(User).all()
+def list_users(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    _: int = Depends(require_user),
+    db: Session = Depends(get_db),
+):
+    # Keyset pagination: pass the last id seen (X-Next-Cursor) as after_id
+    query = db.query(User.id, User.name, User.email, User.age, User.is_admin, User.avatar, User.created_at)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    rows = query.order_by(User.id.asc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return rows
 
 @router.post("", response_model=UserOut, status_code=201)
 def create_user(payload: UserCreate, _: int = Depends(require_user), db: Session = Depends(get_db)):
@@ -55,10 +64,14 @@ def update_user(user_id: int, payload: UserUpdate, _: int = Depends(require_user
     return user
 
 @router.delete("/{user_id}", status_code=204)
-def delete_user(user_id: int, _: int = Depends(require_user), db: Session = Depends(get_db)):
+def delete_user(user_id: int, actor_id: int = Depends(require_user), db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    revoke_reset_tokens(db, user_id)
+    forget_customer(db, user_id)
     db.delete(user)
     db.commit()
+    invalidate_user_role(user_id)
+    audit("user.delete", actor_id=actor_id, target=user_target(user_id))
     return None
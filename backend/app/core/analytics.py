@@ -0,0 +1,177 @@
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import case, func as sa_func, or_, select
+from sqlalchemy.orm import Session
+
+from ..models.customer_stats import CustomerStats
+from ..models.order import Order
+from ..models.user import User
+
+# Customers recomputed per batch
+BATCH_SIZE = 5000
+# Minimum seconds between automatic incremental refreshes triggered by reads
+try:
+    REFRESH_SEC = int(os.getenv("ANALYTICS_REFRESH_SEC", "60"))
+except Exception:
+    REFRESH_SEC = 60
+# Orders created up to this many seconds before the newest one already folded in are looked at
+# again, so an order that committed after a later one was counted is still picked up
+try:
+    OVERLAP_SEC = int(os.getenv("ANALYTICS_OVERLAP_SEC", "300"))
+except Exception:
+    OVERLAP_SEC = 300
+
+_refresh_lock = threading.Lock()
+_last_refresh = 0.0
+
+
+def _month(value) -> Optional[str]:
+    if value is None:
+        return None
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m")
+    return str(value)[:7]
+
+
+def _recompute(db: Session, uids: list) -> None:
+    """Rebuild the customer_stats rows of these users from their orders (idempotent)."""
+    totals = {
+        uid: (count, total, first, last, max_id)
+        for uid, count, total, first, last, max_id in db.query(
+            Order.user_id,
+            sa_func.count(Order.id),
+            sa_func.coalesce(sa_func.sum(Order.total), 0),
+            sa_func.min(Order.created_at),
+            sa_func.max(Order.created_at),
+            sa_func.max(Order.id),
+        )
+        .filter(Order.user_id.in_(uids))
+        .group_by(Order.user_id)
+        .all()
+    }
+    existing = {s.user_id: s for s in db.query(CustomerStats).filter(CustomerStats.user_id.in_(uids)).all()}
+    cohorts = {uid: _month(ts) for uid, ts in db.query(User.id, User.created_at).filter(User.id.in_(uids)).all()}
+    for uid in uids:
+        stats = existing.get(uid)
+        if uid not in cohorts or uid not in totals:
+            # the user no longer exists (their orders are kept) or has no orders left
+            if stats is not None:
+                db.delete(stats)
+            continue
+        if stats is None:
+            stats = CustomerStats(user_id=uid, cohort=cohorts[uid])
+            db.add(stats)
+        count, total, first, last, max_id = totals[uid]
+        stats.orders_count = int(count)
+        stats.lifetime_value = round(float(total or 0), 2)
+        stats.first_order_at = first
+        stats.last_order_at = last
+        stats.last_order_id = int(max_id)
+    db.flush()
+
+
+def _refresh(db: Session, full: bool) -> int:
+    if full:
+        db.query(CustomerStats).delete(synchronize_session=False)
+        stmt = select(Order.user_id).where(Order.user_id.isnot(None))
+    else:
+        max_id, latest = db.query(
+            sa_func.coalesce(sa_func.max(CustomerStats.last_order_id), 0), sa_func.max(CustomerStats.last_order_at)
+        ).one()
+        changed = Order.id > max_id
+        if latest is not None:
+            changed = or_(changed, Order.created_at >= latest - timedelta(seconds=OVERLAP_SEC))
+        stmt = select(Order.user_id).where(changed, Order.user_id.isnot(None))
+    stmt = stmt.distinct().order_by(Order.user_id).execution_options(yield_per=BATCH_SIZE)
+    recomputed = 0
+    for partition in db.execute(stmt).partitions():
+        uids = [uid for (uid,) in partition]
+        _recompute(db, uids)
+        recomputed += len(uids)
+    db.commit()
+    return recomputed
+
+
+def refresh_customer_stats(db: Session, full: bool = False) -> int:
+    """Recompute customer_stats for customers with recent orders; returns customers recomputed.
+
+    A customer is recomputed from all of their orders (one grouped query per
+    BATCH_SIZE customers) when they have an order past the highest order id
+    already folded in or created within OVERLAP_SEC of the newest one, so
+    re-reading the overlap never double counts. With full=True the table is
+    rebuilt from scratch (needed after older orders are edited or deleted,
+    which the incremental path does not see).
+    """
+    global _last_refresh
+    with _refresh_lock:
+        recomputed = _refresh(db, full)
+        _last_refresh = time.monotonic()
+    if recomputed:
+        logging.getLogger("analytics").info("customer_stats refreshed customers=%d full=%s", recomputed, full)
+    return recomputed
+
+
+def ensure_fresh(db: Session) -> None:
+    """Run an incremental refresh if the last one is older than REFRESH_SEC.
+
+    Never waits for the lock: while another request refreshes, reads are served from the current table.
+    """
+    global _last_refresh
+    if time.monotonic() - _last_refresh < REFRESH_SEC or not _refresh_lock.acquire(blocking=False):
+        return
+    try:
+        if time.monotonic() - _last_refresh >= REFRESH_SEC:
+            _refresh(db, full=False)
+            _last_refresh = time.monotonic()
+    finally:
+        _refresh_lock.release()
+
+
+def forget_customer(db: Session, user_id: int) -> None:
+    """Delete a user's customer_stats row (call before deleting the user; the caller commits).
+
+    SQLite does not enforce the ON DELETE CASCADE here, since foreign keys are not switched on.
+    """
+    db.query(CustomerStats).filter(CustomerStats.user_id == user_id).delete(synchronize_session=False)
+
+
+def cohort_report(db: Session) -> list[dict]:
+    """Per signup-month cohort: size, purchasers, repeat purchase rate and LTV."""
+    if db.bind.dialect.name == "sqlite":
+        month = sa_func.strftime("%Y-%m", User.created_at)
+    else:
+        month = sa_func.to_char(User.created_at, "YYYY-MM")
+    sizes = dict(db.query(month.label("cohort"), sa_func.count(User.id)).group_by("cohort").all())
+    rows = (
+        db.query(
+            CustomerStats.cohort,
+            sa_func.count(CustomerStats.user_id),
+            sa_func.sum(case((CustomerStats.orders_count >= 2, 1), else_=0)),
+            sa_func.coalesce(sa_func.sum(CustomerStats.orders_count), 0),
+            sa_func.coalesce(sa_func.sum(CustomerStats.lifetime_value), 0),
+        )
+        .group_by(CustomerStats.cohort)
+        .all()
+    )
+    stats = {cohort: (int(c or 0), int(r or 0), int(o or 0), float(v or 0)) for cohort, c, r, o, v in rows}
+    result = []
+    for cohort in sorted(set(sizes) | set(stats), key=lambda k: k or ""):
+        size = int(sizes.get(cohort, 0))
+        customers, repeat, orders, revenue = stats.get(cohort, (0, 0, 0, 0.0))
+        result.append({
+            "cohort": cohort,
+            "users": size,
+            "customers": customers,
+            "repeat_customers": repeat,
+            "repeat_purchase_rate": round(repeat / customers, 4) if customers else 0.0,
+            "orders": orders,
+            "revenue": round(revenue, 2),
+            "ltv_per_customer": round(revenue / customers, 2) if customers else 0.0,
+            "ltv_per_user": round(revenue / size, 2) if size else 0.0,
+        })
+    return result
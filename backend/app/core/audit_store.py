@@ -0,0 +1,331 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+
+from .logger import RequestIdFilter, record_message
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    event TEXT NOT NULL,
+    actor_id INTEGER,
+    target TEXT,
+    request_id TEXT,
+    extras TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_audit_event_ts ON audit_events (event, ts);
+CREATE INDEX IF NOT EXISTS ix_audit_actor ON audit_events (actor_id);
+CREATE INDEX IF NOT EXISTS ix_audit_target ON audit_events (target);
+CREATE INDEX IF NOT EXISTS ix_audit_ts ON audit_events (ts);
+"""
+
+_INSERT = (
+    "INSERT INTO audit_events (ts, event, actor_id, target, request_id, extras, message) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+class AuditStore:
+    """Append-only SQLite store for audit events, written in batches.
+
+    Callers only append a tuple to an in-memory pending list; a background
+    thread inserts everything pending in one transaction every
+    ``flush_interval`` seconds (or sooner once ``batch_size`` rows are
+    waiting). Pending rows are capped at ``max_pending``; beyond that the
+    oldest are dropped and counted rather than blocking requests. A failed
+    batch is put back and retried; after ``max_attempts`` failures in a row
+    it is inserted row by row and the rows that still fail are dropped.
+    The same thread deletes events older than ``retention_days`` (0 keeps
+    everything) every ``prune_interval`` seconds.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 1.0, max_pending: int = 100_000,
+                 max_attempts: int = 3, retention_days: float = 365, prune_interval: float = 3600.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max(1, max_attempts)
+        self.retention_days = retention_days
+        self.prune_interval = prune_interval
+        self.pruned = 0
+        self._next_prune = 0.0
+        self.dropped = 0
+        self._failures = 0
+        self._pending: deque = deque(maxlen=max_pending)
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._stopped = False
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        self._thread = threading.Thread(target=self._run, name="audit-store-flusher", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def append(self, row: tuple) -> None:
+        with self._cond:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopped and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                stopped = self._stopped
+            self.flush()
+            if stopped:
+                return
+            if time.monotonic() >= self._next_prune:
+                self._next_prune = time.monotonic() + self.prune_interval
+                try:
+                    self.prune()
+                except Exception as e:
+                    logging.getLogger("audit_store").warning("Audit retention prune failed: %s", e)
+
+    def flush(self) -> int:
+        """Write all pending rows in a single transaction; returns rows written."""
+        with self._write_lock:
+            with self._cond:
+                if not self._pending:
+                    return 0
+                rows = list(self._pending)
+                self._pending.clear()
+            try:
+                conn = self._connect()
+                try:
+                    with conn:
+                        conn.executemany(_INSERT, rows)
+                finally:
+                    conn.close()
+            except Exception as e:
+                self._failures += 1
+                if self._failures >= self.max_attempts:
+                    self._failures = 0
+                    return self._flush_rows(rows, e)
+                # keep the failed batch for the next attempt; rows pushed past maxlen are lost
+                with self._cond:
+                    overflow = len(self._pending) + len(rows) - self._pending.maxlen
+                    if overflow > 0:
+                        self.dropped += overflow
+                    self._pending.extendleft(reversed(rows))
+                logging.getLogger("audit_store").warning("Audit flush failed: %s", e)
+                return 0
+            self._failures = 0
+            return len(rows)
+
+    def _flush_rows(self, rows: list, error: Exception) -> int:
+        """Last attempt for a batch that keeps failing: insert rows one by one, drop the ones that fail."""
+        written = 0
+        try:
+            conn = self._connect()
+        except Exception:
+            conn = None
+        try:
+            for row in rows:
+                if conn is None:
+                    break
+                try:
+                    with conn:
+                        conn.execute(_INSERT, row)
+                    written += 1
+                except Exception:
+                    pass
+        finally:
+            if conn is not None:
+                conn.close()
+        lost = len(rows) - written
+        with self._cond:
+            self.dropped += lost
+        logging.getLogger("audit_store").error(
+            "Audit flush failed %d times (%s); dropped %d of %d rows", self.max_attempts, error, lost, len(rows)
+        )
+        return written
+
+    def prune(self, now: Optional[float] = None, chunk: int = 5000) -> int:
+        """Delete events older than ``retention_days`` in short transactions; returns rows removed."""
+        if self.retention_days <= 0:
+            return 0
+        cutoff = (time.time() if now is None else now) - self.retention_days * 86400
+        removed = 0
+        conn = self._connect()
+        try:
+            while True:
+                with conn:
+                    n = conn.execute(
+                        "DELETE FROM audit_events WHERE id IN (SELECT id FROM audit_events WHERE ts < ? LIMIT ?)",
+                        (cutoff, chunk),
+                    ).rowcount
+                removed += n
+                if n < chunk:
+                    break
+        finally:
+            conn.close()
+        self.pruned += removed
+        return removed
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._pending)
+        return {"enabled": True, "path": self.path, "pending": pending, "dropped": self.dropped,
+                "retention_days": self.retention_days, "pruned": self.pruned}
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=5.0)
+
+    def query(
+        self,
+        limit: int = 200,
+        before: Optional[str] = None,
+        event: Optional[str] = None,
+        actor_id: Optional[int] = None,
+        target: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> tuple[list[dict], Optional[str]]:
+        """Return (events newest-first by time, next cursor); pass the cursor back as ``before``.
+
+        The cursor is "<ts>:<id>" so pages follow the (event, ts) and ts indexes
+        instead of sorting by id. Only flushed events are visible (at most
+        ``flush_interval`` behind); reads never write on the caller's thread.
+        Raises ValueError for a malformed cursor.
+        """
+        where, params = [], []
+        if before is not None:
+            ts, _, seq = before.partition(":")
+            ts, seq = float(ts), int(seq)
+            where.append("ts <= ? AND (ts < ? OR id < ?)")
+            params.extend((ts, ts, seq))
+        if event:
+            where.append("event = ?")
+            params.append(event)
+        if actor_id is not None:
+            where.append("actor_id = ?")
+            params.append(actor_id)
+        if target:
+            where.append("target = ?")
+            params.append(target)
+        if start is not None:
+            where.append("ts >= ?")
+            params.append(_epoch(start))
+        if end is not None:
+            where.append("ts <= ?")
+            params.append(_epoch(end))
+        sql = "SELECT * FROM audit_events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items = [
+            {
+                "id": r["id"],
+                "timestamp": datetime.fromtimestamp(r["ts"], tz=timezone.utc).isoformat(),
+                "level": "INFO",
+                "logger": "audit",
+                "request_id": r["request_id"],
+                "message": r["message"],
+                "event": r["event"],
+                "actor_id": r["actor_id"],
+                "target": r["target"],
+                "extras": json.loads(r["extras"]) if r["extras"] else {},
+            }
+            for r in rows
+        ]
+        return items, (f"{rows[-1]['ts']!r}:{rows[-1]['id']}" if has_more and rows else None)
+
+
+def _epoch(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class AuditStoreHandler(logging.Handler):
+    """Forwards structured audit records (see logger.audit) to an AuditStore."""
+
+    def __init__(self, store: AuditStore):
+        super().__init__(logging.INFO)
+        self.store = store
+
+    def emit(self, record: logging.LogRecord) -> None:
+        event = getattr(record, "event", None)
+        if event is None:
+            return
+        try:
+            actor_id = getattr(record, "actor_id", None)
+            target = getattr(record, "target", None)
+            self.store.append((
+                record.created,
+                event,
+                actor_id if isinstance(actor_id, int) else None,
+                None if target is None else str(target),
+                getattr(record, "request_id", None),
+                json.dumps(getattr(record, "extras", None) or {}, default=str),
+                record_message(record),
+            ))
+        except Exception:
+            self.handleError(record)
+
+
+AUDIT_STORE: Optional[AuditStore] = None
+
+
+def init_audit_store() -> Optional[AuditStore]:
+    """Create the store from AUDIT_DB_PATH (empty disables) and attach it to the audit logger.
+
+    The default is audit.db next to the app's SQLite database (./audit.db for other databases).
+    """
+    global AUDIT_STORE
+    if AUDIT_STORE is not None:
+        return AUDIT_STORE
+    path = os.getenv("AUDIT_DB_PATH")
+    if path is None:
+        from .database import sqlite_sidecar_path
+
+        path = sqlite_sidecar_path("audit.db") or "./audit.db"
+    if not path:
+        return None
+    try:
+        store = AuditStore(
+            path,
+            batch_size=int(os.getenv("AUDIT_BATCH_SIZE", "500")),
+            flush_interval=float(os.getenv("AUDIT_FLUSH_SEC", "1.0")),
+            max_attempts=int(os.getenv("AUDIT_MAX_ATTEMPTS", "3")),
+            retention_days=float(os.getenv("AUDIT_RETENTION_DAYS", "365")),
+        )
+    except Exception as e:
+        logging.getLogger("audit_store").warning("Failed to init audit store: %s", e)
+        return None
+    handler = AuditStoreHandler(store)
+    # request id is stamped here because the audit logger's own handlers run before propagation
+    handler.addFilter(RequestIdFilter())
+    logging.getLogger("audit").addHandler(handler)
+    atexit.register(store.stop)
+    AUDIT_STORE = store
+    return store
@@ -1,13 +1,14 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 import secrets
-import bcrypt
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 import os
 
+from .password_hashing import check_password, hash_password
+
 SECRET_KEY = os.getenv("SECRET_KEY", "CHANGE_ME_SUPER_SECRET")  # For demo; in production load from env
 ALGORITHM = "HS256"
 # Default access token lifetime: 30 days (sliding sessions use /auth/refresh)
@@ -17,33 +18,13 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain password against a hashed password"""
-    # Convert strings to bytes
-    password_bytes = plain_password.encode('utf-8')
-    hash_bytes = hashed_password.encode('utf-8')
-    
-    # Bcrypt has 72 byte limit
-    if len(password_bytes) > 72:
-        password_bytes = password_bytes[:72]
-    
-    return bcrypt.checkpw(password_bytes, hash_bytes)
+    """Verify a plain password against a hashed password (runs in the hashing pool)"""
+    return check_password(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """Hash a password using bcrypt"""
-    # Convert to bytes
-    password_bytes = password.encode('utf-8')
-    
-    # Bcrypt has a 72 byte limit, truncate if necessary
-    if len(password_bytes) > 72:
-        password_bytes = password_bytes[:72]
-    
-    # Generate salt and hash
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    
-    # Return as string
-    return hashed.decode('utf-8')
+    """Hash a password using bcrypt at BCRYPT_ROUNDS (runs in the hashing pool)"""
+    return hash_password(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fastapi import Depends, HTTPException, status
+
+from .auth import decode_token, oauth2_scheme
+
+try:
+    TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+    TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+    ROLE_CACHE_SIZE = int(os.getenv("AUTH_ROLE_CACHE_SIZE", "10000"))
+    # Upper bound on how long another worker may keep serving a role changed elsewhere
+    ROLE_CACHE_TTL = float(os.getenv("AUTH_ROLE_CACHE_TTL", "30"))
+except Exception:
+    TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL, ROLE_CACHE_SIZE, ROLE_CACHE_TTL = 10000, 300.0, 10000, 30.0
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU whose entries also expire after a per-entry TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._items: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._items)
+        return {"size": size, "maxsize": self.maxsize, "ttl_sec": self.ttl, "hits": self.hits, "misses": self.misses}
+
+
+# raw bearer token -> verified claims (never outlives the token's own exp)
+TOKEN_CACHE = TTLCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+# user id -> is_admin
+ROLE_CACHE = TTLCache(ROLE_CACHE_SIZE, ROLE_CACHE_TTL)
+
+
+def verify_token(token: str) -> dict:
+    """decode_token with a cache of already verified tokens; invalid tokens are never cached."""
+    claims = TOKEN_CACHE.get(token)
+    if claims is not None:
+        return claims
+    claims = decode_token(token)
+    exp = claims.get("exp")
+    ttl = float(exp) - time.time() if isinstance(exp, (int, float)) else None
+    TOKEN_CACHE.set(token, claims, ttl)
+    return claims
+
+
+def user_is_admin(user_id: int) -> Optional[bool]:
+    """Cached admin flag of a user; None if the user does not exist (not cached)."""
+    cached = ROLE_CACHE.get(user_id, _MISSING)
+    if cached is not _MISSING:
+        return cached
+    from .database import SessionLocal
+    from ..models.user import User
+
+    db = SessionLocal()
+    try:
+        row = db.query(User.is_admin).filter(User.id == user_id).first()
+    finally:
+        db.close()
+    if row is None:
+        return None
+    is_admin = bool(row[0])
+    ROLE_CACHE.set(user_id, is_admin)
+    return is_admin
+
+
+def invalidate_user_role(user_id: Optional[int]) -> None:
+    """Drop a cached role; call after changing users.is_admin or deleting a user."""
+    if user_id is not None:
+        ROLE_CACHE.delete(int(user_id))
+
+
+@dataclass
+class AuthContext:
+    user_id: int
+    claims: dict
+
+
+# async: verification is CPU-light (and usually a cache hit), so skip the threadpool hop
+async def get_auth_context(token: str = Depends(oauth2_scheme)) -> AuthContext:
+    claims = verify_token(token)
+    sub = claims.get("sub")
+    if not sub:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return AuthContext(user_id=int(sub), claims=claims)
+
+
+async def require_user(ctx: AuthContext = Depends(get_auth_context)) -> int:
+    return ctx.user_id
+
+
+def require_admin(ctx: AuthContext = Depends(get_auth_context)) -> int:
+    # sync: a role cache miss reads the users table
+    if not user_is_admin(ctx.user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return ctx.user_id
+
+
+def auth_cache_stats() -> dict:
+    return {"tokens": TOKEN_CACHE.stats(), "roles": ROLE_CACHE.stats()}
@@ -0,0 +1,253 @@
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # optional: pip install brotli
+except Exception:
+    brotli = None
+
+# Bodies smaller than this are sent as-is (compression overhead outweighs the gain)
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+# Compressed bodies of public responses kept per (ETag, encoding); 0 disables the cache
+CACHE_ENTRIES = int(os.getenv("COMPRESSION_CACHE_ENTRIES", "256"))
+# Only these media types are compressed (event streams are excluded on purpose: they must flush per event)
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/plain",
+    "text/xml",
+})
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick 'br' or 'gzip' from an Accept-Encoding header, honouring q=0 exclusions."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    co = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return co.compress(body) + co.flush()
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._finish = self._c.finish
+        else:
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._finish = self._c.flush
+
+    def feed(self, data: bytes) -> bytes:
+        return self._c.process(data) if hasattr(self._c, "process") else self._c.compress(data)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (ETag, encoding) so a hot public payload is compressed once."""
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._items: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+
+    def get(self, etag: str, encoding: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._items.get((etag, encoding))
+            if body is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end((etag, encoding))
+            self.hits += 1
+            return body
+
+    def put(self, etag: str, encoding: str, body: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._items[(etag, encoding)] = body
+            self._items.move_to_end((etag, encoding))
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._items)
+            nbytes = sum(len(b) for b in self._items.values())
+        return {"entries": size, "bytes": nbytes, "hits": self.hits, "misses": self.misses,
+                "brotli": brotli is not None}
+
+
+COMPRESSED_CACHE = CompressedBodyCache()
+
+
+def _etag_for(body: bytes) -> str:
+    return 'W/"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = {t.strip() for t in if_none_match.split(",")}
+    return "*" in tags or etag in tags or etag[2:] in tags
+
+
+class CompressionMiddleware:
+    """gzip/brotli response compression with a size threshold and content-type allowlist.
+
+    Complete bodies are compressed in one go; streamed bodies are compressed
+    chunk by chunk. Responses to anonymous GETs that are not marked private
+    or no-store count as public: they get a weak ETag over the uncompressed
+    body, If-None-Match is answered with 304, and their compressed form is
+    reused from COMPRESSED_CACHE instead of being compressed again.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        public = scope.get("method") == "GET" and "authorization" not in request_headers
+        if encoding is None and not public:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(send, encoding, public, request_headers.get("if-none-match"),
+                                          self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: Optional[str], public: bool, if_none_match: Optional[str],
+                 minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.public = public
+        self.if_none_match = if_none_match
+        self.minimum_size = minimum_size
+        self.start: Optional[Message] = None
+        self.passthrough = False
+        self.stream: Optional[_StreamCompressor] = None
+
+    def _eligible(self, headers: MutableHeaders) -> bool:
+        if "content-encoding" in headers:
+            return False
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return media_type in COMPRESSIBLE_TYPES
+
+    async def send(self, message: Message) -> None:
+        if self.passthrough:
+            await self._send(message)
+            return
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=list(message.get("headers", ())))
+            if not self._eligible(headers):
+                self.passthrough = True
+                await self._send(message)
+                return
+            cache_control = headers.get("cache-control", "").lower()
+            if message["status"] != 200 or "private" in cache_control or "no-store" in cache_control:
+                self.public = False
+            if self.encoding is None and not self.public:
+                self.passthrough = True
+                await self._send(message)
+                return
+            # hold the start until we know the body size (and its ETag)
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.stream is None and self.start is not None and not more_body:
+            await self._send_whole(body)
+            return
+        if self.stream is None:
+            await self._start_stream()
+            if self.stream is None:
+                # public but not compressible for this client: stream through untouched
+                self.passthrough = True
+                await self._send(message)
+                return
+        data = self.stream.feed(body)
+        if not more_body:
+            data += self.stream.finish()
+        if data or not more_body:
+            await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    async def _send_whole(self, body: bytes) -> None:
+        start, self.start = self.start, None
+        headers = MutableHeaders(raw=list(start.get("headers", ())))
+        etag = None
+        if self.public:
+            etag = headers.get("etag") or _etag_for(body)
+            headers["ETag"] = etag
+            if self.if_none_match and _etag_matches(self.if_none_match, etag):
+                del headers["content-length"]
+                await self._send({**start, "status": 304, "headers": headers.raw})
+                await self._send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+        if self.encoding is not None and len(body) >= self.minimum_size:
+            compressed = COMPRESSED_CACHE.get(etag, self.encoding) if etag else None
+            if compressed is None:
+                compressed = compress(body, self.encoding)
+                if etag:
+                    COMPRESSED_CACHE.put(etag, self.encoding, compressed)
+            if len(compressed) < len(body):
+                body = compressed
+                headers["Content-Encoding"] = self.encoding
+                headers["Content-Length"] = str(len(body))
+        headers.add_vary_header("Accept-Encoding")
+        await self._send({**start, "headers": headers.raw})
+        await self._send({"type": "http.response.body", "body": body, "more_body": False})
+
+    async def _start_stream(self) -> None:
+        start, self.start = self.start, None
+        headers = MutableHeaders(raw=list(start.get("headers", ())))
+        headers.add_vary_header("Accept-Encoding")
+        if self.encoding is not None:
+            self.stream = _StreamCompressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            del headers["content-length"]
+        await self._send({**start, "headers": headers.raw})
@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import REGISTRY
+
+# Route groups matched by path prefix (first match wins); anything else is not limited
+ROUTE_GROUPS: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("admin", ("/admin",)),
+    ("auth", ("/auth", "/login", "/register", "/refresh", "/forgot-password", "/reset-password", "/me")),
+    ("checkout", ("/orders", "/cart")),
+    ("catalog", ("/products", "/uploads")),
+)
+# group -> (concurrent requests, queued requests); override with e.g.
+# CONCURRENCY_LIMITS="auth=8:32,checkout=16:64,catalog=64:256,admin=8:32"
+DEFAULT_LIMITS = {"auth": (8, 32), "checkout": (16, 64), "catalog": (64, 256), "admin": (8, 32)}
+try:
+    QUEUE_TIMEOUT_SEC = float(os.getenv("CONCURRENCY_QUEUE_TIMEOUT_SEC", "5"))
+except Exception:
+    QUEUE_TIMEOUT_SEC = 5.0
+try:
+    RETRY_AFTER_SEC = int(os.getenv("CONCURRENCY_RETRY_AFTER_SEC", "1"))
+except Exception:
+    RETRY_AFTER_SEC = 1
+ADAPTIVE = os.getenv("CONCURRENCY_ADAPTIVE", "0") in {"1", "true", "TRUE"}
+
+
+def parse_limits(spec: str) -> dict[str, tuple[int, int]]:
+    limits = dict(DEFAULT_LIMITS)
+    for part in (spec or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if not name or not value:
+            continue
+        try:
+            limit, _, queue = value.partition(":")
+            limits[name.strip()] = (max(1, int(limit)), max(0, int(queue)) if queue else 4 * int(limit))
+        except ValueError:
+            logging.getLogger("concurrency").warning("Ignoring bad CONCURRENCY_LIMITS entry: %s", part)
+    return limits
+
+
+def route_group(path: str) -> Optional[str]:
+    for name, prefixes in ROUTE_GROUPS:
+        for prefix in prefixes:
+            if path == prefix or path.startswith(prefix + "/"):
+                return name
+    return None
+
+
+class Overloaded(Exception):
+    """Raised by GroupLimiter.acquire when a request is shed; ``reason`` is queue_full or timeout."""
+
+    def __init__(self, group: str, reason: str):
+        super().__init__(group)
+        self.reason = reason
+
+
+class GroupLimiter:
+    """Concurrency limit with a bounded FIFO wait queue for one route group.
+
+    With ``adaptive`` the limit moves between ``min_limit`` and ``max_limit``
+    (AIMD): it grows by one after a window of requests whose average latency
+    stays within ``tolerance`` x the best recent average, and is cut by 10%
+    when latency degrades past that, so queueing moves out of the thread
+    pool and into this (bounded, sheddable) queue.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, adaptive: bool = False,
+                 min_limit: int = 1, tolerance: float = 2.0, window: int = 50):
+        self.name = name
+        self.limit = limit
+        self.max_limit = limit
+        self.min_limit = max(1, min(min_limit, limit))
+        self.queue_size = queue_size
+        self.adaptive = adaptive
+        self.tolerance = tolerance
+        self.window = window
+        self.active = 0
+        self.shed = 0
+        self.timeouts = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._window_total = 0.0
+        self._window_count = 0
+        self._baseline: Optional[float] = None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: float = QUEUE_TIMEOUT_SEC) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            self.shed += 1
+            raise Overloaded(self.name, "queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over just as we gave up: pass it on
+                self._release_slot()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+                raise Overloaded(self.name, "timeout") from None
+            raise
+
+    def _release_slot(self) -> None:
+        while self._waiters and self.active <= self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # hand the slot straight to the next waiter (active count unchanged)
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def release(self, duration: float) -> None:
+        if self.adaptive:
+            self._observe(duration)
+        self._release_slot()
+
+    def _observe(self, duration: float) -> None:
+        self._window_total += duration
+        self._window_count += 1
+        if self._window_count < self.window:
+            return
+        avg = self._window_total / self._window_count
+        self._window_total = 0.0
+        self._window_count = 0
+        if self._baseline is None or avg < self._baseline:
+            self._baseline = avg
+        else:
+            # let the baseline drift up slowly so a permanently slower backend is accepted
+            self._baseline = self._baseline * 0.95 + avg * 0.05
+        if avg <= self._baseline * self.tolerance:
+            self.limit = min(self.max_limit, self.limit + 1)
+            while self._waiters and self.active < self.limit:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    self.active += 1
+                    waiter.set_result(None)
+        else:
+            self.limit = max(self.min_limit, int(self.limit * 0.9))
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "max_limit": self.max_limit,
+            "active": self.active,
+            "queued": self.queued,
+            "queue_size": self.queue_size,
+            "shed": self.shed,
+            "timeouts": self.timeouts,
+        }
+
+
+LIMITERS: dict[str, GroupLimiter] = {
+    name: GroupLimiter(name, limit, queue, adaptive=ADAPTIVE)
+    for name, (limit, queue) in parse_limits(os.getenv("CONCURRENCY_LIMITS", "")).items()
+}
+
+_LIMIT = REGISTRY.gauge("concurrency_limit", "Current concurrency limit per route group", ("group",))
+_ACTIVE = REGISTRY.gauge("concurrency_active", "Requests executing per route group", ("group",))
+_QUEUED = REGISTRY.gauge("concurrency_queued", "Requests waiting for a slot per route group", ("group",))
+_SHED = REGISTRY.counter(
+    "concurrency_shed_total", "Requests rejected with 503 per route group (queue_full or timeout)", ("group", "reason")
+)
+
+
+def _collect() -> None:
+    for name, limiter in LIMITERS.items():
+        _LIMIT.set(name, value=limiter.limit)
+        _ACTIVE.set(name, value=limiter.active)
+        _QUEUED.set(name, value=limiter.queued)
+
+
+REGISTRY.add_collector(_collect)
+
+
+def concurrency_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in LIMITERS.items()}
+
+
+class ConcurrencyLimitMiddleware:
+    """Per-route-group concurrency limits with bounded queues and 503 + Retry-After shedding.
+
+    Requests wait in their group's FIFO queue for at most
+    CONCURRENCY_QUEUE_TIMEOUT_SEC; when the queue is full or the wait times
+    out they are answered immediately with 503, so a saturated group (e.g.
+    bcrypt-heavy logins) cannot take the whole thread pool and stall
+    catalog reads with it. Streaming responses give their slot back with
+    the first streamed chunk, so long-lived streams do not pin a slot.
+    """
+
+    def __init__(self, app: ASGIApp, limiters: dict[str, GroupLimiter] = LIMITERS):
+        self.app = app
+        self.limiters = limiters
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        group = route_group(scope["path"]) if scope["type"] == "http" else None
+        limiter = self.limiters.get(group) if group else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            _SHED.inc(group, e.reason)
+            await _shed(send, group)
+            return
+        start = time.perf_counter()
+        released = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal released
+            # A streamed body (SSE log tail, CSV export) can stay open indefinitely: the
+            # slot guards producing the response, so hand it back once streaming begins
+            if not released and message["type"] == "http.response.body" and message.get("more_body", False):
+                released = True
+                limiter.release(time.perf_counter() - start)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not released:
+                limiter.release(time.perf_counter() - start)
+
+
+async def _shed(send: Send, group: str) -> None:
+    body = json.dumps({"detail": f"Server busy ({group}), please retry"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(RETRY_AFTER_SEC).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body, "more_body": False})
@@ -10,6 +10,14 @@ SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 Base = declarative_base()
 
+
+def sqlite_sidecar_path(filename: str) -> str:
+    """Path for a helper SQLite file next to the app's SQLite database; "" for other databases."""
+    url = engine.url
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        return ""
+    return os.path.join(os.path.dirname(os.path.abspath(url.database)), filename)
+
 # Dependency for FastAPI routes
 from contextlib import contextmanager
 
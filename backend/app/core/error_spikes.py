@@ -0,0 +1,243 @@
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Optional
+
+try:
+    ERROR_WINDOW_SEC = int(os.getenv("ERROR_WINDOW_SEC", "60"))
+except Exception:
+    ERROR_WINDOW_SEC = 60
+try:
+    ERROR_SPIKE_THRESHOLD = int(os.getenv("ERROR_SPIKE_THRESHOLD", "10"))
+except Exception:
+    ERROR_SPIKE_THRESHOLD = 10
+# 5xx from a single route within the window that raise a route-level alert (0 disables)
+try:
+    ROUTE_SPIKE_THRESHOLD = int(os.getenv("ERROR_SPIKE_ROUTE_THRESHOLD", "5"))
+except Exception:
+    ROUTE_SPIKE_THRESHOLD = 5
+
+GLOBAL_KEY = "*"
+
+
+def _alert(key: str, count: int, window_sec: int, threshold: int) -> None:
+    if key == GLOBAL_KEY:
+        logging.getLogger("alert").warning(
+            "error_spike count=%d window=%ds threshold=%d", count, window_sec, threshold
+        )
+    else:
+        logging.getLogger("alert").warning(
+            "error_spike route=%s count=%d window=%ds threshold=%d", key, count, window_sec, threshold
+        )
+
+
+class ErrorSpikeDetector:
+    """Per-process sliding-window 5xx counter, overall and per route, alerting once per window."""
+
+    def __init__(self, window_sec: int = ERROR_WINDOW_SEC, threshold: int = ERROR_SPIKE_THRESHOLD,
+                 route_threshold: int = ROUTE_SPIKE_THRESHOLD):
+        self.window_sec = window_sec
+        self.threshold = threshold
+        self.route_threshold = route_threshold
+        self._times: dict[str, deque] = defaultdict(deque)
+        self._last_alert: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _thresholds(self, route: str):
+        yield GLOBAL_KEY, self.threshold
+        if self.route_threshold > 0:
+            yield route, self.route_threshold
+
+    def record(self, route: str = "-", now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        alerts = []
+        with self._lock:
+            cutoff = now - self.window_sec
+            for key, threshold in self._thresholds(route):
+                times = self._times[key]
+                times.append(now)
+                while times and times[0] < cutoff:
+                    times.popleft()
+                if len(times) >= threshold and now - self._last_alert.get(key, 0.0) > self.window_sec:
+                    self._last_alert[key] = now
+                    alerts.append((key, len(times), threshold))
+            # forget routes that went quiet so the dict stays bounded
+            for key in [k for k, t in self._times.items() if not t or t[-1] < cutoff]:
+                del self._times[key]
+        for key, count, threshold in alerts:
+            _alert(key, count, self.window_sec, threshold)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {k: len(t) for k, t in self._times.items()}
+        return {"shared": False, "window_sec": self.window_sec, "total": counts.pop(GLOBAL_KEY, 0), "routes": counts}
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS error_events (ts REAL NOT NULL, route TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS ix_error_events_ts ON error_events (ts);
+CREATE INDEX IF NOT EXISTS ix_error_events_route_ts ON error_events (route, ts);
+CREATE TABLE IF NOT EXISTS error_alerts (key TEXT PRIMARY KEY, last_alert REAL NOT NULL);
+"""
+
+
+class SharedErrorSpikeDetector(ErrorSpikeDetector):
+    """Sliding-window 5xx counter shared by all workers on the host through a SQLite file.
+
+    ``record`` only appends to an in-memory list; a background thread writes
+    the pending events every ``flush_interval`` seconds, prunes expired ones,
+    counts the window overall and per affected route, and claims each alert
+    with a conditional UPDATE on error_alerts. Only the worker whose UPDATE
+    succeeds logs it, so each spike is alerted once per window host-wide.
+    """
+
+    def __init__(self, path: str, window_sec: int = ERROR_WINDOW_SEC, threshold: int = ERROR_SPIKE_THRESHOLD,
+                 route_threshold: int = ROUTE_SPIKE_THRESHOLD, flush_interval: float = 0.5):
+        super().__init__(window_sec, threshold, route_threshold)
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending: list[tuple[float, str]] = []
+        self._cond = threading.Condition()
+        self._stopped = False
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+        self._thread = threading.Thread(target=self._run, name="error-spike-flusher", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+
+    def record(self, route: str = "-", now: Optional[float] = None) -> None:
+        with self._cond:
+            self._pending.append((time.time() if now is None else now, route))
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                stopped = self._stopped
+            # let a burst of errors accumulate into one transaction
+            if not stopped:
+                time.sleep(self.flush_interval)
+            self.flush()
+            if stopped:
+                return
+
+    def flush(self) -> None:
+        with self._cond:
+            events, self._pending = self._pending, []
+        if not events:
+            return
+        now = max(ts for ts, _ in events)
+        cutoff = now - self.window_sec
+        alerts = []
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("INSERT INTO error_events (ts, route) VALUES (?, ?)", events)
+                conn.execute("DELETE FROM error_events WHERE ts < ?", (cutoff,))
+                keys = {GLOBAL_KEY: self.threshold}
+                if self.route_threshold > 0:
+                    keys.update({route: self.route_threshold for _, route in events})
+                for key, threshold in keys.items():
+                    if key == GLOBAL_KEY:
+                        count = conn.execute("SELECT COUNT(*) FROM error_events WHERE ts >= ?", (cutoff,)).fetchone()[0]
+                    else:
+                        count = conn.execute(
+                            "SELECT COUNT(*) FROM error_events WHERE route = ? AND ts >= ?", (key, cutoff)
+                        ).fetchone()[0]
+                    if count < threshold:
+                        continue
+                    conn.execute("INSERT OR IGNORE INTO error_alerts (key, last_alert) VALUES (?, 0)", (key,))
+                    claimed = conn.execute(
+                        "UPDATE error_alerts SET last_alert = ? WHERE key = ? AND last_alert < ?",
+                        (now, key, now - self.window_sec),
+                    ).rowcount
+                    if claimed:
+                        alerts.append((key, count, threshold))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+        except Exception as e:
+            logging.getLogger("error_spikes").warning("Shared error window update failed: %s", e)
+            # still alert on what this worker saw alone
+            for ts, route in events:
+                super().record(route, ts)
+            return
+        for key, count, threshold in alerts:
+            _alert(key, count, self.window_sec, threshold)
+
+    def stats(self) -> dict:
+        self.flush()
+        cutoff = time.time() - self.window_sec
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT route, COUNT(*) FROM error_events WHERE ts >= ? GROUP BY route", (cutoff,)
+            ).fetchall()
+        finally:
+            conn.close()
+        routes = dict(rows)
+        return {"shared": True, "path": self.path, "window_sec": self.window_sec,
+                "total": sum(routes.values()), "routes": routes}
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=5.0)
+
+
+# Per-process until init_error_spikes() runs at startup, so importing this module touches no files
+ERROR_SPIKES: ErrorSpikeDetector = ErrorSpikeDetector()
+
+
+def init_error_spikes() -> ErrorSpikeDetector:
+    """Shared detector on ERROR_SPIKE_DB (default: next to the app DB); empty keeps counts per process."""
+    global ERROR_SPIKES
+    if isinstance(ERROR_SPIKES, SharedErrorSpikeDetector):
+        return ERROR_SPIKES
+    path = os.getenv("ERROR_SPIKE_DB")
+    if path is None:
+        from .database import sqlite_sidecar_path
+
+        # per process when the app DB is not a SQLite file
+        path = sqlite_sidecar_path("error_spikes.db")
+    if path:
+        try:
+            detector = SharedErrorSpikeDetector(path)
+            atexit.register(detector.stop)
+            ERROR_SPIKES = detector
+        except Exception as e:
+            logging.getLogger("error_spikes").warning("Shared error window unavailable, using per-process: %s", e)
+    return ERROR_SPIKES
+
+
+def shutdown_error_spikes() -> None:
+    """Flush and stop the shared detector (at shutdown); counting falls back to per process."""
+    global ERROR_SPIKES
+    detector, ERROR_SPIKES = ERROR_SPIKES, ErrorSpikeDetector()
+    if isinstance(detector, SharedErrorSpikeDetector):
+        detector.stop()
+
+
+def record_error(route: str = "-") -> None:
+    ERROR_SPIKES.record(route)
+
+
+def error_spikes_stats() -> dict:
+    return ERROR_SPIKES.stats()
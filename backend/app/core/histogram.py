@@ -0,0 +1,63 @@
+import math
+from bisect import bisect_left
+
+# Geometric bucket upper bounds in milliseconds: 0.05 ms .. ~2 min, +20% per bucket
+_GROWTH = 1.2
+_BOUNDS_MS = tuple(0.05 * _GROWTH ** i for i in range(int(math.log(120_000 / 0.05, _GROWTH)) + 2))
+
+
+class LatencyHistogram:
+    """Fixed-bucket streaming latency histogram (constant memory, ~10% quantile error).
+
+    Not thread-safe on its own; callers hold their registry's lock.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect_left(_BOUNDS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile in ms: geometric midpoint of the bucket holding it, capped at max."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                if i >= len(_BOUNDS_MS):
+                    return self.max
+                upper = _BOUNDS_MS[i]
+                lower = _BOUNDS_MS[i - 1] if i else 0.0
+                mid = math.sqrt(lower * upper) if lower else upper / 2
+                return min(mid, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50), 3),
+            "p95_ms": round(self.quantile(0.95), 3),
+            "p99_ms": round(self.quantile(0.99), 3),
+            "max_ms": round(self.max, 3),
+        }
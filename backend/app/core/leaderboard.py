@@ -0,0 +1,199 @@
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import func as sa_func
+from sqlalchemy.orm import Session
+
+from ..models.order import Order
+from ..models.order_item import OrderItem
+
+WINDOWS = {"7d": 7, "30d": 30, "all": None}
+# Daily buckets are only needed for the widest bounded window
+_MAX_WINDOW_DAYS = 30
+# Rebuild from the database periodically so orders written by other workers
+# (or scripts) are picked up; 0 disables the periodic rebuild
+try:
+    REFRESH_SEC = int(os.getenv("LEADERBOARD_REFRESH_SEC", "300"))
+except Exception:
+    REFRESH_SEC = 300
+# Size of the precomputed top list per window (upper bound for ?limit=)
+TOP_K = 50
+
+
+def _as_day(value) -> date:
+    if value is None:
+        return datetime.now(timezone.utc).date()
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class SalesLeaderboard:
+    """Top products by real revenue/units, aggregated from order items.
+
+    Totals are kept per window and updated incrementally on every order; daily
+    buckets let bounded windows (7d/30d) drop expired days without rescanning.
+    The top-k list per window is cached and only recomputed after a change.
+
+    A rebuild reads orders up to the highest committed order id and journals
+    every order recorded meanwhile; journaled orders above that id are
+    re-applied after the swap, so none is lost or counted twice. (SQLite has a
+    single writer, so ids become visible in order.)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # one rebuild at a time; requests that find the data stale wait for it
+        self._load_lock = threading.Lock()
+        self._loaded_at = 0.0
+        # (order_id, day, lines) recorded while a rebuild runs; None when not rebuilding
+        self._journal: Optional[list] = None
+        self._today: Optional[date] = None
+        # day -> product_id -> [units, revenue]
+        self._days: dict[date, dict[int, list]] = {}
+        # window -> product_id -> [units, revenue]
+        self._totals: dict[str, dict[int, list]] = {w: defaultdict(lambda: [0, 0.0]) for w in WINDOWS}
+        # window -> cached top-k (product_id, units, revenue); None when dirty
+        self._top: dict[str, Optional[list]] = {w: None for w in WINDOWS}
+
+    def load(self, db: Session) -> None:
+        """Rebuild all windows from order_items with grouped queries."""
+        with self._load_lock:
+            self._load(db)
+
+    def _load(self, db: Session) -> None:
+        with self._lock:
+            self._journal = []
+        try:
+            today = datetime.now(timezone.utc).date()
+            since = datetime.combine(today - timedelta(days=_MAX_WINDOW_DAYS - 1), datetime.min.time())
+            # the snapshot: orders above this id are left to the journal
+            max_id = db.query(sa_func.max(Order.id)).scalar() or 0
+            revenue = sa_func.coalesce(sa_func.sum(OrderItem.price * OrderItem.quantity), 0)
+            units = sa_func.coalesce(sa_func.sum(OrderItem.quantity), 0)
+            all_rows = (
+                db.query(OrderItem.product_id, units, revenue)
+                .filter(OrderItem.product_id.isnot(None), OrderItem.order_id <= max_id)
+                .group_by(OrderItem.product_id)
+                .all()
+            )
+            day = sa_func.date(Order.created_at)
+            day_rows = (
+                db.query(day.label("day"), OrderItem.product_id, units, revenue)
+                .join(Order, Order.id == OrderItem.order_id)
+                .filter(OrderItem.product_id.isnot(None), Order.created_at >= since, Order.id <= max_id)
+                .group_by("day", OrderItem.product_id)
+                .all()
+            )
+            days: dict[date, dict[int, list]] = defaultdict(dict)
+            for d, pid, u, r in day_rows:
+                days[_as_day(d)][int(pid)] = [int(u or 0), float(r or 0)]
+            with self._lock:
+                self._days = dict(days)
+                self._today = today
+                self._totals["all"] = defaultdict(lambda: [0, 0.0])
+                for pid, u, r in all_rows:
+                    self._totals["all"][int(pid)] = [int(u or 0), float(r or 0)]
+                self._rebuild_bounded()
+                for order_id, order_day, lines in self._journal:
+                    if order_id is None or order_id > max_id:
+                        self._apply(order_day, lines)
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._journal = None
+
+    def _stale(self) -> bool:
+        with self._lock:
+            return self._loaded_at == 0.0 or (REFRESH_SEC > 0 and time.monotonic() - self._loaded_at > REFRESH_SEC)
+
+    def _rebuild_bounded(self) -> None:
+        for window, span in WINDOWS.items():
+            if span is None:
+                continue
+            totals = defaultdict(lambda: [0, 0.0])
+            first = self._today - timedelta(days=span - 1)
+            for d, per_product in self._days.items():
+                if d < first:
+                    continue
+                for pid, (u, r) in per_product.items():
+                    acc = totals[pid]
+                    acc[0] += u
+                    acc[1] += r
+            self._totals[window] = totals
+        self._top = {w: None for w in WINDOWS}
+
+    def _advance(self, today: date) -> None:
+        """Expire day buckets that fell out of the bounded windows."""
+        if self._today is not None and today <= self._today:
+            return
+        self._today = today
+        first_kept = today - timedelta(days=_MAX_WINDOW_DAYS - 1)
+        for d in [d for d in self._days if d < first_kept]:
+            del self._days[d]
+        self._rebuild_bounded()
+
+    def record_order(self, items: Iterable[tuple[int, int, float]], created_at=None,
+                     order_id: Optional[int] = None) -> None:
+        """Apply a freshly committed order's (product_id, quantity, price) lines to every window."""
+        day = _as_day(created_at)
+        lines = list(items)
+        with self._lock:
+            if self._journal is not None:
+                # a rebuild is reading the database; it re-applies this order if its snapshot missed it
+                self._journal.append((order_id, day, lines))
+            if self._loaded_at == 0.0:
+                # not bootstrapped yet; the initial load will include this order
+                return
+            self._apply(day, lines)
+
+    def _apply(self, day: date, lines: list) -> None:
+        self._advance(datetime.now(timezone.utc).date())
+        for product_id, quantity, price in lines:
+            if product_id is None:
+                continue
+            pid = int(product_id)
+            u = int(quantity or 0)
+            r = float(price or 0) * u
+            bucket = self._days.setdefault(day, {}).setdefault(pid, [0, 0.0])
+            bucket[0] += u
+            bucket[1] += r
+            for window, span in WINDOWS.items():
+                if span is not None and day < self._today - timedelta(days=span - 1):
+                    continue
+                acc = self._totals[window][pid]
+                acc[0] += u
+                acc[1] += r
+                self._top[window] = None
+
+    def top(self, db: Session, window: str = "all", limit: int = 6) -> list[tuple[int, int, float]]:
+        """Return up to TOP_K [(product_id, units, revenue)] for the window, best first."""
+        if self._stale():
+            try:
+                with self._load_lock:
+                    # another request may have rebuilt while this one waited
+                    if self._stale():
+                        self._load(db)
+            except Exception as e:
+                logging.getLogger("leaderboard").warning("Leaderboard load failed: %s", e)
+        with self._lock:
+            self._advance(datetime.now(timezone.utc).date())
+            top = self._top[window]
+            if top is None:
+                entries = ((pid, acc[0], acc[1]) for pid, acc in self._totals[window].items())
+                top = heapq.nlargest(TOP_K, entries, key=lambda e: (e[2], e[1]))
+                self._top[window] = top
+            return top[:limit]
+
+
+leaderboard = SalesLeaderboard()
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+
+def entry_search_text(entry: dict) -> str:
+    """Lower-case text used for free-text log filters: message plus extras as key=value."""
+    pairs = " ".join(f"{k}={v}" for k, v in (entry.get("extras") or {}).items())
+    return f"{entry.get('message', '')} {pairs}".lower()
+
+
+def compile_log_filter(text: Optional[str] = None, **exact) -> Callable[[dict], bool]:
+    """Build a predicate over structured log entries once per subscriber.
+
+    ``exact`` maps entry fields to required values (None values are ignored);
+    ``text`` is a whitespace-separated list of case-insensitive terms that must
+    all appear in the message or extras.
+    """
+    fields = tuple((k, v) for k, v in exact.items() if v is not None)
+    terms = tuple(text.lower().split()) if text else ()
+
+    def predicate(entry: dict) -> bool:
+        for k, v in fields:
+            if entry.get(k) != v:
+                return False
+        if terms:
+            haystack = entry_search_text(entry)
+            return all(t in haystack for t in terms)
+        return True
+
+    return predicate
+
+
+class LogSubscriber:
+    """Bounded per-subscriber queue fed from logging threads, drained by one asyncio task.
+
+    When the consumer falls behind and the queue is full, new entries are
+    dropped and counted instead of growing memory or slowing the publisher.
+    """
+
+    def __init__(self, predicate: Callable[[dict], bool], loop: asyncio.AbstractEventLoop, maxsize: int = 1000):
+        self.predicate = predicate
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items: deque = deque()
+        self._lock = threading.Lock()
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def offer(self, entry: dict) -> None:
+        with self._lock:
+            if len(self._items) >= self.maxsize:
+                self.dropped += 1
+                return
+            was_empty = not self._items
+            self._items.append(entry)
+        if was_empty:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                # event loop already closed; subscriber is going away
+                pass
+
+    async def get(self, timeout: float) -> list[dict]:
+        """Wait up to ``timeout`` seconds and return everything queued (possibly [])."""
+        if not self._items:
+            self._ready.clear()
+            if not self._items:
+                try:
+                    await asyncio.wait_for(self._ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return []
+        with self._lock:
+            items = list(self._items)
+            self._items.clear()
+        return items
+
+
+class LogBroker:
+    """Fan-out of new log entries to live subscribers (admin log tail)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: tuple[LogSubscriber, ...] = ()
+
+    def subscribe(self, predicate: Callable[[dict], bool], maxsize: int = 1000) -> LogSubscriber:
+        sub = LogSubscriber(predicate, asyncio.get_running_loop(), maxsize=maxsize)
+        with self._lock:
+            self._subs = (*self._subs, sub)
+        return sub
+
+    def unsubscribe(self, sub: LogSubscriber) -> None:
+        with self._lock:
+            self._subs = tuple(s for s in self._subs if s is not sub)
+
+    def publish(self, entry: dict) -> None:
+        # copy-on-write tuple: no lock needed on the hot path
+        subs = self._subs
+        for sub in subs:
+            try:
+                if sub.predicate(entry):
+                    sub.offer(entry)
+            except Exception:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._subs)
+
+
+LOG_BROKER = LogBroker()
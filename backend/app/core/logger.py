@@ -2,18 +2,150 @@ import logging
 import os
 import sys
 import contextvars
-from logging.handlers import RotatingFileHandler
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import queue
 import re
 from time import perf_counter
 from collections import deque
 from datetime import datetime, timezone
+from .log_stream import LOG_BROKER, entry_search_text
 
 request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
-LOG_BUFFER = deque(maxlen=int(os.getenv("LOG_BUFFER_SIZE", "500")))
+# ASGI scope of the current request; the router fills in scope["route"] once matched
+request_scope_var: contextvars.ContextVar[dict | None] = contextvars.ContextVar("request_scope", default=None)
+
+
+class LogRing:
+    """Fixed-size ring of structured log entries with secondary indexes.
+
+    Every entry gets a monotonically increasing ``id``. For each indexed field
+    the ring keeps value -> deque of ids in append order, so appending and
+    evicting the oldest entry are O(1) per field. Filtered reads walk the
+    shortest matching posting list newest-first and check the remaining
+    fields directly on the entry.
+    """
+
+    INDEXED_FIELDS = ("event", "actor_id", "target", "level", "logger", "request_id")
+
+    def __init__(self, maxlen: int):
+        self.maxlen = max(1, maxlen)
+        self._lock = threading.Lock()
+        self._slots: list = [None] * self.maxlen
+        # lazily computed lower-case search text per slot
+        self._text: list = [None] * self.maxlen
+        self._next_id = 0
+        self._first_id = 0
+        self._index: dict[str, dict] = {f: {} for f in self.INDEXED_FIELDS}
+
+    def __len__(self) -> int:
+        return self._next_id - self._first_id
+
+    def append(self, entry: dict) -> None:
+        with self._lock:
+            seq = self._next_id
+            if len(self) == self.maxlen:
+                self._evict_oldest()
+            entry["id"] = seq
+            slot = seq % self.maxlen
+            self._slots[slot] = entry
+            self._text[slot] = None
+            for field in self.INDEXED_FIELDS:
+                value = entry.get(field)
+                if value is not None:
+                    self._index[field].setdefault(value, deque()).append(seq)
+            self._next_id = seq + 1
+
+    def _evict_oldest(self) -> None:
+        seq = self._first_id
+        slot = seq % self.maxlen
+        old = self._slots[slot]
+        self._slots[slot] = None
+        self._text[slot] = None
+        self._first_id = seq + 1
+        if old is None:
+            return
+        for field in self.INDEXED_FIELDS:
+            value = old.get(field)
+            if value is None:
+                continue
+            postings = self._index[field].get(value)
+            if postings and postings[0] == seq:
+                postings.popleft()
+                if not postings:
+                    del self._index[field][value]
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self)
+            self._slots = [None] * self.maxlen
+            self._text = [None] * self.maxlen
+            self._first_id = self._next_id
+            self._index = {f: {} for f in self.INDEXED_FIELDS}
+            return count
+
+    def _search_text(self, seq: int) -> str:
+        slot = seq % self.maxlen
+        text = self._text[slot]
+        if text is None:
+            text = entry_search_text(self._slots[slot])
+            self._text[slot] = text
+        return text
+
+    def query(
+        self,
+        limit: int = 200,
+        before: int | None = None,
+        text: str | None = None,
+        **filters,
+    ) -> tuple[list[dict], int | None]:
+        """Return (entries newest-first, next cursor) matching all exact-match filters.
+
+        ``filters`` keys must be in INDEXED_FIELDS; None values are ignored.
+        ``text`` is a case-insensitive, whitespace-separated list of terms that
+        must all appear in the message or extras. Pass the returned cursor as
+        ``before`` to continue past the last entry.
+        """
+        filters = {k: v for k, v in filters.items() if v is not None}
+        terms = text.lower().split() if text else []
+        out: list[dict] = []
+        with self._lock:
+            upper = self._next_id if before is None else min(before, self._next_id)
+            if filters:
+                postings = []
+                for field, value in filters.items():
+                    ids = self._index[field].get(value)
+                    if not ids:
+                        return [], None
+                    postings.append(ids)
+                candidates = min(postings, key=len)
+                seqs = (seq for seq in reversed(candidates) if seq < upper)
+            else:
+                seqs = range(upper - 1, self._first_id - 1, -1)
+            for seq in seqs:
+                entry = self._slots[seq % self.maxlen]
+                if any(entry.get(f) != v for f, v in filters.items()):
+                    continue
+                if terms:
+                    haystack = self._search_text(seq)
+                    if not all(t in haystack for t in terms):
+                        continue
+                out.append(entry)
+                if len(out) >= limit:
+                    break
+        next_cursor = out[-1]["id"] if len(out) >= limit and out[-1]["id"] > self._first_id else None
+        return out, next_cursor
+
+
+LOG_BUFFER = LogRing(int(os.getenv("LOG_BUFFER_SIZE", "500")))
 
 
 class RequestIdFilter(logging.Filter):
     def filter(self, record: logging.LogRecord) -> bool:
+        # Keep an id stamped earlier (e.g. by the queue handler on the request thread)
+        if getattr(record, "request_id", None) is not None:
+            return True
         try:
             record.request_id = request_id_var.get()
         except Exception:
@@ -21,18 +153,78 @@ class RequestIdFilter(logging.Filter):
         return True
 
 
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller for long and counts dropped records.
+
+    Formatting, masking and I/O are left to the listener thread: prepare()
+    passes the record through unchanged, so even the message (e.g. a lazy
+    audit message) is only rendered by the listener's handlers. As with any
+    deferred logging, don't mutate objects passed as args after logging them.
+    """
+
+    def __init__(self, q: queue.Queue, policy: str = "newest", block_timeout: float = 0.05):
+        super().__init__(q)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def _count_drop(self) -> None:
+        with self._drop_lock:
+            self.dropped += 1
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if self.policy == "oldest":
+            # make room by discarding the oldest queued record
+            try:
+                self.queue.get_nowait()
+                self._count_drop()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                self._count_drop()
+        elif self.policy == "block":
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+            except queue.Full:
+                self._count_drop()
+        else:
+            self._count_drop()
+
+
+_queue_handler: _DroppingQueueHandler | None = None
+_queue_listener: QueueListener | None = None
+
+
 MASK_PATTERNS = [
     (re.compile(r"([A-Za-z0-9._%+-]+)@([A-Za-z0-9.-]+\.[A-Za-z]{2,})"), "***@***"),
-    (re.compile(r"\b\+?\d[\d\s().-]{7,}\b"), "***"),
+    # phone-like runs: at least 8 digits, optionally separated by spaces ( ) . -
+    (re.compile(r"\b\+?\d(?:[\s().-]*\d){7,}\b", re.ASCII), "***"),
 ]
+# Cheap preconditions, one per pattern: an email needs '@', a phone needs 8+ digits.
+# (Gated separate passes measured faster than a single alternation with CPython's re.)
+_STRIP_DIGITS = str.maketrans("", "", "0123456789")
+_MIN_PHONE_DIGITS = 8
 
 
 def _mask_pii(message: str) -> str:
     try:
-        out = message
-        for pat, repl in MASK_PATTERNS:
-            out = pat.sub(repl, out)
-        return out
+        (email_pat, email_repl), (phone_pat, phone_repl) = MASK_PATTERNS
+        if "@" in message:
+            message = email_pat.sub(email_repl, message)
+        if len(message) - len(message.translate(_STRIP_DIGITS)) >= _MIN_PHONE_DIGITS:
+            message = phone_pat.sub(phone_repl, message)
+        return message
     except Exception:
         return message
 
@@ -53,7 +245,23 @@ def _fmt_message(msg: str) -> str:
     return msg
 
 
+def record_message(record: logging.LogRecord) -> str:
+    """Masked, truncated message for a record, computed once and shared by all handlers."""
+    cached = record.__dict__.get("_masked_message")
+    if cached is None:
+        cached = _fmt_message(record.getMessage())
+        record._masked_message = cached
+    return cached
+
+
+class _PIIFormatter(logging.Formatter):
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = record_message(record)
+        return super().formatMessage(record)
+
+
 def setup_logging(level: int | None = None):
+    global _queue_handler, _queue_listener
     logger = logging.getLogger()
     if logger.handlers:
         return
@@ -68,28 +276,32 @@ def setup_logging(level: int | None = None):
             from pythonjsonlogger import jsonlogger
 
             class _PIIJsonFormatter(jsonlogger.JsonFormatter):
-                def process_log_record(self, log_record):
-                    log_record = super().process_log_record(log_record)
+                def add_fields(self, log_record, record, message_dict):
+                    super().add_fields(log_record, record, message_dict)
                     if "message" in log_record:
-                        log_record["message"] = _fmt_message(log_record["message"])
-                    return log_record
+                        log_record["message"] = record_message(record)
 
-            formatter = _PIIJsonFormatter("%(asctime)s %(levelname)s %(name)s %(request_id)s %(message)s")
+            formatter = _PIIJsonFormatter(
+                "%(asctime)s %(levelname)s %(name)s %(request_id)s %(message)s",
+                reserved_attrs=[*jsonlogger.RESERVED_ATTRS, "_masked_message"],
+            )
         except Exception:
-            formatter = logging.Formatter(
+            formatter = _PIIFormatter(
                 "%(asctime)s level=%(levelname)s logger=%(name)s request_id=%(request_id)s msg=%(message)s"
             )
     else:
-        formatter = logging.Formatter(
+        formatter = _PIIFormatter(
             "%(asctime)s level=%(levelname)s logger=%(name)s request_id=%(request_id)s msg=%(message)s"
         )
 
+    handlers: list[logging.Handler] = []
+
     stream = logging.StreamHandler(sys.stdout)
     stream.setFormatter(formatter)
     stream.addFilter(RequestIdFilter())
+    handlers.append(stream)
 
     logger.setLevel(resolved_level)
-    logger.addHandler(stream)
 
     # Optional file logging
     log_file = os.getenv("LOG_FILE")
@@ -98,7 +310,7 @@ def setup_logging(level: int | None = None):
             file_handler = RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024, backupCount=5)
             file_handler.setFormatter(formatter)
             file_handler.addFilter(RequestIdFilter())
-            logger.addHandler(file_handler)
+            handlers.append(file_handler)
         except Exception as e:
             logging.getLogger("logger").warning("Failed to init file logger: %s", e)
 
@@ -107,10 +319,40 @@ def setup_logging(level: int | None = None):
         buffer_handler = _BufferHandler()
         buffer_handler.setLevel(resolved_level)
         buffer_handler.addFilter(RequestIdFilter())
-        logger.addHandler(buffer_handler)
+        handlers.append(buffer_handler)
     except Exception as e:
         logging.getLogger("logger").warning("Failed to init buffer logger: %s", e)
 
+    # Optional queue mode: callers only enqueue; a background listener thread
+    # does formatting, masking, file writes and buffer appends
+    use_queue = os.getenv("LOG_ASYNC", "0") in {"1", "true", "TRUE"}
+    if use_queue:
+        try:
+            q: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+            _queue_handler = _DroppingQueueHandler(q, policy=os.getenv("LOG_QUEUE_DROP", "newest").lower())
+            # stamp the request id on the calling thread; the listener has no context
+            _queue_handler.addFilter(RequestIdFilter())
+            _queue_listener = QueueListener(q, *handlers, respect_handler_level=True)
+            _queue_listener.start()
+            atexit.register(stop_logging)
+            logger.addHandler(_queue_handler)
+        except Exception as e:
+            _queue_handler = _queue_listener = None
+            for h in handlers:
+                logger.addHandler(h)
+            logging.getLogger("logger").warning("Failed to init queue logging: %s", e)
+    else:
+        for h in handlers:
+            logger.addHandler(h)
+
+    # Durable audit sink (batched SQLite writes)
+    try:
+        from .audit_store import init_audit_store
+
+        init_audit_store()
+    except Exception as e:
+        logging.getLogger("logger").warning("Failed to init audit store: %s", e)
+
     # Suppress overly verbose logs from libraries
     logging.getLogger("uvicorn").setLevel(logging.INFO)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
@@ -127,6 +369,74 @@ def setup_logging(level: int | None = None):
             logging.getLogger("logger").warning("Failed to init Sentry: %s", e)
 
 
+def stop_logging():
+    """Flush and stop the background log listener (queue mode only)."""
+    global _queue_listener
+    listener, _queue_listener = _queue_listener, None
+    if listener is not None:
+        try:
+            listener.stop()
+        except Exception:
+            pass
+
+
+def get_log_queue_stats() -> dict:
+    """Queue-mode counters for monitoring; enabled=False in synchronous mode."""
+    if _queue_handler is None:
+        return {"enabled": False}
+    q = _queue_handler.queue
+    return {
+        "enabled": True,
+        "policy": _queue_handler.policy,
+        "queued": q.qsize(),
+        "capacity": q.maxsize,
+        "dropped": _queue_handler.dropped,
+    }
+
+
+def route_template(scope: dict | None) -> str | None:
+    """Path template of the matched route (e.g. '/products/{product_id}'), or None if unmatched."""
+    if not scope:
+        return None
+    if "_route_template" in scope:
+        return scope["_route_template"]
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return None
+    # Routes of included routers may only know their own suffix; recover the
+    # mount prefix from the concrete path.
+    path = scope.get("path", "")
+    try:
+        rendered = template.format(**scope.get("path_params", {}))
+    except Exception:
+        rendered = None
+    if rendered is not None and path.endswith(rendered):
+        template = path[: len(path) - len(rendered)] + template
+    scope["_route_template"] = template
+    return template
+
+
+def current_route() -> str:
+    """Route template of the current request (e.g. 'GET /products/{product_id}'), or '-'."""
+    scope = request_scope_var.get()
+    template = route_template(scope)
+    if template is None:
+        return "-"
+    return f"{scope.get('method', '')} {template}".strip()
+
+
+def set_request_scope(scope: dict):
+    return request_scope_var.set(scope)
+
+
+def reset_request_scope(token):
+    try:
+        request_scope_var.reset(token)
+    except Exception:
+        pass
+
+
 def set_request_id(value: str):
     return request_id_var.set(value)
 
@@ -140,9 +450,16 @@ def reset_request_id(token):
 
 
 def enable_sql_logging(engine, threshold_ms: int = 200):
-    """Log slow SQL statements over threshold_ms using engine events."""
+    """Log slow SQL statements over threshold_ms using engine events.
+    Every statement is also timed into the per-fingerprint SQL profiler
+    (sql_stats.SQL_STATS) unless SQL_PROFILE=0, and added to the current
+    request's query counter (sql_stats.request_queries_var) when one is set.
+    """
     try:
         from sqlalchemy import event
+        from .sql_stats import SQL_STATS, record_request_query
+
+        profile = os.getenv("SQL_PROFILE", "1") not in {"0", "false", "FALSE"}
 
         @event.listens_for(engine, "before_cursor_execute")
         def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
@@ -155,10 +472,21 @@ def enable_sql_logging(engine, threshold_ms: int = 200):
             except Exception:
                 return
             total_ms = (perf_counter() - start) * 1000.0
+            fp = None
+            if profile:
+                try:
+                    fp = SQL_STATS.record(statement, total_ms, current_route())
+                except Exception:
+                    pass
+            try:
+                record_request_query(statement, total_ms, fp)
+            except Exception:
+                pass
             if total_ms >= threshold_ms:
                 logging.getLogger("sql.slow").warning(
-                    "slow_sql duration_ms=%d stmt=%s",
+                    "slow_sql duration_ms=%d route=%s stmt=%s",
                     int(total_ms),
+                    current_route(),
                     (statement or "").strip().replace("\n", " ")[:1000],
                 )
     except Exception as e:
@@ -174,38 +502,23 @@ class _BufferHandler(logging.Handler):
                 "level": record.levelname,
                 "logger": record.name,
                 "request_id": getattr(record, "request_id", "-"),
-                "message": _fmt_message(record.getMessage()),
+                "message": record_message(record),
             }
-            # If this is an audit logger entry (we use key format like: event=auth.login actor_id=1 target=...)
-            if record.name == "audit":
-                try:
-                    # parse key=value pairs from the message
-                    text = record.getMessage()
-                    parts = text.split()
-                    # first part should be event=...
-                    parsed = {}
-                    for p in parts:
-                        if "=" in p:
-                            k, v = p.split("=", 1)
-                            parsed[k] = v
-                    # attach structured fields
-                    entry["event"] = parsed.get("event")
-                    # common fields
-                    if "actor_id" in parsed:
-                        try:
-                            entry["actor_id"] = int(parsed.get("actor_id"))
-                        except Exception:
-                            entry["actor_id"] = parsed.get("actor_id")
-                    if "target" in parsed:
-                        entry["target"] = parsed.get("target")
-                    # extras: keep other parsed keys
-                    extras = {k: v for k, v in parsed.items() if k not in {"event", "actor_id", "target"}}
-                    entry["extras"] = extras
-                except Exception:
-                    entry["event"] = None
-                    entry["extras"] = {}
+            # Audit entries carry their fields on the record (see audit())
+            event = getattr(record, "event", None)
+            if event is not None:
+                entry["event"] = event
+                actor_id = getattr(record, "actor_id", None)
+                if actor_id is not None:
+                    entry["actor_id"] = actor_id
+                target = getattr(record, "target", None)
+                if target is not None:
+                    entry["target"] = target
+                entry["extras"] = getattr(record, "extras", None) or {}
 
             LOG_BUFFER.append(entry)
+            if len(LOG_BROKER):
+                LOG_BROKER.publish(entry)
         except Exception:
             pass
 
@@ -214,31 +527,90 @@ def get_recent_logs(limit: int = 200):
     if limit <= 0:
         return []
     # Return newest first
-    items = list(LOG_BUFFER)[-limit:]
-    # Attempt to return structured entries; newer first
-    return items[::-1]
+    items, _ = LOG_BUFFER.query(limit=limit)
+    return items
+
+
+def query_logs(limit: int = 200, before: int | None = None, text: str | None = None, **filters):
+    """Filtered, cursor-paged read of the recent log ring (see LogRing.query)."""
+    return LOG_BUFFER.query(limit=limit, before=before, text=text, **filters)
 
 
 def clear_recent_logs():
     """Clear the in-memory recent log buffer and return number of removed items."""
-    count = len(LOG_BUFFER)
-    LOG_BUFFER.clear()
-    return count
+    return LOG_BUFFER.clear()
+
+
+class _AuditMessage:
+    """Lazily rendered logfmt text for an audit record (only built if a handler needs it)."""
+
+    __slots__ = ("event", "fields")
+
+    def __init__(self, event: str, fields: dict):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self) -> str:
+        parts = [f"event={self.event}"]
+        for k, v in self.fields.items():
+            try:
+                sval = str(v).replace("\n", " ")
+            except Exception:
+                sval = "<unrepr>"
+            parts.append(f"{k}={sval}")
+        return " ".join(parts)
+
+
+_AUDIT_SCALARS = (str, int, float, bool, type(None))
+
+
+def _audit_value(value):
+    """JSON-friendly copy of an audit field with PII masked in every string, however deeply nested."""
+    if isinstance(value, str):
+        return _mask_pii(value)
+    if isinstance(value, _AUDIT_SCALARS):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_audit_value(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _audit_value(v) for k, v in value.items()}
+    try:
+        return str(value)
+    except Exception:
+        return "<unrepr>"
+
+
+def user_target(user_id: int) -> str:
+    """Audit ``target`` for events about a user account: a stable id rather than the (masked) email."""
+    return f"user:{user_id}"
 
 
 def audit(event: str, **fields):
     """Log an audit event (security-sensitive operations).
-    Avoid logging secrets. Fields will be rendered as key=value in the message.
+    Avoid logging secrets. Fields travel on the LogRecord as structured
+    attributes (event, actor_id, target, extras); the key=value message text is
+    only rendered for text sinks. ``target`` is an identifier (see user_target())
+    and is kept as given so audit trails can be filtered by it.
     """
     logger = logging.getLogger("audit")
-    # build logfmt-like payload
-    parts = [f"event={event}"]
+    if not logger.isEnabledFor(logging.INFO):
+        return
     for k, v in fields.items():
-        try:
-            sval = str(v).replace("\n", " ")
-        except Exception:
-            sval = "<unrepr>"
         if "password" in k.lower():
-            sval = "***"
-        parts.append(f"{k}={sval}")
-    logger.info(" ".join(parts))
+            fields[k] = "***"
+            continue
+        if k == "target" and (v is None or isinstance(v, (int, str))):
+            continue
+        # mask once here: extras reach the JSON log, ring buffer, SSE tail and audit
+        # store as structured fields, not only through the (already masked) message text
+        fields[k] = _audit_value(v)
+    extras = {k: v for k, v in fields.items() if k != "actor_id" and k != "target"}
+    logger.info(
+        _AuditMessage(event, fields),
+        extra={
+            "event": event,
+            "actor_id": fields.get("actor_id"),
+            "target": fields.get("target"),
+            "extras": extras,
+        },
+    )
@@ -0,0 +1,360 @@
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, doc: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._lock = registry._lock
+        # label values tuple -> value (shape depends on the metric type)
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: tuple) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(v) for v in labels)
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(k), v if not isinstance(v, list) else list(v)] for k, v in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    @staticmethod
+    def merge(a, b):
+        return a + b
+
+    def render(self, samples: dict) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in samples.items()]
+
+
+class Gauge(Counter):
+    """Gauge; ``inc``/``dec`` for live counts, ``set`` for values read at scrape time."""
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Summary(_Metric):
+    """Sum and count only (no quantiles), which stays aggregatable across workers."""
+
+    kind = "summary"
+
+    def observe(self, *labels, value: float) -> None:
+        key = self._key(labels)
+        with self._lock:
+            acc = self._values.get(key)
+            if acc is None:
+                acc = self._values[key] = [0.0, 0]
+            acc[0] += value
+            acc[1] += 1
+
+    @staticmethod
+    def merge(a, b):
+        return [a[0] + b[0], a[1] + b[1]]
+
+    def render(self, samples: dict) -> list[str]:
+        lines = []
+        for k, (total, count) in samples.items():
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, k)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, k)} {_number(count)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram. Values are [per-bucket counts..., +Inf count, sum]."""
+
+    kind = "histogram"
+
+    def __init__(self, registry, name, doc, labelnames=(), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(registry, name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value: float) -> None:
+        key = self._key(labels)
+        i = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            i += 1
+        with self._lock:
+            acc = self._values.get(key)
+            if acc is None:
+                acc = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            acc[i] += 1
+            acc[-1] += value
+
+    @staticmethod
+    def merge(a, b):
+        return [x + y for x, y in zip(a, b)]
+
+    def render(self, samples: dict) -> list[str]:
+        lines = []
+        for k, acc in samples.items():
+            cumulative = 0
+            for bound, c in zip((*self.buckets, math.inf), acc[:-1]):
+                cumulative += c
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, k, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, k)} {_number(acc[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, k)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format.
+
+    Collectors registered with ``add_collector`` run right before every
+    render/flush and are meant for gauges that are cheaper to read on demand
+    (e.g. DB pool usage) than to track.
+
+    Multi-process mode (METRICS_MULTIPROC_DIR set): each worker periodically
+    writes its own values to ``<dir>/metrics-<pid>.json`` and ``render``
+    merges every file, so whichever worker serves /metrics reports totals for
+    all of them. Counters, summaries and histograms of workers that exited are
+    kept (their counts really happened); gauges only include live workers.
+    Empty the directory before starting the server.
+    """
+
+    def __init__(self, multiproc_dir: Optional[str] = None, flush_interval: float = 5.0):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+        self.multiproc_dir = multiproc_dir or None
+        self.flush_interval = flush_interval
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, doc: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(self, name, doc, labelnames))
+
+    def gauge(self, name: str, doc: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(self, name, doc, labelnames))
+
+    def summary(self, name: str, doc: str, labelnames: tuple[str, ...] = ()) -> Summary:
+        return self._register(Summary(self, name, doc, labelnames))
+
+    def histogram(self, name: str, doc: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, doc, labelnames, buckets))
+
+    def add_collector(self, fn: Callable[[], None]) -> None:
+        self._collectors.append(fn)
+
+    def _collect(self) -> None:
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception as e:
+                logging.getLogger("metrics").debug("Metrics collector failed: %s", e)
+
+    def dump(self) -> dict:
+        self._collect()
+        return {name: m.dump() for name, m in self._metrics.items()}
+
+    # -- multi-process -------------------------------------------------
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.multiproc_dir, f"metrics-{pid}.json")
+
+    def flush(self) -> None:
+        """Write this worker's values for other workers' /metrics to merge."""
+        if not self.multiproc_dir:
+            return
+        path = self._path(os.getpid())
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"pid": os.getpid(), "ts": time.time(), "metrics": self.dump()}, f)
+            os.replace(tmp, path)
+        except Exception as e:
+            logging.getLogger("metrics").warning("Metrics flush failed: %s", e)
+
+    def start(self) -> None:
+        """Start the background flusher in multi-process mode (idempotent, per process)."""
+        if not self.multiproc_dir or (self._flusher is not None and self._flusher.is_alive()):
+            return
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(self.flush_interval):
+                self.flush()
+
+        self._flusher = threading.Thread(target=run, name="metrics-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def stop(self) -> None:
+        """Stop the flusher and write this worker's final values."""
+        if self._flusher is None:
+            return
+        self._stop.set()
+        self._flusher.join(timeout=5.0)
+        self._flusher = None
+        self.flush()
+
+    def _worker_dumps(self) -> list[tuple[bool, dict]]:
+        """(is_live, metrics) for every other worker's file."""
+        result = []
+        try:
+            names = os.listdir(self.multiproc_dir)
+        except FileNotFoundError:
+            return result
+        own = os.getpid()
+        for name in names:
+            if not (name.startswith("metrics-") and name.endswith(".json")):
+                continue
+            try:
+                pid = int(name[len("metrics-"):-len(".json")])
+            except ValueError:
+                continue
+            if pid == own:
+                continue
+            try:
+                with open(os.path.join(self.multiproc_dir, name), encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception:
+                continue
+            result.append((_pid_alive(pid), data.get("metrics") or {}))
+        return result
+
+    # -- exposition ----------------------------------------------------
+
+    def render(self) -> str:
+        merged: dict[str, dict[tuple, object]] = {
+            name: {tuple(k): v for k, v in samples} for name, samples in self.dump().items()
+        }
+        if self.multiproc_dir:
+            for live, metrics in self._worker_dumps():
+                for name, samples in metrics.items():
+                    metric = self._metrics.get(name)
+                    if metric is None or (metric.kind == "gauge" and not live):
+                        continue
+                    target = merged.setdefault(name, {})
+                    for k, v in samples:
+                        k = tuple(k)
+                        target[k] = metric.merge(target[k], v) if k in target else v
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.doc}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render(merged.get(name, {})))
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+REGISTRY = MetricsRegistry(
+    multiproc_dir=os.getenv("METRICS_MULTIPROC_DIR", ""),
+    flush_interval=float(os.getenv("METRICS_FLUSH_SEC", "5")),
+)
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route template and status class", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route")
+)
+HTTP_REQUEST_SIZE = REGISTRY.summary(
+    "http_request_size_bytes", "HTTP request body size (Content-Length) by route template", ("method", "route")
+)
+HTTP_RESPONSE_SIZE = REGISTRY.summary(
+    "http_response_size_bytes", "HTTP response body size by route template", ("method", "route")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests currently being served")
+DB_POOL = REGISTRY.gauge("db_pool_connections", "Database connection pool usage", ("state",))
+
+# Label used for requests that matched no route, so 404 scans cannot blow up cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def status_class(code: int) -> str:
+    return f"{code // 100}xx"
+
+
+def observe_request(method: str, route: Optional[str], status: int, duration_s: float,
+                    request_bytes: Optional[int] = None, response_bytes: Optional[int] = None) -> None:
+    """Record one finished request; ``route`` is the matched path template or None."""
+    route = route or UNMATCHED_ROUTE
+    HTTP_REQUESTS.inc(method, route, status_class(status))
+    HTTP_LATENCY.observe(method, route, value=duration_s)
+    if request_bytes is not None:
+        HTTP_REQUEST_SIZE.observe(method, route, value=request_bytes)
+    if response_bytes is not None:
+        HTTP_RESPONSE_SIZE.observe(method, route, value=response_bytes)
+
+
+def register_pool_collector(engine) -> None:
+    """Expose SQLAlchemy pool size/checked-out/checked-in/overflow as gauges at scrape time."""
+    pool = engine.pool
+
+    def collect():
+        for state in ("size", "checkedout", "checkedin", "overflow"):
+            fn = getattr(pool, state, None)
+            if callable(fn):
+                DB_POOL.set(state, value=fn())
+
+    REGISTRY.add_collector(collect)
@@ -0,0 +1,133 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import bcrypt
+
+from .metrics import REGISTRY
+
+# bcrypt cost factor for new hashes; stored hashes with another cost are rehashed on the next login
+try:
+    BCRYPT_ROUNDS = min(31, max(4, int(os.getenv("BCRYPT_ROUNDS", "12"))))
+except Exception:
+    BCRYPT_ROUNDS = 12
+# Processes hashing in parallel; 0 hashes inline in the calling thread
+try:
+    HASH_WORKERS = max(0, int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) // 2))))))
+except Exception:
+    HASH_WORKERS = 1
+
+# bcrypt only takes the first 72 bytes into account
+MAX_PASSWORD_BYTES = 72
+
+_HASH_SECONDS = REGISTRY.histogram(
+    "password_hash_seconds", "Time to hash or check a password, including the wait for a pool worker", ("op",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+_REHASHES = REGISTRY.counter("password_rehash_total", "Stored hashes upgraded to BCRYPT_ROUNDS on login")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_disabled = False
+_pool_lock = threading.Lock()
+
+
+def _encode(password: str) -> bytes:
+    return password.encode("utf-8")[:MAX_PASSWORD_BYTES]
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if HASH_WORKERS <= 0 or _pool_disabled:
+        return None
+    with _pool_lock:
+        if _pool is None and not _pool_disabled:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                # a clean server process that only imports bcrypt, instead of forking
+                # a worker that already runs threads (log queue, metrics, ...)
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload(["bcrypt"])
+            else:
+                ctx = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=ctx)
+        return _pool
+
+
+def _disable_pool(broken: ProcessPoolExecutor) -> None:
+    # a pool that cannot start its workers would fail again on every call; hash inline from now on
+    global _pool, _pool_disabled
+    with _pool_lock:
+        if _pool is broken:
+            _pool, _pool_disabled = None, True
+            logging.getLogger("auth").error("Password hashing pool failed; hashing inline in request threads")
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def warm_up() -> None:
+    """Start the pool workers now (at startup) instead of on the first login."""
+    pool = _get_pool()
+    if pool is None:
+        return
+    try:
+        for future in [pool.submit(bcrypt.gensalt, 4) for _ in range(HASH_WORKERS)]:
+            future.result()
+    except BrokenProcessPool:
+        _disable_pool(pool)
+
+
+def _run(op: str, fn, *args):
+    """Run a bcrypt builtin in the pool (pickled by reference, so workers import nothing but bcrypt)."""
+    start = time.perf_counter()
+    try:
+        pool = _get_pool()
+        if pool is not None:
+            try:
+                return pool.submit(fn, *args).result()
+            except BrokenProcessPool:
+                _disable_pool(pool)
+        return fn(*args)
+    finally:
+        _HASH_SECONDS.observe(op, value=time.perf_counter() - start)
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return _run("hash", bcrypt.hashpw, _encode(password), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def check_password(password: str, hashed: str) -> bool:
+    try:
+        return _run("check", bcrypt.checkpw, _encode(password), hashed.encode("utf-8"))
+    except ValueError:
+        # not a bcrypt hash
+        return False
+
+
+def hash_cost(hashed: str) -> Optional[int]:
+    """Cost factor of a "$2b$12$..." hash, or None if it cannot be parsed."""
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    return hash_cost(hashed) != rounds
+
+
+def verify_and_update(password: str, hashed: str) -> tuple[bool, Optional[str]]:
+    """Check a password; on success also return a new hash when the stored one uses another cost factor."""
+    if not check_password(password, hashed):
+        return False, None
+    if not needs_rehash(hashed):
+        return True, None
+    _REHASHES.inc()
+    return True, hash_password(password)
+
+
+def password_hashing_stats() -> dict:
+    return {"rounds": BCRYPT_ROUNDS, "workers": HASH_WORKERS, "pool_started": _pool is not None,
+            "pool_disabled": _pool_disabled}
@@ -0,0 +1,242 @@
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextvars import Context
+from functools import partial
+from typing import Optional
+
+# Probability that any request is profiled without being asked to (0 disables sampling)
+try:
+    SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+except Exception:
+    SAMPLE_RATE = 0.0
+# Milliseconds between stack samples while a profiled request is running
+try:
+    INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+except Exception:
+    INTERVAL_MS = 5.0
+# Finished profiles kept for download (oldest evicted first)
+try:
+    STORE_SIZE = int(os.getenv("PROFILE_STORE_SIZE", "50"))
+except Exception:
+    STORE_SIZE = 50
+MAX_DEPTH = 128
+
+# Profile of the current request, if it is being profiled; copied into the
+# contexts threadpool workers run sync endpoints in, which is how the sampler
+# finds the threads working for a request
+active_profile_var: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "active_profile", default=None
+)
+
+_SHORT_PREFIXES = sorted({p.rstrip(os.sep) + os.sep for p in (*sys.path, os.getcwd()) if p}, key=len, reverse=True)
+
+
+def _short_path(filename: str) -> str:
+    for prefix in _SHORT_PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RequestProfile:
+    """Wall-clock stack samples of one request, aggregated as collapsed stacks."""
+
+    def __init__(self, request_id: str, scope: dict, reason: str):
+        self.request_id = request_id
+        self.scope = scope
+        self.reason = reason
+        self.method = scope.get("method", "")
+        self.path = scope.get("path", "")
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.started_at = time.time()
+        self.duration_ms: Optional[float] = None
+        self.interval_ms = INTERVAL_MS
+        self.samples = 0
+        # root-first tuple of frame labels -> samples
+        self.stacks: Counter = Counter()
+
+    def owns(self, frame) -> bool:
+        """Whether a thread whose innermost frame is ``frame`` is working for this request.
+
+        Threadpool workers run inside a copy of the request's context, which
+        sits in a local of the worker loop; event-loop frames of the request
+        hold its ASGI scope.
+        """
+        child = None
+        while frame is not None:
+            for value in frame.f_locals.values():
+                if value is self.scope:
+                    return True
+                if isinstance(value, partial):
+                    value = getattr(value.func, "__self__", None)
+                if isinstance(value, tuple):
+                    value = next((v for v in value if isinstance(v, Context)), None)
+                if isinstance(value, Context) and value.get(active_profile_var) is self:
+                    # an idle worker still holds the last context it ran while waiting for work
+                    return not (child is not None and child.f_code.co_name == "get"
+                                and child.f_code.co_filename.endswith("queue.py"))
+            child, frame = frame, frame.f_back
+        return False
+
+    def add_sample(self, frame) -> None:
+        stack = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            stack.append(_frame_label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        self.stacks[tuple(stack)] += 1
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, as consumed by flamegraph.pl and speedscope."""
+        lines = [";".join(stack) + f" {n}" for stack, n in self.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+    def top_functions(self, limit: int = 25) -> list[dict]:
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, n in self.stacks.items():
+            if not stack:
+                continue
+            own[stack[-1]] += n
+            for label in set(stack):
+                total[label] += n
+        samples = sum(self.stacks.values()) or 1
+        return [
+            {
+                "function": label,
+                "self_samples": n,
+                "self_pct": round(100.0 * n / samples, 1),
+                "total_pct": round(100.0 * total[label] / samples, 1),
+            }
+            for label, n in own.most_common(limit)
+        ]
+
+    def summary(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "duration_ms": None if self.duration_ms is None else round(self.duration_ms, 1),
+            "interval_ms": self.interval_ms,
+            "samples": self.samples,
+        }
+
+
+class StackSampler:
+    """Samples all threads while at least one profiled request is running.
+
+    The background thread only exists while there is work, so requests that
+    are not profiled pay nothing beyond the trigger check in the middleware.
+    """
+
+    def __init__(self, interval_ms: float = INTERVAL_MS):
+        self.interval = interval_ms / 1000.0
+        self._lock = threading.Lock()
+        self._active: tuple[RequestProfile, ...] = ()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active = (*self._active, profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active = tuple(p for p in self._active if p is not profile)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                active = self._active
+                if not active:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                for profile in active:
+                    if profile.owns(frame):
+                        profile.add_sample(frame)
+            for profile in active:
+                profile.samples += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class ProfileStore:
+    """Last N finished profiles keyed by request id."""
+
+    def __init__(self, maxlen: int = STORE_SIZE):
+        self.maxlen = maxlen
+        self._lock = threading.Lock()
+        self._items: OrderedDict[str, RequestProfile] = OrderedDict()
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._items.pop(profile.request_id, None)
+            self._items[profile.request_id] = profile
+            while len(self._items) > self.maxlen:
+                self._items.popitem(last=False)
+
+    def get(self, request_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return self._items.get(request_id)
+
+    def list(self) -> list[dict]:
+        with self._lock:
+            items = list(self._items.values())
+        return [p.summary() for p in reversed(items)]
+
+    def clear(self) -> int:
+        with self._lock:
+            n = len(self._items)
+            self._items.clear()
+        return n
+
+
+SAMPLER = StackSampler()
+PROFILE_STORE = ProfileStore()
+
+
+def should_sample() -> bool:
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def start_profile(request_id: str, scope: dict, reason: str):
+    """Begin sampling the current request; returns (profile, context token)."""
+    profile = RequestProfile(request_id, scope, reason)
+    token = active_profile_var.set(profile)
+    SAMPLER.start(profile)
+    return profile, token
+
+
+def finish_profile(profile: RequestProfile, token, status: Optional[int], duration_ms: float, route: Optional[str]) -> None:
+    SAMPLER.stop(profile)
+    try:
+        active_profile_var.reset(token)
+    except Exception:
+        pass
+    profile.status = status
+    profile.duration_ms = duration_ms
+    profile.route = route
+    # the scope is only needed to attribute samples; don't keep it alive in the store
+    profile.scope = {}
+    PROFILE_STORE.add(profile)
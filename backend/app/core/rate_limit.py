@@ -0,0 +1,264 @@
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+from .metrics import REGISTRY
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") in {"1", "true", "TRUE"}
+# Buckets kept in memory per worker; the least recently used are dropped beyond this
+try:
+    MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+except Exception:
+    MAX_BUCKETS = 100000
+# Use the first X-Forwarded-For hop as the client IP (only behind a proxy that sets it)
+TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "0") in {"1", "true", "TRUE"}
+
+# endpoint -> "key=capacity/period_sec,..." where key is ip or email
+DEFAULT_RULES = {
+    "login": "ip=20/60,email=10/300",
+    "register": "ip=5/600",
+    "forgot_password": "ip=5/600,email=3/900",
+}
+
+
+@dataclass(frozen=True)
+class Rule:
+    key: str
+    capacity: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        """Tokens refilled per second."""
+        return self.capacity / self.period
+
+
+def parse_rules(spec: str) -> list[Rule]:
+    rules = []
+    for part in (spec or "").split(","):
+        key, _, value = part.strip().partition("=")
+        if not key or not value:
+            continue
+        try:
+            capacity, _, period = value.partition("/")
+            rules.append(Rule(key.strip(), max(1, int(capacity)), max(1.0, float(period))))
+        except ValueError:
+            logging.getLogger("rate_limit").warning("Ignoring bad rate limit rule: %s", part)
+    return rules
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    limit: int
+    remaining: int
+    # seconds until the bucket is full again
+    reset: float
+    # seconds until the next token (only meaningful when not allowed)
+    retry_after: float
+
+
+def _take(tokens: float, updated: float, rule: Rule, now: float) -> tuple[float, Decision]:
+    tokens = min(rule.capacity, tokens + (now - updated) * rule.rate)
+    allowed = tokens >= 1.0
+    if allowed:
+        tokens -= 1.0
+    decision = Decision(
+        allowed=allowed,
+        limit=rule.capacity,
+        remaining=int(tokens),
+        reset=(rule.capacity - tokens) / rule.rate,
+        retry_after=0.0 if allowed else (1.0 - tokens) / rule.rate,
+    )
+    return tokens, decision
+
+
+class MemoryBucketStore:
+    """Token buckets in an LRU dict: O(1) per take, idle buckets evicted as new ones arrive.
+
+    A bucket that has refilled completely is indistinguishable from a new
+    one, so idle buckets at the LRU end are dropped once they are full;
+    MAX_BUCKETS caps memory under a flood of distinct keys.
+    """
+
+    def __init__(self, max_buckets: int = MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._lock = threading.Lock()
+        # key -> [tokens, updated, full_at]
+        self._buckets: OrderedDict[str, list] = OrderedDict()
+
+    def take(self, key: str, rule: Rule, now: float) -> Decision:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._evict(now)
+                bucket = [float(rule.capacity), now, now]
+                self._buckets[key] = bucket
+            else:
+                self._buckets.move_to_end(key)
+            tokens, decision = _take(bucket[0], bucket[1], rule, now)
+            bucket[0], bucket[1], bucket[2] = tokens, now, now + decision.reset
+            return decision
+
+    def _evict(self, now: float) -> None:
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket[2] > now and len(self._buckets) < self.max_buckets:
+                break
+            del self._buckets[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._buckets)
+        return {"backend": "memory", "buckets": size, "max_buckets": self.max_buckets}
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS ix_rate_buckets_full_at ON rate_buckets (full_at);
+"""
+
+
+class SqliteBucketStore(MemoryBucketStore):
+    """Token buckets shared by all workers on the host through a SQLite file.
+
+    Each take is one short BEGIN IMMEDIATE transaction; full buckets are
+    pruned every ``prune_every`` takes. If the file cannot be used the
+    take falls back to this worker's in-memory buckets.
+    """
+
+    def __init__(self, path: str, max_buckets: int = MAX_BUCKETS, prune_every: int = 1000):
+        super().__init__(max_buckets)
+        self.path = path
+        self.prune_every = prune_every
+        self._takes = 0
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=2.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def take(self, key: str, rule: Rule, now: float) -> Decision:
+        try:
+            with self._db_lock:
+                return self._take_shared(key, rule, now)
+        except sqlite3.Error as e:
+            logging.getLogger("rate_limit").warning("Shared rate limit store failed, using per-process: %s", e)
+            return super().take(key, rule, now)
+
+    def _take_shared(self, key: str, rule: Rule, now: float) -> Decision:
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (float(rule.capacity), now)
+            tokens, decision = _take(tokens, updated, rule, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + decision.reset),
+            )
+            self._takes += 1
+            if self._takes % self.prune_every == 0:
+                conn.execute("DELETE FROM rate_buckets WHERE full_at <= ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return decision
+
+    def stats(self) -> dict:
+        try:
+            with self._db_lock:
+                size = self._conn.execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        return {"backend": "sqlite", "path": self.path, "buckets": size, "local": super().stats()["buckets"]}
+
+
+def init_bucket_store() -> MemoryBucketStore:
+    """Shared store on RATE_LIMIT_DB when set, otherwise buckets per process."""
+    path = os.getenv("RATE_LIMIT_DB", "")
+    if path:
+        try:
+            return SqliteBucketStore(path)
+        except Exception as e:
+            logging.getLogger("rate_limit").warning("Shared rate limit store unavailable, using per-process: %s", e)
+    return MemoryBucketStore()
+
+
+RULES: dict[str, list[Rule]] = {
+    endpoint: parse_rules(os.getenv("RATE_LIMIT_" + endpoint.upper(), spec))
+    for endpoint, spec in DEFAULT_RULES.items()
+}
+BUCKETS = init_bucket_store()
+
+_LIMITED = REGISTRY.counter("rate_limited_total", "Requests rejected with 429 by endpoint and bucket key", ("endpoint", "key"))
+
+
+def client_ip(request: Request) -> str:
+    if TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for", "")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "-"
+
+
+def _bucket_key(endpoint: str, rule: Rule, value: str) -> str:
+    if rule.key == "email":
+        # keep addresses out of the (possibly on-disk) store
+        value = hashlib.blake2b(value.strip().lower().encode("utf-8"), digest_size=12).hexdigest()
+    return f"{endpoint}:{rule.key}:{value}"
+
+
+def _headers(decision: Decision) -> dict[str, str]:
+    return {
+        "RateLimit-Limit": str(decision.limit),
+        "RateLimit-Remaining": str(decision.remaining),
+        "RateLimit-Reset": str(math.ceil(decision.reset)),
+    }
+
+
+def rate_limit(request: Request, response: Response, endpoint: str, email: Optional[str] = None) -> None:
+    """Take one token from each of the endpoint's buckets (client IP, target email).
+
+    Raises 429 with Retry-After when any bucket is empty; otherwise sets
+    RateLimit-* headers for the most constrained bucket on ``response``.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return
+    values = {"ip": client_ip(request), "email": email}
+    now = time.time()
+    tightest: Optional[Decision] = None
+    for rule in RULES.get(endpoint, ()):
+        value = values.get(rule.key)
+        if not value:
+            continue
+        decision = BUCKETS.take(_bucket_key(endpoint, rule, value), rule, now)
+        if not decision.allowed:
+            _LIMITED.inc(endpoint, rule.key)
+            headers = _headers(decision)
+            headers["Retry-After"] = str(max(1, math.ceil(decision.retry_after)))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many attempts, please retry later",
+                headers=headers,
+            )
+        if tightest is None or decision.remaining < tightest.remaining:
+            tightest = decision
+    if tightest is not None:
+        response.headers.update(_headers(tightest))
+
+
+def rate_limit_stats() -> dict:
+    return {
+        "enabled": RATE_LIMIT_ENABLED,
+        "rules": {ep: [f"{r.key}={r.capacity}/{r.period:g}" for r in rules] for ep, rules in RULES.items()},
+        **BUCKETS.stats(),
+    }
@@ -0,0 +1,160 @@
+import itertools
+import logging
+import time
+import uuid
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import profiler
+from .auth_context import user_is_admin, verify_token
+from .error_spikes import record_error
+from .logger import current_route, reset_request_id, reset_request_scope, route_template, set_request_id, set_request_scope
+from .metrics import HTTP_IN_FLIGHT, observe_request
+from .sql_stats import reset_request_queries, start_request_queries
+
+# Client-supplied X-Request-ID values longer than this are replaced
+MAX_REQUEST_ID_LEN = 128
+
+# Unique per process start, so ids from different workers and restarts never collide
+_ID_PREFIX = uuid.uuid4().hex[:8]
+_id_counter = itertools.count(1)
+
+
+def new_request_id() -> str:
+    return f"req-{_ID_PREFIX}-{next(_id_counter):x}"
+
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for key, value in scope.get("headers") or ():
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _is_admin_token(authorization: str | None) -> bool:
+    """Whether a bearer token belongs to an admin (only checked when profiling is asked for).
+
+    Same cached checks as require_admin: verify_token and user_is_admin.
+    """
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return False
+    try:
+        user_id = int(verify_token(authorization[7:]).get("sub"))
+    except Exception:
+        return False
+    return bool(user_is_admin(user_id))
+
+
+class RequestContextMiddleware:
+    """Per-request context, access log, timing, metrics and 5xx spike detection as plain ASGI.
+
+    Sets the request id / scope / SQL counter context variables, optionally
+    profiles the request, adds X-Request-ID and X-DB-* headers to the
+    response start, and writes one access log line when the last body chunk
+    has been sent, with both time to first byte and total time. Response
+    bodies are passed through untouched, so streaming responses keep
+    streaming.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.logger = logging.getLogger("request")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        req_id = _header(scope, b"x-request-id")
+        if not req_id or len(req_id) > MAX_REQUEST_ID_LEN:
+            req_id = new_request_id()
+        token = set_request_id(req_id)
+        scope_token = set_request_scope(scope)
+        queries, queries_token = start_request_queries()
+        profile = profile_token = None
+        # profiling is opt-in per request: an admin's X-Profile header or random sampling
+        if _header(scope, b"x-profile") is not None:
+            if await run_in_threadpool(_is_admin_token, _header(scope, b"authorization")):
+                profile, profile_token = profiler.start_profile(req_id, scope, "header")
+        elif profiler.should_sample():
+            profile, profile_token = profiler.start_profile(req_id, scope, "sampled")
+
+        start = time.perf_counter()
+        first_byte = None
+        status = None
+        request_bytes = 0
+        response_bytes = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal first_byte, status, response_bytes
+            if message["type"] == "http.response.start":
+                first_byte = time.perf_counter()
+                status = message["status"]
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-request-id", req_id.encode("latin-1")))
+                headers.append((b"x-db-queries", str(queries.count).encode()))
+                headers.append((b"x-db-time", f"{queries.total_ms:.1f}".encode()))
+                if profile is not None:
+                    headers.append((b"x-profile-id", req_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        error = None
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            end = time.perf_counter()
+            # an exception before the response started becomes a 500 from the error middleware
+            final_status = status if status is not None else 500
+            try:
+                self._finish(scope, queries, profile, profile_token, final_status, start, first_byte, end,
+                             request_bytes, response_bytes, error)
+            finally:
+                # even if metrics, the profiler or logging failed: never leak this request's context
+                reset_request_queries(queries_token)
+                reset_request_id(token)
+                reset_request_scope(scope_token)
+
+    def _finish(self, scope, queries, profile, profile_token, status, start, first_byte, end,
+                request_bytes, response_bytes, error) -> None:
+        total_ms = (end - start) * 1000
+        ttfb_ms = ((first_byte or end) - start) * 1000
+        method = scope.get("method", "")
+        path = scope.get("path", "")
+        observe_request(method, route_template(scope), status, end - start, request_bytes, response_bytes)
+        if profile is not None:
+            profiler.finish_profile(profile, profile_token, status, total_ms, current_route())
+        ip = _header(scope, b"x-forwarded-for") or (scope["client"][0] if scope.get("client") else "-")
+        ua = _header(scope, b"user-agent") or "-"
+        if error is None:
+            self.logger.info(
+                "%s %s -> %s (%d ms) ttfb_ms=%d bytes=%d db_queries=%d db_ms=%.1f ip=%s ua=%s",
+                method, path, status, total_ms, ttfb_ms, response_bytes, queries.count, queries.total_ms, ip, ua,
+            )
+        else:
+            self.logger.error(
+                "%s %s -> %s (%d ms) db_queries=%d db_ms=%.1f error=%s ip=%s ua=%s",
+                method, path, status, total_ms, queries.count, queries.total_ms, error, ip, ua,
+                exc_info=error,
+            )
+        for fp, n in queries.repeated():
+            logging.getLogger("sql.n_plus_one").warning(
+                "n_plus_one route=%s count=%d stmt=%s", current_route(), n, fp[:500]
+            )
+        if status >= 500:
+            record_error(current_route())
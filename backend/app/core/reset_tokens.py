@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from .auth import generate_reset_token
+from .database import engine
+from ..models.password_reset_token import PasswordResetToken
+from ..models.user import User
+
+try:
+    RESET_TOKEN_TTL_MINUTES = int(os.getenv("RESET_TOKEN_TTL_MINUTES", "60"))
+except Exception:
+    RESET_TOKEN_TTL_MINUTES = 60
+# Seconds between bulk deletes of expired tokens (0 disables the sweeper)
+try:
+    SWEEP_SEC = int(os.getenv("RESET_TOKEN_SWEEP_SEC", "600"))
+except Exception:
+    SWEEP_SEC = 600
+
+
+def hash_reset_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def issue_reset_token(db: Session, user_id: int) -> str:
+    """Create a reset token for a user, replacing any earlier one; returns the plaintext token (never stored)."""
+    token = generate_reset_token()
+    revoke_reset_tokens(db, user_id)
+    db.add(PasswordResetToken(
+        token_hash=hash_reset_token(token),
+        user_id=user_id,
+        expires_at=datetime.now(timezone.utc) + timedelta(minutes=RESET_TOKEN_TTL_MINUTES),
+    ))
+    db.commit()
+    return token
+
+
+def consume_reset_token(db: Session, token: str) -> Optional[User]:
+    """User owning a valid, unexpired token (primary-key lookup); all their reset tokens are deleted.
+
+    On success the caller commits, so the token is only spent together with the password change;
+    a token that turns out to belong to no current user is deleted and committed here.
+    """
+    valid = db.query(PasswordResetToken).filter(
+        PasswordResetToken.token_hash == hash_reset_token(token),
+        PasswordResetToken.expires_at > datetime.now(timezone.utc),
+    )
+    row = valid.with_entities(PasswordResetToken.user_id, PasswordResetToken.created_at).first()
+    # deleting the token row is what claims it, so a concurrent reset with the same token gets nothing
+    if row is None or not valid.delete(synchronize_session=False):
+        return None
+    revoke_reset_tokens(db, row.user_id)
+    user = db.query(User).filter(User.id == row.user_id).first()
+    # SQLite reuses the ids of deleted users: a token older than its user belonged to someone else
+    if user is None or _utc(user.created_at) > _utc(row.created_at):
+        db.commit()
+        return None
+    return user
+
+
+def revoke_reset_tokens(db: Session, user_id: int) -> None:
+    """Delete a user's outstanding tokens (call before deleting the user; the caller commits).
+
+    SQLite does not enforce the ON DELETE CASCADE here, since foreign keys are not switched on.
+    """
+    db.query(PasswordResetToken).filter(PasswordResetToken.user_id == user_id).delete(synchronize_session=False)
+
+
+def _utc(value: Optional[datetime]) -> datetime:
+    if value is None:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def purge_expired_reset_tokens(db: Session) -> int:
+    deleted = (
+        db.query(PasswordResetToken)
+        .filter(PasswordResetToken.expires_at <= datetime.now(timezone.utc))
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+def migrate_legacy_reset_tokens(db: Session) -> int:
+    """Move plaintext users.reset_token values into password_reset_tokens (hashed) and clear them."""
+    rows = (
+        db.query(User.id, User.reset_token, User.reset_token_expires)
+        .filter(User.reset_token.isnot(None))
+        .all()
+    )
+    for user_id, token, expires in rows:
+        if expires is not None and expires.tzinfo is None:
+            expires = expires.replace(tzinfo=timezone.utc)
+        if expires is not None and expires > datetime.now(timezone.utc):
+            db.merge(PasswordResetToken(token_hash=hash_reset_token(token), user_id=user_id, expires_at=expires))
+    if rows:
+        db.query(User).filter(User.reset_token.isnot(None)).update(
+            {User.reset_token: None, User.reset_token_expires: None}, synchronize_session=False
+        )
+    db.commit()
+    return len(rows)
+
+
+class ResetTokenSweeper:
+    """Background thread that bulk-deletes expired reset tokens every ``interval`` seconds."""
+
+    def __init__(self, interval: int = SWEEP_SEC):
+        self.interval = interval
+        self.last_deleted = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sweep(self) -> int:
+        with Session(engine) as db:
+            self.last_deleted = purge_expired_reset_tokens(db)
+        return self.last_deleted
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logging.getLogger("reset_tokens").warning("Reset token sweep failed: %s", e)
+
+        self._thread = threading.Thread(target=run, name="reset-token-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+        self._thread = None
+
+
+RESET_TOKEN_SWEEPER = ResetTokenSweeper()
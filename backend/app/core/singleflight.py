@@ -0,0 +1,136 @@
+import asyncio
+import os
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import REGISTRY
+
+# Path prefixes of public, idempotent GET endpoints whose concurrent identical requests are coalesced
+PATH_PREFIXES = tuple(p.strip() for p in os.getenv("SINGLEFLIGHT_PATHS", "/products").split(",") if p.strip())
+# Responses larger than this are not shared (followers then run the request themselves)
+try:
+    MAX_BYTES = int(os.getenv("SINGLEFLIGHT_MAX_BYTES", str(8 * 1024 * 1024)))
+except Exception:
+    MAX_BYTES = 8 * 1024 * 1024
+
+SINGLEFLIGHT = REGISTRY.counter(
+    "http_singleflight_total",
+    "Coalescable GETs by outcome: leader (executed), coalesced (shared a leader's result), fallback (executed after a failed share)",
+    ("result",),
+)
+
+
+def request_key(scope: Scope) -> str:
+    """Coalescing key: path plus query parameters in canonical order."""
+    params = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+    return scope["path"] + "?" + urlencode(sorted(params))
+
+
+# Requests currently executing per key (one event loop per worker, so no lock is needed)
+_inflight: dict[str, asyncio.Future] = {}
+_counts = {"leader": 0, "coalesced": 0, "fallback": 0}
+
+
+def _copy_start(message: Message) -> Message:
+    return {**message, "headers": list(message.get("headers", []))}
+
+
+class _Recorder:
+    """Forwards the leader's response to its client while keeping a copy for followers."""
+
+    def __init__(self, send: Send):
+        self._send = send
+        self.start: Optional[Message] = None
+        self.chunks: list[bytes] = []
+        self.size = 0
+        self.shareable = True
+        self.complete = False
+
+    async def send(self, message: Message) -> None:
+        if self.shareable:
+            if message["type"] == "http.response.start":
+                # copy before outer middleware (CORS, compression) edits the headers in place
+                self.start = _copy_start(message)
+                # per-client state must never be handed to other clients
+                if any(k.lower() == b"set-cookie" for k, _ in message.get("headers", ())):
+                    self.shareable = False
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                self.size += len(body)
+                if self.size > MAX_BYTES:
+                    self.shareable = False
+                    self.chunks = []
+                else:
+                    self.chunks.append(body)
+                if not message.get("more_body", False):
+                    self.complete = True
+        await self._send(message)
+
+
+class SingleFlightMiddleware:
+    """Coalesces identical concurrent anonymous GETs under PATH_PREFIXES into one execution.
+
+    The first request for a key (path + sorted query) runs normally; requests
+    for the same key that arrive while it is in flight wait for it and are
+    answered with a copy of its status, headers and body. Nothing is cached
+    once the leader finishes. If the leader fails, is cancelled or its
+    response is not shareable, waiting requests run the app themselves.
+
+    Keep this innermost (before CORS) so per-request headers such as CORS,
+    request id and compression are still applied to every follower.
+    """
+
+    def __init__(self, app: ASGIApp, prefixes: tuple[str, ...] = PATH_PREFIXES):
+        self.app = app
+        self.prefixes = prefixes
+
+    def _eligible(self, scope: Scope) -> bool:
+        if scope["type"] != "http" or scope.get("method") != "GET" or not self.prefixes:
+            return False
+        if not scope["path"].startswith(self.prefixes):
+            return False
+        return not any(k == b"authorization" or k == b"cookie" for k, _ in scope.get("headers") or ())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self._eligible(scope):
+            await self.app(scope, receive, send)
+            return
+        key = request_key(scope)
+        pending = _inflight.get(key)
+        if pending is not None:
+            try:
+                start, chunks = await asyncio.shield(pending)
+            except Exception:
+                start = None
+            if start is not None:
+                _counts["coalesced"] += 1
+                SINGLEFLIGHT.inc("coalesced")
+                # each follower gets its own headers list for the outer middleware to modify
+                await send(_copy_start(start))
+                await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": False})
+                return
+            _counts["fallback"] += 1
+            SINGLEFLIGHT.inc("fallback")
+            await self.app(scope, receive, send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key] = future
+        _counts["leader"] += 1
+        SINGLEFLIGHT.inc("leader")
+        recorder = _Recorder(send)
+        try:
+            await self.app(scope, receive, recorder.send)
+        finally:
+            if _inflight.get(key) is future:
+                del _inflight[key]
+            # followers treat None as "run it yourself"
+            shared = (recorder.start, recorder.chunks) if recorder.shareable and recorder.complete else (None, None)
+            if not future.done():
+                future.set_result(shared)
+
+
+def singleflight_stats() -> dict:
+    return {"paths": list(PATH_PREFIXES), "in_flight": len(_inflight), **_counts}
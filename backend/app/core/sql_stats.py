@@ -0,0 +1,191 @@
+import contextvars
+import os
+import re
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+from .histogram import LatencyHistogram
+
+# Distinct fingerprints tracked before new ones are folded into OTHER
+MAX_FINGERPRINTS = int(os.getenv("SQL_STATS_MAX_FINGERPRINTS", "2000"))
+# Distinct calling routes remembered per fingerprint
+MAX_ROUTES_PER_FINGERPRINT = 10
+OTHER = "<other>"
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%\(\w+\)s|:\w+|\$\d+|%s")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_RE = re.compile(r"(VALUES\s*\([^)]*\))(?:\s*,\s*\([^)]*\))+", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Normalize a SQL statement so executions differing only in literals group together."""
+    fp = _STRING_RE.sub("?", statement or "")
+    fp = _NUMBER_RE.sub("?", fp)
+    fp = _PARAM_RE.sub("?", fp)
+    fp = _IN_LIST_RE.sub("(?+)", fp)
+    fp = _VALUES_RE.sub(r"\1, ...", fp)
+    fp = _SPACE_RE.sub(" ", fp).strip()
+    return fp[:2000]
+
+
+class _FingerprintStats:
+    __slots__ = ("hist", "routes")
+
+    def __init__(self):
+        self.hist = LatencyHistogram()
+        self.routes: dict[str, int] = {}
+
+
+class SqlStats:
+    """Always-on per-fingerprint SQL timing: count, total, p50/p95/p99 and calling routes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: dict[str, _FingerprintStats] = {}
+
+    def record(self, statement: str, duration_ms: float, route: str = "-") -> str:
+        fp = fingerprint(statement)
+        with self._lock:
+            stats = self._stats.get(fp)
+            if stats is None:
+                if len(self._stats) >= MAX_FINGERPRINTS:
+                    fp = OTHER
+                    stats = self._stats.get(fp)
+                if stats is None:
+                    stats = self._stats[fp] = _FingerprintStats()
+            stats.hist.observe(duration_ms)
+            routes = stats.routes
+            if route in routes:
+                routes[route] += 1
+            elif len(routes) < MAX_ROUTES_PER_FINGERPRINT:
+                routes[route] = 1
+        return fp
+
+    def snapshot(self, sort: str = "total", limit: int = 50) -> list[dict]:
+        with self._lock:
+            rows = [
+                {"fingerprint": fp, **s.hist.snapshot(), "routes": dict(s.routes)}
+                for fp, s in self._stats.items()
+            ]
+        key = {
+            "total": "total_ms",
+            "count": "count",
+            "mean": "mean_ms",
+            "p95": "p95_ms",
+            "p99": "p99_ms",
+            "max": "max_ms",
+        }.get(sort, "total_ms")
+        rows.sort(key=lambda r: r[key], reverse=True)
+        for r in rows:
+            r["routes"] = dict(sorted(r["routes"].items(), key=lambda kv: kv[1], reverse=True))
+        return rows[:limit]
+
+    def reset(self) -> int:
+        with self._lock:
+            n = len(self._stats)
+            self._stats = {}
+        return n
+
+
+SQL_STATS = SqlStats()
+
+
+# Same fingerprint executed more than this many times in one request is
+# reported as a likely N+1 pattern; 0 disables the warning
+try:
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10"))
+except Exception:
+    N_PLUS_ONE_THRESHOLD = 10
+
+
+class RequestQueries:
+    """Statements and DB time accumulated by one request (or one count_queries block)."""
+
+    __slots__ = ("count", "total_ms", "by_fingerprint")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.by_fingerprint: dict[str, int] = {}
+
+    def record(self, fp: str, duration_ms: float) -> None:
+        self.count += 1
+        self.total_ms += duration_ms
+        self.by_fingerprint[fp] = self.by_fingerprint.get(fp, 0) + 1
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int]]:
+        """Fingerprints executed more than ``threshold`` times, most frequent first."""
+        if threshold <= 0:
+            return []
+        hits = [(fp, n) for fp, n in self.by_fingerprint.items() if n > threshold]
+        hits.sort(key=lambda kv: kv[1], reverse=True)
+        return hits
+
+
+# Counter of the current request; the object is shared with threadpool workers
+# that copy the context, so sync endpoints add to the same counter
+request_queries_var: contextvars.ContextVar[RequestQueries | None] = contextvars.ContextVar(
+    "request_queries", default=None
+)
+
+
+def start_request_queries():
+    """Attach a fresh counter to the current context; returns (counter, reset token)."""
+    counter = RequestQueries()
+    return counter, request_queries_var.set(counter)
+
+
+def reset_request_queries(token) -> None:
+    try:
+        request_queries_var.reset(token)
+    except Exception:
+        pass
+
+
+def record_request_query(statement: str, duration_ms: float, fp: str | None = None) -> None:
+    counter = request_queries_var.get()
+    if counter is not None:
+        if fp is None or fp == OTHER:
+            fp = fingerprint(statement)
+        counter.record(fp, duration_ms)
+
+
+@contextmanager
+def count_queries():
+    """Count statements run in this context, e.g. around a service call in a script or test.
+
+        with count_queries() as q:
+            list_orders(db=db, current=user)
+        assert q.count <= 3, q.by_fingerprint
+    """
+    counter, token = start_request_queries()
+    try:
+        yield counter
+    finally:
+        reset_request_queries(token)
+
+
+def assert_query_budget(response, max_queries: int, max_ms: float | None = None) -> None:
+    """Fail when an HTTP response reports more statements (or DB time) than budgeted.
+
+    Works on any response carrying the X-DB-Queries / X-DB-Time headers set by
+    the request middleware, e.g. from fastapi.testclient.TestClient:
+
+        assert_query_budget(client.get("/cart", headers=auth), max_queries=3)
+    """
+    queries = int(response.headers["X-DB-Queries"])
+    assert queries <= max_queries, (
+        f"{response.request.method} {response.request.url.path}: "
+        f"{queries} queries, budget {max_queries}"
+    )
+    if max_ms is not None:
+        db_ms = float(response.headers["X-DB-Time"])
+        assert db_ms <= max_ms, (
+            f"{response.request.method} {response.request.url.path}: "
+            f"{db_ms:.1f} ms in DB, budget {max_ms:.1f} ms"
+        )
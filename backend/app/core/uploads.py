@@ -0,0 +1,242 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+from anyio import to_thread
+from fastapi import HTTPException, Request, status
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+UPLOAD_DIR = "backend/uploads"
+# Bytes collected from the request before they are handed to a worker thread for hashing + writing
+try:
+    WRITE_BUFFER_BYTES = int(os.getenv("UPLOAD_WRITE_BUFFER_BYTES", str(256 * 1024)))
+except Exception:
+    WRITE_BUFFER_BYTES = 256 * 1024
+# Allowance for multipart boundaries and part headers when checking Content-Length up front
+MULTIPART_OVERHEAD = 16 * 1024
+
+# (leading bytes, media type, extension); WEBP is RIFF....WEBP and is checked separately
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", ".png"),
+    (b"GIF87a", "image/gif", ".gif"),
+    (b"GIF89a", "image/gif", ".gif"),
+)
+EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif"}
+SNIFF_BYTES = 12
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Media type from an image's magic bytes, ignoring whatever the client claimed."""
+    for magic, media_type, _ in _SIGNATURES:
+        if head.startswith(magic):
+            return media_type
+    if len(head) >= 12 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+@dataclass
+class StoredUpload:
+    filename: str
+    public_path: str
+    size: int
+    sha256: str
+    content_type: str
+
+
+class _TempWriter:
+    """Temp file in the upload dir, hashed as it is written; only ever touched from worker threads."""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+        self.file = os.fdopen(fd, "wb")
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data: bytes) -> None:
+        self.sha256.update(data)
+        self.file.write(data)
+
+    def commit(self, final_path: str) -> None:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        # same directory, so the rename is atomic: readers never see a partial file
+        os.replace(self.path, final_path)
+
+    def discard(self) -> None:
+        self.file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class _FilePart:
+    """Multipart callbacks that pick out the data of one file field; everything else is dropped."""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.found = False
+        self.finished = False
+        self.pending: list[bytes] = []
+        self._in_field = False
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value_cb,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self) -> None:
+        self._in_field = False
+        self._disposition = b""
+
+    def _header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _header_value_cb(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        is_file = b"filename" in options
+        self._in_field = is_file and not self.found and options.get(b"name", b"").decode("latin-1") == self.field
+        self.found = self.found or self._in_field
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self.pending.append(data[start:end])
+
+    def _part_end(self) -> None:
+        if self._in_field:
+            self._in_field = False
+            self.finished = True
+
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File too large. Max {max_size // (1024 * 1024)}MB.",
+    )
+
+
+async def receive_upload(request: Request, max_size: int, allowed_types: set[str], prefix: str = "",
+                         field: str = "file") -> StoredUpload:
+    """Stream one multipart file field to UPLOAD_DIR without holding it in memory.
+
+    The declared Content-Length is checked before anything is read, and the
+    upload is aborted as soon as the file data passes ``max_size``. The type
+    comes from the file's magic bytes (the client's content type is ignored).
+    Data is hashed and written to a temp file in worker threads in
+    WRITE_BUFFER_BYTES batches, then renamed atomically to a name derived
+    from its SHA-256, so identical uploads share one file.
+    """
+    media_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if media_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_size + MULTIPART_OVERHEAD:
+        raise _too_large(max_size)
+
+    part = _FilePart(field)
+    parser = MultipartParser(boundary, part.callbacks())
+    writer: Optional[_TempWriter] = None
+    content_type: Optional[str] = None
+    head = b""
+    buffer: list[bytes] = []
+    buffered = 0
+    size = 0
+    try:
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except MultipartParseError:
+                raise HTTPException(status_code=400, detail="Malformed multipart body") from None
+            if not part.pending:
+                if part.finished:
+                    break
+                continue
+            pieces, part.pending = part.pending, []
+            for piece in pieces:
+                size += len(piece)
+                if size > max_size:
+                    raise _too_large(max_size)
+                if content_type is None:
+                    head += piece[:SNIFF_BYTES - len(head)]
+                    if len(head) < SNIFF_BYTES and not part.finished:
+                        buffer.append(piece)
+                        buffered += len(piece)
+                        continue
+                    content_type = _check_type(head, allowed_types)
+                buffer.append(piece)
+                buffered += len(piece)
+            if buffered >= WRITE_BUFFER_BYTES:
+                if writer is None:
+                    writer = await to_thread.run_sync(_TempWriter, UPLOAD_DIR)
+                data, buffer, buffered = b"".join(buffer), [], 0
+                await to_thread.run_sync(writer.write, data)
+            if part.finished:
+                break
+        if not part.found or not part.finished:
+            raise HTTPException(status_code=400, detail=f"No file uploaded in field '{field}'")
+        if content_type is None:
+            content_type = _check_type(head, allowed_types)
+        if writer is None:
+            writer = await to_thread.run_sync(_TempWriter, UPLOAD_DIR)
+        if buffer:
+            await to_thread.run_sync(writer.write, b"".join(buffer))
+        digest = writer.sha256.hexdigest()
+        filename = f"{prefix}{digest[:32]}{EXTENSIONS[content_type]}"
+        await to_thread.run_sync(writer.commit, os.path.join(UPLOAD_DIR, filename))
+    except BaseException:
+        # to_thread calls are not abandoned on cancellation, so no write can still be running here
+        if writer is not None:
+            writer.discard()
+        raise
+    return StoredUpload(filename, f"/uploads/{filename}", size, digest, content_type)
+
+
+def _check_type(head: bytes, allowed_types: set[str]) -> str:
+    content_type = sniff_image_type(head)
+    if content_type not in allowed_types:
+        names = ", ".join(sorted(EXTENSIONS[t].lstrip(".").upper() for t in allowed_types))
+        raise HTTPException(status_code=400, detail=f"Unsupported file type. Use {names}.")
+    return content_type
+
+
+def multipart_openapi(field: str = "file") -> dict:
+    """requestBody schema for routes that read the multipart body themselves via receive_upload."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": [field],
+                        "properties": {field: {"type": "string", "format": "binary"}},
+                    }
+                }
+            },
+        }
+    }
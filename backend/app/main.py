@@ -1,28 +1,26 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .core.logger import setup_logging, set_request_id, reset_request_id, enable_sql_logging
+from .core.logger import setup_logging, enable_sql_logging
+from .core.metrics import REGISTRY, register_pool_collector
+from .core.request_middleware import RequestContextMiddleware
+from .core.compression import CompressionMiddleware
+from .core.singleflight import SingleFlightMiddleware
+from .core.concurrency import ConcurrencyLimitMiddleware
 from .api.routes import api_router
 from .core import Base, engine
 import logging
-import time
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from .models.product import Product
 from .models.user import User
 from .models.promo_code import PromoCode
 from .core.auth import get_password_hash
+from .core import password_hashing
+from .core.error_spikes import init_error_spikes, shutdown_error_spikes
+from .core.reset_tokens import RESET_TOKEN_SWEEPER, migrate_legacy_reset_tokens
 from sqlalchemy import text
 from fastapi.staticfiles import StaticFiles
 import os
-from collections import deque
-
-ERROR_WINDOW_SEC = 60
-try:
-    ERROR_SPIKE_THRESHOLD = int(os.getenv("ERROR_SPIKE_THRESHOLD", "10"))
-except Exception:
-    ERROR_SPIKE_THRESHOLD = 10
-_error_times = deque()
-_last_spike_alert = 0.0
 
 load_dotenv()
 
@@ -30,13 +28,22 @@ setup_logging()
 
 app = FastAPI(title="DeadForest", version="1.0.0")
 
+# Innermost: only requests that really execute take a concurrency slot
+app.add_middleware(ConcurrencyLimitMiddleware)
+# Coalesced responses still pass through CORS, compression and request logging
+app.add_middleware(SingleFlightMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-DB-Queries", "X-DB-Time", "X-Profile-Id",
+                    "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "Retry-After", "X-Next-Cursor"],
 )
+app.add_middleware(CompressionMiddleware)
+# Added last so it wraps CORS too: every response gets a request id and an access log line
+app.add_middleware(RequestContextMiddleware)
 
 app.include_router(api_router)
 app.mount("/uploads", StaticFiles(directory="backend/uploads"), name="uploads")
@@ -48,6 +55,14 @@ async def root():
 
 @app.on_event("startup")
 def on_startup():
+    # Start the bcrypt worker processes before the first login needs them
+    password_hashing.warm_up()
+    # Host-wide 5xx window (SQLite file + flusher thread), created here rather than at import
+    init_error_spikes()
+    # In multi-process mode each worker starts flushing its metrics for the others to merge
+    REGISTRY.start()
+    # Expired password reset tokens are deleted in bulk in the background
+    RESET_TOKEN_SWEEPER.start()
     # Auto-create tables
     Base.metadata.create_all(bind=engine)
     # Lightweight SQLite migration for schema changes without Alembic
@@ -69,6 +84,12 @@ def on_startup():
                 conn.exec_driver_sql("ALTER TABLE users ADD COLUMN is_admin INTEGER NOT NULL DEFAULT 0")
             if "avatar" not in ucols:
                 conn.exec_driver_sql("ALTER TABLE users ADD COLUMN avatar VARCHAR(255)")
+            # case-insensitive indexes back the admin directory prefix search
+            conn.exec_driver_sql("DROP INDEX IF EXISTS ix_users_name")
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_users_name_nocase ON users (name COLLATE NOCASE)")
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_users_email_nocase ON users (email COLLATE NOCASE)")
+            # orders.created_at is used for date-range exports and time series
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_orders_created_at ON orders (created_at)")
             # promo_codes table (create if missing)
             conn.exec_driver_sql(
                 """
@@ -102,6 +123,11 @@ def on_startup():
                 db.commit()
         except Exception as e:
             logging.getLogger("startup").warning("Admin seed skipped: %s", e)
+        # Reset tokens used to be stored in plaintext on users; hash them into password_reset_tokens
+        try:
+            migrate_legacy_reset_tokens(db)
+        except Exception as e:
+            logging.getLogger("startup").warning("Reset token migration skipped: %s", e)
         count = db.query(Product).count()
         if count == 0:
             demo = [
@@ -117,57 +143,19 @@ def on_startup():
             db.commit()
 
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    logger = logging.getLogger("request")
-    global _last_spike_alert
-    # set request id (use header x-request-id if present)
-    req_id = request.headers.get("x-request-id") or f"req-{int(time.time()*1000)}"
-    token = set_request_id(req_id)
-    start = time.time()
-    try:
-        response = await call_next(request)
-        duration_ms = int((time.time() - start) * 1000)
-        # extra context
-        ip = request.headers.get("x-forwarded-for") or request.client.host if request.client else "-"
-        ua = request.headers.get("user-agent", "-")
-        logger.info("%s %s -> %s (%d ms) ip=%s ua=%s", request.method, request.url.path, response.status_code, duration_ms, ip, ua)
-        # spike detection for 5xx responses
-        if getattr(response, "status_code", 200) >= 500:
-            now = time.time()
-            _error_times.append(now)
-            # drop old
-            cutoff = now - ERROR_WINDOW_SEC
-            while _error_times and _error_times[0] < cutoff:
-                _error_times.popleft()
-            if len(_error_times) >= ERROR_SPIKE_THRESHOLD and (now - _last_spike_alert) > ERROR_WINDOW_SEC:
-                logging.getLogger("alert").warning(
-                    "error_spike count=%d window=%ds threshold=%d", len(_error_times), ERROR_WINDOW_SEC, ERROR_SPIKE_THRESHOLD
-                )
-                _last_spike_alert = now
-        return response
-    except Exception as e:
-        duration_ms = int((time.time() - start) * 1000)
-        ip = request.headers.get("x-forwarded-for") or request.client.host if request.client else "-"
-        ua = request.headers.get("user-agent", "-")
-        logger.exception("%s %s -> 500 (%d ms) error=%s ip=%s ua=%s", request.method, request.url.path, duration_ms, e, ip, ua)
-        # record exception as 5xx for spike detection
-        now = time.time()
-        _error_times.append(now)
-        cutoff = now - ERROR_WINDOW_SEC
-        while _error_times and _error_times[0] < cutoff:
-            _error_times.popleft()
-        if len(_error_times) >= ERROR_SPIKE_THRESHOLD and (now - _last_spike_alert) > ERROR_WINDOW_SEC:
-            logging.getLogger("alert").warning(
-                "error_spike count=%d window=%ds threshold=%d", len(_error_times), ERROR_WINDOW_SEC, ERROR_SPIKE_THRESHOLD
-            )
-            _last_spike_alert = now
-        raise
-    finally:
-        reset_request_id(token)
-
 # Enable slow SQL logging
 try:
     enable_sql_logging(engine)
 except Exception as _e:
     logging.getLogger("startup").warning("SQL logging not enabled: %s", _e)
+
+# Prometheus metrics: DB pool gauges are read at scrape time
+register_pool_collector(engine)
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # Stop the background threads started in on_startup, flushing what they hold
+    RESET_TOKEN_SWEEPER.stop()
+    REGISTRY.stop()
+    shutdown_error_spikes()
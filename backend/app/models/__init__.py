@@ -3,3 +3,5 @@ from .product import Product
 from .cart_item import CartItem
 from .order import Order
 from .order_item import OrderItem
+from .customer_stats import CustomerStats
+from .password_reset_token import PasswordResetToken
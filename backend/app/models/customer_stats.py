@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey
+from ..core.database import Base
+
+
+class CustomerStats(Base):
+    """Materialized per-customer order aggregates (see core.analytics)."""
+
+    __tablename__ = "customer_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    cohort = Column(String(7), nullable=True, index=True)  # signup month, YYYY-MM
+    orders_count = Column(Integer, nullable=False, default=0)
+    lifetime_value = Column(Numeric(12, 2), nullable=False, default=0)
+    first_order_at = Column(DateTime(timezone=True), nullable=True)
+    last_order_at = Column(DateTime(timezone=True), nullable=True)
+    # highest orders.id folded into this row; max() over the table is part of the refresh watermark
+    last_order_id = Column(Integer, nullable=False, default=0, index=True)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+
+class PasswordResetToken(Base):
+    """Outstanding password reset tokens; only the SHA-256 of each token is stored (see core.reset_tokens)."""
+
+    __tablename__ = "password_reset_tokens"
+
+    token_hash = Column(String(64), primary_key=True)  # hex sha256, looked up by primary key
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
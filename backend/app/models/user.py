@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
 from sqlalchemy.sql import func
 from ..core.database import Base
 
@@ -12,6 +12,12 @@ class User(Base):
     password_hash = Column(String(255), nullable=False)
     is_admin = Column(Boolean, nullable=False, default=False)
     avatar = Column(String(255), nullable=True)
+    # legacy plaintext reset token columns, moved to password_reset_tokens at startup
     reset_token = Column(String(255), nullable=True)
     reset_token_expires = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ASCII case-insensitive prefix search in the admin directory (/admin/users)
+Index("ix_users_name_nocase", User.name.collate("NOCASE"))
+Index("ix_users_email_nocase", User.email.collate("NOCASE"))
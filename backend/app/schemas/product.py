@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from pydantic import ConfigDict
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -40,3 +40,27 @@ class ProductOut(ProductBase):
     id: int
     created_at: Optional[datetime] = None
     model_config = ConfigDict(from_attributes=True)
+
+
+class ProductFilter(BaseModel):
+    """Same criteria as the public GET /products listing."""
+    q: Optional[str] = None
+    categories: Optional[List[str]] = None
+    tags: Optional[List[str]] = None
+    programs: Optional[List[str]] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_rating: Optional[float] = None
+    max_rating: Optional[float] = None
+    status: Optional[str] = None
+
+
+class ProductBulkSelect(BaseModel):
+    ids: Optional[List[int]] = None
+    filter: Optional[ProductFilter] = None
+
+
+class ProductBulkUpdate(ProductBulkSelect):
+    price: Optional[float] = Field(default=None, ge=0)
+    category: Optional[str] = None
+    tags: Optional[str] = None
@@ -0,0 +1,102 @@
+"""
+Microbenchmark for the audit logging path (audit() -> _BufferHandler.emit)
+Compares the legacy format-then-reparse implementation with structured records.
+Run with: python -m backend.scripts.bench_audit_emit
+"""
+import sys
+import logging
+from pathlib import Path
+from time import perf_counter
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from datetime import datetime, timezone
+from backend.app.core.logger import LOG_BUFFER, _BufferHandler, _fmt_message, audit
+
+
+def legacy_audit(log: logging.Logger, event: str, **fields):
+    """Pre-change audit(): render fields into a key=value message."""
+    parts = [f"event={event}"]
+    for k, v in fields.items():
+        try:
+            sval = str(v).replace("\n", " ")
+        except Exception:
+            sval = "<unrepr>"
+        if "password" in k.lower():
+            sval = "***"
+        parts.append(f"{k}={sval}")
+    log.info(" ".join(parts))
+
+
+class LegacyBufferHandler(logging.Handler):
+    """Pre-change _BufferHandler.emit: split the rendered message back into fields."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": _fmt_message(record.getMessage()),
+        }
+        text = record.getMessage()
+        parsed = {}
+        for p in text.split():
+            if "=" in p:
+                k, v = p.split("=", 1)
+                parsed[k] = v
+        entry["event"] = parsed.get("event")
+        if "actor_id" in parsed:
+            try:
+                entry["actor_id"] = int(parsed.get("actor_id"))
+            except Exception:
+                entry["actor_id"] = parsed.get("actor_id")
+        if "target" in parsed:
+            entry["target"] = parsed.get("target")
+        entry["extras"] = {k: v for k, v in parsed.items() if k not in {"event", "actor_id", "target"}}
+        LOG_BUFFER.append(entry)
+
+
+def _isolated_audit_logger(handler: logging.Handler) -> logging.Logger:
+    log = logging.getLogger("audit")
+    log.handlers[:] = [handler]
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    return log
+
+
+def _time(fn, n: int) -> float:
+    start = perf_counter()
+    for i in range(n):
+        fn(i)
+    return perf_counter() - start
+
+
+def main(n: int = 100_000, rounds: int = 3):
+    print(f"audit emit throughput, {n} events x {rounds} rounds (best round reported)")
+    legacy_log = _isolated_audit_logger(LegacyBufferHandler())
+    legacy_handler = legacy_log.handlers[0]
+    handler = _BufferHandler()
+
+    def before(i):
+        legacy_audit(legacy_log, "product.update", actor_id=1, target="user@example.com", product_id=i, name="Dark UI Kit")
+
+    def after(i):
+        audit("product.update", actor_id=1, target="user@example.com", product_id=i, name="Dark UI Kit")
+
+    best = {"before": float("inf"), "after": float("inf")}
+    for _ in range(rounds):
+        # alternate so both variants see the same ring buffer state
+        _isolated_audit_logger(legacy_handler)
+        best["before"] = min(best["before"], _time(before, n))
+        _isolated_audit_logger(handler)
+        best["after"] = min(best["after"], _time(after, n))
+    for label, elapsed in best.items():
+        print(f"{label:<8} {n / elapsed:>12,.0f} events/s  ({elapsed * 1e6 / n:.2f} us/event)")
+    print(f"speedup  {best['before'] / best['after']:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
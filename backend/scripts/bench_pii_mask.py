@@ -0,0 +1,91 @@
+"""
+Benchmark for PII masking of log messages over a realistic log corpus
+Compares the legacy two-pass masking with the gated fast path, per call and
+per record (legacy masked once per handler, now once per record).
+Run with: python -m backend.scripts.bench_pii_mask
+"""
+import sys
+import re
+import random
+from pathlib import Path
+from time import perf_counter
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.app.core.logger import _mask_pii
+
+# Handlers that masked each record before (JSON stdout formatter + admin buffer)
+LEGACY_MASKS_PER_RECORD = 2
+
+LEGACY_PATTERNS = [
+    (re.compile(r"([A-Za-z0-9._%+-]+)@([A-Za-z0-9.-]+\.[A-Za-z]{2,})"), "***@***"),
+    (re.compile(r"\b\+?\d[\d\s().-]{7,}\b"), "***"),
+]
+
+
+def legacy_mask(message: str) -> str:
+    out = message
+    for pat, repl in LEGACY_PATTERNS:
+        out = pat.sub(repl, out)
+    return out
+
+
+def build_corpus(n: int, seed: int = 42) -> list[str]:
+    """Mix modelled on production traffic: mostly access-log lines, some audit/SQL/error lines."""
+    rnd = random.Random(seed)
+    paths = ["/products", "/products/12", "/cart", "/orders", "/auth/me", "/admin/stats", "/admin/logs?limit=200"]
+    agents = [
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/126.0 Safari/537.36",
+        "Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148",
+        "curl/8.5.0",
+    ]
+    corpus = []
+    for _ in range(n):
+        r = rnd.random()
+        if r < 0.80:
+            corpus.append(
+                f"{rnd.choice(['GET', 'POST'])} {rnd.choice(paths)} -> {rnd.choice([200, 200, 201, 404])} "
+                f"({rnd.randint(1, 400)} ms) ip=10.0.{rnd.randint(0, 255)}.{rnd.randint(0, 255)} ua={rnd.choice(agents)}"
+            )
+        elif r < 0.90:
+            corpus.append(f"event=auth.login actor_id={rnd.randint(1, 5000)} target=user{rnd.randint(1, 5000)}@example.com")
+        elif r < 0.95:
+            corpus.append(
+                f"slow_sql duration_ms={rnd.randint(200, 900)} stmt=SELECT products.id, products.name FROM products "
+                f"WHERE products.category = ? LIMIT {rnd.randint(10, 100)}"
+            )
+        elif r < 0.98:
+            corpus.append(f"event=profile.update actor_id={rnd.randint(1, 5000)} phone=+1 (555) {rnd.randint(100, 999)}-{rnd.randint(1000, 9999)}")
+        else:
+            corpus.append(f"Unhandled error for order {rnd.randint(1, 10**6)}: Traceback (most recent call last) ...")
+    return corpus
+
+
+def _time(fn, corpus: list[str], rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = perf_counter()
+        for msg in corpus:
+            fn(msg)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main(n: int = 50_000, rounds: int = 5):
+    corpus = build_corpus(n)
+    changed = sum(1 for m in corpus if legacy_mask(m) != _mask_pii(m))
+    print(f"PII masking over {n} log lines, best of {rounds} rounds")
+    before = _time(legacy_mask, corpus, rounds)
+    after = _time(_mask_pii, corpus, rounds)
+    for label, elapsed in (("before", before), ("after", after)):
+        print(f"{label:<8} {n / elapsed:>12,.0f} lines/s  ({elapsed * 1e6 / n:.2f} us/line)")
+    print(f"speedup per call    {before / after:.2f}x")
+    print(f"speedup per record  {before * LEGACY_MASKS_PER_RECORD / after:.2f}x (cached across handlers)")
+    # lines where the legacy phone pattern over-matched (e.g. '200 (35 ' in access logs)
+    print(f"lines masked differently: {changed}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,156 @@
+"""
+Throughput benchmark for the request middleware.
+Compares the legacy @app.middleware("http") log_requests (BaseHTTPMiddleware)
+with the pure-ASGI RequestContextMiddleware on a trivial endpoint, driving the
+ASGI app directly so only middleware overhead is measured.
+Run with: python -m backend.scripts.bench_request_middleware [requests]
+"""
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+from time import perf_counter
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from backend.app.core.logger import (
+    current_route,
+    reset_request_id,
+    reset_request_scope,
+    route_template,
+    set_request_id,
+    set_request_scope,
+)
+from backend.app.core.metrics import HTTP_IN_FLIGHT, observe_request
+from backend.app.core.error_spikes import record_error
+from backend.app.core.request_middleware import RequestContextMiddleware
+from backend.app.core.sql_stats import reset_request_queries, start_request_queries
+
+
+def _content_length(headers):
+    try:
+        return int(headers["content-length"])
+    except (KeyError, ValueError):
+        return None
+
+
+async def legacy_log_requests(request: Request, call_next):
+    """Pre-change main.log_requests (profiling trigger omitted: it is off in both variants)."""
+    logger = logging.getLogger("request")
+    req_id = request.headers.get("x-request-id") or f"req-{int(time.time()*1000)}"
+    token = set_request_id(req_id)
+    scope_token = set_request_scope(request.scope)
+    queries, queries_token = start_request_queries()
+    start = time.time()
+    HTTP_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        elapsed = time.time() - start
+        duration_ms = int(elapsed * 1000)
+        observe_request(request.method, route_template(request.scope), response.status_code, elapsed,
+                        _content_length(request.headers), _content_length(response.headers))
+        ip = request.headers.get("x-forwarded-for") or request.client.host if request.client else "-"
+        ua = request.headers.get("user-agent", "-")
+        response.headers["X-DB-Queries"] = str(queries.count)
+        response.headers["X-DB-Time"] = f"{queries.total_ms:.1f}"
+        logger.info("%s %s -> %s (%d ms) db_queries=%d db_ms=%.1f ip=%s ua=%s",
+                    request.method, request.url.path, response.status_code, duration_ms,
+                    queries.count, queries.total_ms, ip, ua)
+        for fp, n in queries.repeated():
+            logging.getLogger("sql.n_plus_one").warning("n_plus_one route=%s count=%d stmt=%s", current_route(), n, fp)
+        if response.status_code >= 500:
+            record_error()
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        reset_request_queries(queries_token)
+        reset_request_id(token)
+        reset_request_scope(scope_token)
+
+
+def _build_app(legacy: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return PlainTextResponse("pong")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(10):
+                yield b"x" * 1024
+        return StreamingResponse(chunks(), media_type="application/octet-stream")
+
+    if legacy:
+        app.middleware("http")(legacy_log_requests)
+    else:
+        app.add_middleware(RequestContextMiddleware)
+    return app
+
+
+def _scope(path: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"user-agent", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+
+async def _drive(app, path: str, n: int, concurrency: int) -> float:
+    never = asyncio.Event()
+
+    async def send(message):
+        pass
+
+    async def worker(count: int):
+        for _ in range(count):
+            sent = False
+
+            async def receive():
+                # like a server: the (empty) body once, then nothing until the client goes away
+                nonlocal sent
+                if not sent:
+                    sent = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await never.wait()
+
+            await app(_scope(path), receive, send)
+
+    start = perf_counter()
+    await asyncio.gather(*(worker(n // concurrency) for _ in range(concurrency)))
+    return perf_counter() - start
+
+
+def main(n: int = 20_000, rounds: int = 3, concurrency: int = 10):
+    logging.getLogger("request").setLevel(logging.WARNING)
+    print(f"request middleware throughput, {n} requests x {rounds} rounds, concurrency {concurrency} (best round)")
+    apps = {"before": _build_app(legacy=True), "after": _build_app(legacy=False)}
+    for path in ("/ping", "/stream"):
+        best = {label: float("inf") for label in apps}
+        for _ in range(rounds):
+            for label, app in apps.items():
+                best[label] = min(best[label], asyncio.run(_drive(app, path, n, concurrency)))
+        print(path)
+        for label, elapsed in best.items():
+            print(f"  {label:<8} {n / elapsed:>10,.0f} req/s  ({elapsed * 1e6 / n:.1f} us/request)")
+        print(f"  speedup  {best['before'] / best['after']:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
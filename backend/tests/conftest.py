@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app mounts backend/uploads relative to the cwd and opens its SQLite DB on import:
+# run the tests from a scratch directory with their own database.
+_workdir = tempfile.mkdtemp(prefix="deadforest-tests-")
+os.makedirs(os.path.join(_workdir, "backend", "uploads"), exist_ok=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_workdir}/test.db")
+os.environ.setdefault("AUDIT_DB_PATH", os.path.join(_workdir, "audit.db"))
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+os.chdir(_workdir)
+
+# import the app (which configures logging) before pytest's log capture puts its own
+# handlers on the root logger, or setup_logging() would treat logging as configured
+import backend.app.main  # noqa: E402,F401
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from backend.app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def login(client):
+    """login(email, password) -> Authorization headers for that account."""
+    def _login(email: str, password: str) -> dict:
+        r = client.post("/auth/login", data={"username": email, "password": password})
+        assert r.status_code == 200, r.text
+        return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+    return _login
+
+
+@pytest.fixture(scope="session")
+def admin_headers(login):
+    # seeded by on_startup when the users table is empty
+    return login("admin@example.com", "admin123")
@@ -0,0 +1,19 @@
+import pytest
+from fastapi import HTTPException
+
+from backend.app.api.admin import _bulk_product_query
+from backend.app.schemas.product import ProductBulkSelect
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"ids": []},
+    {"filter": {}},
+    {"filter": {"q": ""}},
+    {"filter": {"categories": []}},
+    {"filter": {"tags": [""], "programs": []}},
+])
+def test_empty_selector_is_rejected(body):
+    with pytest.raises(HTTPException) as exc:
+        _bulk_product_query(None, ProductBulkSelect(**body))
+    assert exc.value.status_code == 400
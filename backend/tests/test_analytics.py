@@ -0,0 +1,74 @@
+import itertools
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.app.core import analytics
+from backend.app.core.analytics import ensure_fresh, refresh_customer_stats
+from backend.app.core.database import engine
+from backend.app.models.customer_stats import CustomerStats
+from backend.app.models.order import Order
+from backend.app.models.user import User
+
+_emails = (f"ltv{i}@example.com" for i in itertools.count())
+
+
+def _customer(db: Session) -> int:
+    user = User(name="Ltv", email=next(_emails), password_hash="x")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def _stats(db: Session, user_id: int):
+    db.expire_all()
+    s = db.get(CustomerStats, user_id)
+    return None if s is None else (s.orders_count, float(s.lifetime_value))
+
+
+def test_late_committed_order_is_counted_once(client):
+    with Session(engine) as db:
+        user_id = _customer(db)
+        now = datetime.utcnow().replace(microsecond=0)
+        top = (db.query(func.max(Order.id)).scalar() or 0) + 100
+        db.add(Order(id=top, user_id=user_id, total=10, created_at=now))
+        db.commit()
+        refresh_customer_stats(db)
+        assert _stats(db, user_id) == (1, 10.0)
+
+        # a transaction that took its id (and timestamp) first but committed after the refresh
+        db.add(Order(id=top - 1, user_id=user_id, total=5, created_at=now - timedelta(seconds=2)))
+        db.commit()
+        refresh_customer_stats(db)
+        assert _stats(db, user_id) == (2, 15.0)
+        # the overlap is re-read on every refresh without double counting
+        refresh_customer_stats(db)
+        assert _stats(db, user_id) == (2, 15.0)
+
+
+def test_deleting_a_user_removes_their_stats(client, admin_headers):
+    with Session(engine) as db:
+        user_id = _customer(db)
+        db.add(Order(user_id=user_id, total=7))
+        db.commit()
+        refresh_customer_stats(db)
+        assert _stats(db, user_id) == (1, 7.0)
+
+    assert client.delete(f"/users/{user_id}", headers=admin_headers).status_code == 204
+    with Session(engine) as db:
+        assert _stats(db, user_id) is None
+        # the orders are kept; a refresh does not bring the row back
+        refresh_customer_stats(db)
+        assert _stats(db, user_id) is None
+
+
+def test_reads_do_not_wait_for_a_running_refresh(monkeypatch):
+    monkeypatch.setattr(analytics, "_last_refresh", 0.0)
+    with analytics._refresh_lock:
+        done = threading.Event()
+        thread = threading.Thread(target=lambda: (ensure_fresh(None), done.set()))
+        thread.start()
+        assert done.wait(2.0)
+        thread.join()
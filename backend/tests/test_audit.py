@@ -0,0 +1,20 @@
+from backend.app.core.logger import audit, query_logs, user_target
+
+
+def test_target_is_kept_and_extras_are_masked():
+    audit("test.audit_fields", actor_id=1, target=user_target(5), note="contact bob@example.com")
+    entry = query_logs(limit=1, event="test.audit_fields")[0][0]
+    assert entry["target"] == "user:5"
+    assert entry["extras"] == {"note": "contact ***@***"}
+    assert "bob@example.com" not in entry["message"]
+
+
+def test_logs_can_be_filtered_by_target_email(client, admin_headers):
+    r = client.post("/auth/register", json={"name": "Audit", "email": "audit.target@example.com",
+                                            "password": "secret123", "age": 30})
+    assert r.status_code == 200, r.text
+    user_id = r.json()["id"]
+    r = client.get("/admin/logs", params={"event": "auth.register", "target": "audit.target@example.com"},
+                   headers=admin_headers)
+    assert r.status_code == 200
+    assert [e["target"] for e in r.json()] == [user_target(user_id)]
@@ -0,0 +1,74 @@
+from backend.app.core.audit_store import AuditStore
+
+
+def _row(event: str, extras=None) -> tuple:
+    return (1.0, event, None, None, None, extras, event)
+
+
+def test_failing_row_is_dropped_after_max_attempts(tmp_path):
+    store = AuditStore(str(tmp_path / "audit.db"), batch_size=1000, flush_interval=60.0, max_attempts=3)
+    try:
+        store.append(_row("ok.before"))
+        # sqlite cannot bind an arbitrary object, so every batch containing this row fails
+        store.append(_row("poison", extras=object()))
+        store.append(_row("ok.after"))
+        assert store.flush() == 0
+        assert store.flush() == 0
+        assert store.stats()["pending"] == 3
+        assert store.flush() == 2
+        stats = store.stats()
+        assert (stats["pending"], stats["dropped"]) == (0, 1)
+        events = [e["event"] for e in store.query()[0]]
+        assert events == ["ok.after", "ok.before"]
+    finally:
+        store.stop()
+
+
+def _store(tmp_path, **kw) -> AuditStore:
+    return AuditStore(str(tmp_path / "audit.db"), batch_size=1000, flush_interval=60.0, **kw)
+
+
+def test_pages_follow_time_order_across_equal_timestamps(tmp_path):
+    store = _store(tmp_path)
+    try:
+        # inserted out of time order, two events share a timestamp
+        for ts, event in [(3.0, "c"), (1.0, "a"), (2.0, "b1"), (2.0, "b2"), (4.0, "d")]:
+            store.append((ts, event, None, None, None, None, event))
+        store.flush()
+        seen, cursor = [], None
+        while True:
+            items, cursor = store.query(limit=2, before=cursor)
+            seen += [e["event"] for e in items]
+            if cursor is None:
+                break
+        assert seen == ["d", "c", "b2", "b1", "a"]
+    finally:
+        store.stop()
+
+
+def test_event_history_is_read_through_the_index_without_sorting(tmp_path):
+    store = _store(tmp_path)
+    try:
+        conn = store._connect()
+        plan = " ".join(r[3] for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM audit_events WHERE event = ? AND ts <= ? AND (ts < ? OR id < ?) "
+            "ORDER BY ts DESC, id DESC LIMIT 10", ("x", 1.0, 1.0, 1),
+        ))
+        conn.close()
+        assert "ix_audit_event_ts" in plan
+        assert "TEMP B-TREE" not in plan
+    finally:
+        store.stop()
+
+
+def test_prune_removes_events_past_retention(tmp_path):
+    store = _store(tmp_path, retention_days=1)
+    try:
+        now = 10 * 86400.0
+        store.append((now - 2 * 86400, "old", None, None, None, None, "old"))
+        store.append((now - 3600, "recent", None, None, None, None, "recent"))
+        store.flush()
+        assert store.prune(now=now) == 1
+        assert [e["event"] for e in store.query()[0]] == ["recent"]
+    finally:
+        store.stop()
@@ -0,0 +1,42 @@
+import itertools
+
+import pytest
+
+from backend.app.core.auth_context import ROLE_CACHE
+from backend.app.core.request_middleware import _is_admin_token
+
+_emails = (f"cache{i}@example.com" for i in itertools.count())
+
+
+@pytest.fixture
+def account(client, login):
+    email = next(_emails)
+    r = client.post("/auth/register", json={"name": "Cache", "email": email, "password": "secret123"})
+    assert r.status_code == 200, r.text
+    return r.json()["id"], email, login(email, "secret123")
+
+
+def test_promote_and_demote_take_effect_immediately(client, admin_headers, account):
+    user_id, email, headers = account
+    assert client.get("/admin/stats", headers=headers).status_code == 403
+    assert ROLE_CACHE.get(user_id) is False
+
+    assert client.post("/admin/promote", params={"email": email}, headers=admin_headers).status_code == 200
+    assert client.get("/admin/stats", headers=headers).status_code == 200
+    assert _is_admin_token(headers["Authorization"])
+
+    assert client.post("/admin/demote", params={"email": email}, headers=admin_headers).status_code == 200
+    assert client.get("/admin/stats", headers=headers).status_code == 403
+    assert not _is_admin_token(headers["Authorization"])
+
+
+def test_deleted_admin_loses_access_with_a_still_valid_token(client, admin_headers, account):
+    user_id, email, headers = account
+    client.post("/admin/promote", params={"email": email}, headers=admin_headers)
+    assert client.get("/admin/stats", headers=headers).status_code == 200
+    assert ROLE_CACHE.get(user_id) is True
+
+    assert client.delete(f"/users/{user_id}", headers=admin_headers).status_code == 204
+    assert ROLE_CACHE.get(user_id) is None
+    assert client.get("/admin/stats", headers=headers).status_code == 403
+    assert not _is_admin_token(headers["Authorization"])
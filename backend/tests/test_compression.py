@@ -0,0 +1,55 @@
+import gzip
+
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+from backend.app.core.compression import CompressionMiddleware
+
+BODY = b'{"items": "' + b"x" * 4096 + b'"}'
+
+
+def test_public_get_gets_an_etag_and_304(client):
+    r = client.get("/products", headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["Content-Encoding"] == "gzip"
+    etag = r.headers["ETag"]
+
+    r = client.get("/products", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+    assert r.headers["ETag"] == etag
+    # the ETag covers the uncompressed body, so it holds for every encoding
+    assert client.get("/products", headers={"Accept-Encoding": "identity", "If-None-Match": etag}).status_code == 304
+
+
+def test_authenticated_responses_get_no_etag(client, admin_headers):
+    r = client.get("/products", headers={"Accept-Encoding": "gzip", **admin_headers})
+    assert r.status_code == 200 and "ETag" not in r.headers
+
+
+def _app(response: Response) -> TestClient:
+    async def endpoint(request):
+        return response
+
+    return TestClient(CompressionMiddleware(Starlette(routes=[Route("/", endpoint)])))
+
+
+def test_already_encoded_body_passes_through():
+    packed = gzip.compress(BODY)
+    app = _app(Response(packed, media_type="application/json", headers={"Content-Encoding": "gzip"}))
+    r = app.get("/", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert r.content == BODY  # decoded exactly once by the client
+
+
+def test_gzip_file_download_is_not_compressed_again(client, admin_headers):
+    r = client.get("/admin/export/orders", params={"gzip": "true"}, headers={"Accept-Encoding": "gzip", **admin_headers})
+    assert r.status_code == 200
+    assert r.headers["Content-Type"] == "application/gzip" and "Content-Encoding" not in r.headers
+    assert gzip.decompress(r.content).startswith(b"order_id,user_id,")
+
+
+def test_small_bodies_are_sent_as_is():
+    r = _app(Response(b'{"ok": true}', media_type="application/json")).get("/", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in r.headers and r.content == b'{"ok": true}'
@@ -0,0 +1,90 @@
+import asyncio
+
+from backend.app.core.concurrency import ConcurrencyLimitMiddleware, GroupLimiter, Overloaded
+
+
+async def _call(app, path="/products"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app({"type": "http", "method": "GET", "path": path, "headers": []}, receive, send)
+    return sent
+
+
+class _Backend:
+    def __init__(self, stream: bool = False):
+        self.stream = stream
+        self.release = asyncio.Event()
+        self.streaming = asyncio.Event()
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        if self.stream:
+            await send({"type": "http.response.body", "body": b"first", "more_body": True})
+            self.streaming.set()
+        await self.release.wait()
+        await send({"type": "http.response.body", "body": b"done", "more_body": False})
+
+
+def test_full_queue_is_shed_with_503_and_retry_after():
+    async def run():
+        backend = _Backend()
+        limiter = GroupLimiter("catalog", limit=1, queue_size=1)
+        app = ConcurrencyLimitMiddleware(backend, {"catalog": limiter})
+        running = asyncio.create_task(_call(app))
+        queued = asyncio.create_task(_call(app))
+        await asyncio.sleep(0.01)
+        assert (limiter.active, limiter.queued) == (1, 1)
+
+        shed = await _call(app)
+        assert shed[0]["status"] == 503
+        assert dict(shed[0]["headers"])[b"retry-after"] == b"1"
+        assert limiter.shed == 1
+
+        backend.release.set()
+        assert [r[0]["status"] for r in await asyncio.gather(running, queued)] == [200, 200]
+        assert (limiter.active, limiter.queued) == (0, 0)
+
+    asyncio.run(run())
+
+
+def test_streaming_response_gives_its_slot_back_once():
+    async def run():
+        stream = _Backend(stream=True)
+        limiter = GroupLimiter("admin", limit=1, queue_size=0)
+        app = ConcurrencyLimitMiddleware(stream, {"admin": limiter})
+        streaming = asyncio.create_task(_call(app, "/admin/logs/tail"))
+        await stream.streaming.wait()
+        assert limiter.active == 0
+
+        # the slot is free for the next request while the stream stays open (no queue: it would be shed)
+        await asyncio.wait_for(limiter.acquire(), 1.0)
+        limiter.release(0.0)
+        stream.release.set()
+        assert (await streaming)[-1]["body"] == b"done"
+        # finishing the stream does not release a second time
+        assert limiter.active == 0
+
+    asyncio.run(run())
+
+
+def test_queue_wait_times_out():
+    async def run():
+        limiter = GroupLimiter("auth", limit=1, queue_size=4)
+        await limiter.acquire()
+        try:
+            await limiter.acquire(timeout=0.01)
+        except Overloaded as e:
+            assert e.reason == "timeout"
+        else:
+            raise AssertionError("expected Overloaded")
+        assert (limiter.timeouts, limiter.queued) == (1, 0)
+        limiter.release(0.0)
+        assert limiter.active == 0
+
+    asyncio.run(run())
@@ -0,0 +1,51 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import Session
+
+from backend.app.core.database import engine
+from backend.app.models.order import Order
+
+
+@pytest.fixture(scope="module")
+def orders(client):
+    # stored like CURRENT_TIMESTAMP stores them: naive UTC
+    stamps = {
+        "before": datetime(2001, 3, 9, 23, 59, 59),
+        "first": datetime(2001, 3, 10, 0, 0, 0),
+        "evening": datetime(2001, 3, 10, 18, 30, 0),
+        "last": datetime(2001, 3, 10, 23, 59, 59, 500000),
+        "after": datetime(2001, 3, 11, 0, 0, 0),
+    }
+    with Session(engine) as db:
+        rows = {name: Order(created_at=ts, status="paid") for name, ts in stamps.items()}
+        db.add_all(rows.values())
+        db.commit()
+        return {order.id: name for name, order in rows.items()}
+
+
+def _export(client, headers, orders, **params) -> list[str]:
+    r = client.get("/admin/export/orders", params={"format": "ndjson", **params}, headers=headers)
+    assert r.status_code == 200, r.text
+    ids = [json.loads(line)["id"] for line in r.text.splitlines() if line]
+    return [orders[i] for i in ids if i in orders]
+
+
+def test_date_only_end_includes_the_whole_day(client, admin_headers, orders):
+    assert _export(client, admin_headers, orders, start="2001-03-10", end="2001-03-10") == ["first", "evening", "last"]
+
+
+def test_datetime_end_is_inclusive(client, admin_headers, orders):
+    assert _export(client, admin_headers, orders, start="2001-03-10", end="2001-03-10T18:30:00") == ["first", "evening"]
+
+
+def test_offsets_are_converted_to_utc(client, admin_headers, orders):
+    # 20:30+02:00 is 18:30 UTC
+    got = _export(client, admin_headers, orders, start="2001-03-10T01:00:00+01:00", end="2001-03-10T20:30:00+02:00")
+    assert got == ["first", "evening"]
+
+
+def test_invalid_bound_is_rejected(client, admin_headers):
+    r = client.get("/admin/export/orders", params={"end": "10/03/2001"}, headers=admin_headers)
+    assert r.status_code == 400
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from backend.app.core.database import Base
+from backend.app.core.leaderboard import SalesLeaderboard
+from backend.app.models.order import Order
+from backend.app.models.order_item import OrderItem
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'leaderboard.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def _order(db: Session, days_ago: int, *lines: tuple[int, int, float]) -> Order:
+    created = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days_ago)
+    order = Order(subtotal=0, total=0, status="paid", created_at=created)
+    db.add(order)
+    db.flush()
+    db.add_all(OrderItem(order_id=order.id, product_id=p, quantity=q, price=price) for p, q, price in lines)
+    db.commit()
+    return order
+
+
+def test_windows_total_order_item_revenue(engine):
+    with Session(engine) as db:
+        _order(db, 0, (1, 2, 10.0), (2, 1, 5.0))
+        _order(db, 10, (1, 1, 20.0))
+        _order(db, 40, (2, 10, 5.0))
+        lb = SalesLeaderboard()
+        assert lb.top(db, "7d") == [(1, 2, 20.0), (2, 1, 5.0)]
+        assert lb.top(db, "30d") == [(1, 3, 40.0), (2, 1, 5.0)]
+        assert lb.top(db, "all") == [(2, 11, 55.0), (1, 3, 40.0)]
+
+        # incremental update, priced at the time of sale
+        order = _order(db, 0, (2, 1, 7.0))
+        lb.record_order([(2, 1, 7.0)], order.created_at, order_id=order.id)
+        assert lb.top(db, "7d") == [(1, 2, 20.0), (2, 2, 12.0)]
+        assert lb.top(db, "all", limit=1) == [(2, 12, 62.0)]
+
+
+@pytest.mark.parametrize("during", ["max(orders.id)", "sum(order_items.price"])
+def test_order_recorded_during_a_rebuild_is_counted_once(engine, during):
+    """An order committed and recorded while load() reads: before or after its id snapshot."""
+    with Session(engine) as db:
+        _order(db, 0, (1, 1, 10.0))
+        lb = SalesLeaderboard()
+        lb.load(db)
+        fired = []
+
+        def concurrent_order(conn, cursor, statement, parameters, context, executemany):
+            if during in statement.lower() and not fired:
+                fired.append(True)
+                with Session(engine) as other:
+                    order = _order(other, 0, (1, 1, 10.0))
+                    lb.record_order([(1, 1, 10.0)], order.created_at, order_id=order.id)
+
+        event.listen(engine, "before_cursor_execute", concurrent_order)
+        try:
+            lb.load(db)
+        finally:
+            event.remove(engine, "before_cursor_execute", concurrent_order)
+        assert fired
+        assert lb.top(db, "all") == [(1, 2, 20.0)]
+        assert lb.top(db, "7d") == [(1, 2, 20.0)]
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+_SCRIPT = textwrap.dedent("""
+    import threading
+    from fastapi.testclient import TestClient
+
+    def names():
+        return {t.name for t in threading.enumerate() if t.is_alive()}
+
+    import backend.app.main as main
+    print("import", sorted(names() & BACKGROUND))
+    with TestClient(main.app):
+        print("running", sorted(names() & BACKGROUND))
+    print("shutdown", sorted(names() & BACKGROUND))
+""")
+_BACKGROUND = ["error-spike-flusher", "metrics-flusher", "reset-token-sweeper"]
+
+
+def test_background_threads_follow_startup_and_shutdown(tmp_path):
+    # a fresh interpreter: this test session imported the app long ago
+    os.makedirs(tmp_path / "backend" / "uploads")
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path}/app.db", AUDIT_DB_PATH=str(tmp_path / "audit.db"),
+               METRICS_MULTIPROC_DIR=str(tmp_path / "metrics"), PYTHONPATH=repo_root)
+    out = subprocess.run([sys.executable, "-c", f"BACKGROUND = set({_BACKGROUND!r})\n" + _SCRIPT],
+                         cwd=tmp_path, env=env, capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    lines = dict(line.split(" ", 1) for line in out.stdout.splitlines() if line.split(" ", 1)[0] in
+                 ("import", "running", "shutdown"))
+    assert lines == {"import": "[]", "running": repr(_BACKGROUND), "shutdown": "[]"}
+    # the metrics flusher wrote its final values on the way out
+    assert os.listdir(tmp_path / "metrics")
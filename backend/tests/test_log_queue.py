@@ -0,0 +1,34 @@
+import logging
+import queue
+
+from backend.app.core.logger import _DroppingQueueHandler, record_message
+
+
+class _Lazy:
+    renders = 0
+
+    def __str__(self):
+        _Lazy.renders += 1
+        return "event=lazy"
+
+
+def test_queue_handler_leaves_rendering_to_the_listener():
+    q = queue.Queue()
+    handler = _DroppingQueueHandler(q)
+    msg = _Lazy()
+    record = logging.LogRecord("audit", logging.INFO, __file__, 1, msg, None, None)
+    handler.handle(record)
+
+    queued = q.get_nowait()
+    assert queued.msg is msg and _Lazy.renders == 0
+    assert record_message(queued) == "event=lazy"
+    assert record_message(queued) == "event=lazy"  # rendered once, shared by every handler
+    assert _Lazy.renders == 1
+
+
+def test_format_args_are_kept_for_the_listener():
+    q = queue.Queue()
+    _DroppingQueueHandler(q).handle(logging.LogRecord("app", logging.INFO, __file__, 1, "%s=%d", ("n", 3), None))
+    queued = q.get_nowait()
+    assert queued.args == ("n", 3)
+    assert queued.getMessage() == "n=3"
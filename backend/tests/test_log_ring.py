@@ -0,0 +1,54 @@
+from backend.app.core.logger import LogRing
+
+
+def _entry(i: int, event: str) -> dict:
+    return {"event": event, "level": "INFO", "message": f"entry {i} of {event}", "extras": {}}
+
+
+def _ids(entries) -> list[int]:
+    return [e["id"] for e in entries]
+
+
+def test_pages_newest_first_with_a_cursor():
+    ring = LogRing(100)
+    for i in range(10):
+        ring.append(_entry(i, "even" if i % 2 == 0 else "odd"))
+
+    page, cursor = ring.query(limit=4)
+    assert _ids(page) == [9, 8, 7, 6] and cursor == 6
+    page, cursor = ring.query(limit=4, before=cursor)
+    assert _ids(page) == [5, 4, 3, 2] and cursor == 2
+    page, cursor = ring.query(limit=4, before=cursor)
+    assert _ids(page) == [1, 0] and cursor is None
+
+    page, cursor = ring.query(limit=3, event="even")
+    assert _ids(page) == [8, 6, 4]
+    page, cursor = ring.query(limit=3, before=cursor, event="even")
+    assert _ids(page) == [2, 0]
+
+
+def test_text_search_combines_with_filters():
+    ring = LogRing(100)
+    for i in range(6):
+        ring.append(_entry(i, "a" if i < 3 else "b"))
+    page, _ = ring.query(text="ENTRY 4", event="b")
+    assert _ids(page) == [4]
+    assert ring.query(text="entry 4", event="a")[0] == []
+
+
+def test_evicted_entries_leave_the_indexes():
+    ring = LogRing(4)
+    for i in range(3):
+        ring.append(_entry(i, "old"))
+    for i in range(3, 8):
+        ring.append(_entry(i, "new"))
+
+    assert len(ring) == 4
+    assert ring.query(event="old") == ([], None)
+    assert "old" not in ring._index["event"]
+    assert list(ring._index["event"]["new"]) == [4, 5, 6, 7]
+    page, cursor = ring.query(limit=2)
+    assert _ids(page) == [7, 6]
+    page, cursor = ring.query(limit=2, before=cursor)
+    # the oldest live entry is the last page: no cursor pointing into evicted ids
+    assert _ids(page) == [5, 4] and cursor is None
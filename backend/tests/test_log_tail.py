@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+from backend.app.api.admin import admin_logs_tail
+from backend.app.core.log_stream import LogBroker, compile_log_filter
+
+
+def test_subscriber_gets_matching_entries_published_from_other_threads():
+    async def run():
+        broker = LogBroker()
+        sub = broker.subscribe(compile_log_filter(event="order.paid"), maxsize=2)
+        assert len(broker) == 1
+
+        def publish():
+            for i in range(4):
+                broker.publish({"id": i, "event": "order.paid" if i != 1 else "user.login", "message": ""})
+
+        thread = threading.Thread(target=publish)
+        thread.start()
+        thread.join()
+        assert [e["id"] for e in await sub.get(timeout=1.0)] == [0, 2]
+        # the queue was full when entry 3 arrived
+        assert sub.dropped == 1
+
+        broker.unsubscribe(sub)
+        assert len(broker) == 0
+        broker.publish({"id": 4, "event": "order.paid", "message": ""})
+        assert await sub.get(timeout=0.01) == []
+
+    asyncio.run(run())
+
+
+class _Request:
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+def _tail(request):
+    return admin_logs_tail(request, event=None, actor_id=None, target=None, extras=None, level=None, logger=None,
+                           request_id=None, backfill=0, _user_id=1)
+
+
+def test_tail_unsubscribes_when_the_client_disconnects():
+    from backend.app.core.log_stream import LOG_BROKER
+
+    async def run():
+        before = len(LOG_BROKER)
+        request = _Request()
+        body = (await _tail(request)).body_iterator
+        assert await body.__anext__() == ": connected\n\n"
+        assert len(LOG_BROKER) == before + 1
+        request.disconnected = True
+        assert [chunk async for chunk in body] == []
+        assert len(LOG_BROKER) == before
+
+        # a response closed mid-stream (e.g. the server cancelling it) also unsubscribes
+        body = (await _tail(_Request())).body_iterator
+        await body.__anext__()
+        assert len(LOG_BROKER) == before + 1
+        await body.aclose()
+        assert len(LOG_BROKER) == before
+
+    asyncio.run(run())
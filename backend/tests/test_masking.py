@@ -0,0 +1,52 @@
+import re
+
+import pytest
+
+from backend.app.core import logger
+from backend.app.core.logger import MASK_PATTERNS, _mask_pii
+
+SAMPLES = [
+    "GET /products 200 12ms",
+    "order 1234567 paid",  # 7 digits: below the phone threshold
+    "login ok for bob@example.com",
+    "call +1 (555) 123-4567 or 555.123.4567",
+    "ids 1 2 3 4 5 6 7 8",
+    "mail a@b.io, then b@c.org; phone 0612345678",
+    "@ alone and 20260101 as a date",
+]
+
+
+def _slow(message: str) -> str:
+    for pattern, repl in MASK_PATTERNS:
+        message = pattern.sub(repl, message)
+    return message
+
+
+@pytest.mark.parametrize("message", SAMPLES)
+def test_fast_path_matches_running_every_pattern(message):
+    assert _mask_pii(message) == _slow(message)
+
+
+def test_masks_emails_and_phone_numbers():
+    assert _mask_pii("bob@example.com called 555-123-4567") == "***@*** called ***"
+
+
+class _Spy:
+    def __init__(self, pattern: re.Pattern):
+        self.pattern = pattern
+        self.calls = 0
+
+    def sub(self, repl, message):
+        self.calls += 1
+        return self.pattern.sub(repl, message)
+
+
+def test_regexes_are_skipped_when_the_preconditions_fail(monkeypatch):
+    spies = [(_Spy(p), r) for p, r in MASK_PATTERNS]
+    monkeypatch.setattr(logger, "MASK_PATTERNS", spies)
+    assert _mask_pii("GET /orders/12 200") == "GET /orders/12 200"
+    assert [s.calls for s, _ in spies] == [0, 0]
+    _mask_pii("x@y.io")
+    assert [s.calls for s, _ in spies] == [1, 0]
+    _mask_pii("12345678")
+    assert [s.calls for s, _ in spies] == [1, 1]
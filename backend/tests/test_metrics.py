@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+
+from backend.app.core.metrics import MetricsRegistry
+
+
+def _registry(path) -> MetricsRegistry:
+    reg = MetricsRegistry(multiproc_dir=str(path))
+    reg.counter("jobs_total", "Jobs", ("kind",))
+    reg.gauge("busy", "Busy workers")
+    reg.summary("size_bytes", "Sizes")
+    reg.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    return reg
+
+
+def _worker_file(path, pid: int, reg: MetricsRegistry) -> None:
+    with open(os.path.join(path, f"metrics-{pid}.json"), "w", encoding="utf-8") as f:
+        json.dump({"pid": pid, "ts": 0, "metrics": reg.dump()}, f)
+
+
+def _record(reg: MetricsRegistry, jobs: int, busy: int, latency: float) -> None:
+    reg._metrics["jobs_total"].inc("a", amount=jobs)
+    reg._metrics["busy"].set(value=busy)
+    reg._metrics["size_bytes"].observe(value=100)
+    reg._metrics["latency_seconds"].observe(value=latency)
+
+
+def test_render_merges_the_files_of_other_workers(tmp_path):
+    own = _registry(tmp_path)
+    _record(own, jobs=1, busy=1, latency=0.05)
+
+    live = _registry(tmp_path)
+    _record(live, jobs=2, busy=2, latency=0.5)
+    _worker_file(tmp_path, os.getppid(), live)
+
+    dead = _registry(tmp_path)
+    _record(dead, jobs=4, busy=4, latency=5.0)
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    _worker_file(tmp_path, exited.pid, dead)
+
+    lines = set(own.render().splitlines())
+    # counters, summaries and histograms keep what exited workers counted
+    assert 'jobs_total{kind="a"} 7' in lines
+    assert "size_bytes_sum 300" in lines and "size_bytes_count 3" in lines
+    assert {'latency_seconds_bucket{le="0.1"} 1', 'latency_seconds_bucket{le="1"} 2',
+            'latency_seconds_bucket{le="+Inf"} 3', "latency_seconds_count 3"} <= lines
+    # gauges only add up live workers
+    assert "busy 3" in lines
+
+
+def test_flush_writes_this_workers_file(tmp_path):
+    reg = _registry(tmp_path)
+    _record(reg, jobs=1, busy=1, latency=0.05)
+    reg.flush()
+    with open(tmp_path / f"metrics-{os.getpid()}.json", encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["pid"] == os.getpid()
+    assert data["metrics"]["jobs_total"] == [[["a"], 1.0]]
+    # its own file is not merged a second time
+    assert 'jobs_total{kind="a"} 1' in reg.render().splitlines()
@@ -0,0 +1,43 @@
+from sqlalchemy.orm import Session
+
+from backend.app.core.database import engine
+from backend.app.core.password_hashing import BCRYPT_ROUNDS, hash_cost, hash_password, verify_and_update
+from backend.app.models.user import User
+
+
+def test_verify_and_update_only_rehashes_other_costs():
+    current = hash_password("secret123")
+    assert hash_cost(current) == BCRYPT_ROUNDS
+    assert verify_and_update("secret123", current) == (True, None)
+
+    old = hash_password("secret123", rounds=BCRYPT_ROUNDS + 1)
+    valid, new_hash = verify_and_update("secret123", old)
+    assert valid and hash_cost(new_hash) == BCRYPT_ROUNDS
+    assert verify_and_update("secret123", new_hash) == (True, None)
+    assert verify_and_update("wrong-pass", old) == (False, None)
+    assert verify_and_update("secret123", "not-a-bcrypt-hash") == (False, None)
+
+
+def _stored_hash(email: str) -> str:
+    with Session(engine) as db:
+        return db.query(User.password_hash).filter(User.email == email).scalar()
+
+
+def test_login_upgrades_a_hash_with_an_outdated_cost(client):
+    email = "rehash@example.com"
+    assert client.post("/auth/register", json={"name": "Re", "email": email, "password": "secret123"}).status_code == 200
+    with Session(engine) as db:
+        db.query(User).filter(User.email == email).update(
+            {User.password_hash: hash_password("secret123", rounds=BCRYPT_ROUNDS + 1)}
+        )
+        db.commit()
+
+    assert client.post("/auth/login", data={"username": email, "password": "wrong-pass"}).status_code == 401
+    assert hash_cost(_stored_hash(email)) == BCRYPT_ROUNDS + 1
+
+    assert client.post("/auth/login", data={"username": email, "password": "secret123"}).status_code == 200
+    upgraded = _stored_hash(email)
+    assert hash_cost(upgraded) == BCRYPT_ROUNDS
+
+    assert client.post("/auth/login", data={"username": email, "password": "secret123"}).status_code == 200
+    assert _stored_hash(email) == upgraded
@@ -0,0 +1,28 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def user_headers(client, login):
+    r = client.post("/auth/register", json={"name": "Prof", "email": "profiled@example.com", "password": "secret123"})
+    assert r.status_code == 200, r.text
+    return login("profiled@example.com", "secret123")
+
+
+def test_x_profile_is_ignored_for_anonymous_and_non_admin_requests(client, user_headers):
+    assert "X-Profile-Id" not in client.get("/products", headers={"X-Profile": "1"}).headers
+    r = client.get("/products", headers={"X-Profile": "1", **user_headers})
+    assert r.status_code == 200 and "X-Profile-Id" not in r.headers
+    r = client.get("/products", headers={"X-Profile": "1", "Authorization": "Bearer not-a-token"})
+    assert r.status_code == 200 and "X-Profile-Id" not in r.headers
+
+
+def test_admin_can_capture_and_download_a_profile(client, admin_headers, user_headers):
+    r = client.get("/products", headers={"X-Profile": "1", "X-Request-ID": "profiled-request", **admin_headers})
+    assert r.headers["X-Profile-Id"] == "profiled-request"
+
+    assert "profiled-request" in [p["request_id"] for p in client.get("/admin/profiles", headers=admin_headers).json()]
+    r = client.get("/admin/profiles/profiled-request", params={"format": "json"}, headers=admin_headers)
+    assert r.status_code == 200 and r.json()["status"] == 200
+
+    assert client.get("/admin/profiles", headers=user_headers).status_code == 403
+    assert client.get("/admin/profiles/profiled-request", headers=user_headers).status_code == 403
@@ -0,0 +1,71 @@
+import itertools
+
+import pytest
+
+from backend.app.core.sql_stats import assert_query_budget
+
+_emails = (f"budget{i}@example.com" for i in itertools.count())
+
+
+@pytest.fixture
+def user_headers(client, login):
+    email = next(_emails)
+    r = client.post("/auth/register", json={"name": "Budget", "email": email, "password": "secret123", "age": 30})
+    assert r.status_code == 200, r.text
+    return login(email, "secret123")
+
+
+def _product_ids(client, n: int) -> list[int]:
+    ids = [p["id"] for p in client.get("/products").json()][:n]
+    assert len(ids) == n
+    return ids
+
+
+def _queries(response) -> int:
+    assert response.status_code in (200, 201), response.text
+    return int(response.headers["X-DB-Queries"])
+
+
+def _order(client, headers, n: int):
+    return client.post("/orders", json={"items": [{"product_id": p, "quantity": 1} for p in _product_ids(client, n)]},
+                       headers=headers)
+
+
+def test_get_cart_budget(client, user_headers):
+    ids = _product_ids(client, 4)
+    client.post("/cart", json={"product_id": ids[0], "quantity": 1}, headers=user_headers)
+    one = _queries(client.get("/cart", headers=user_headers))
+    for pid in ids[1:]:
+        client.post("/cart", json={"product_id": pid, "quantity": 1}, headers=user_headers)
+    r = client.get("/cart", headers=user_headers)
+    assert len(r.json()["items"]) == 4
+    assert _queries(r) == one
+    assert_query_budget(r, max_queries=1)
+
+
+def test_create_order_budget(client, user_headers):
+    one = _queries(_order(client, user_headers, 1))
+    r = _order(client, user_headers, 4)
+    assert len(r.json()["items"]) == 4
+    assert _queries(r) == one
+    assert_query_budget(r, max_queries=6)
+
+
+def test_list_orders_budget(client, user_headers):
+    _order(client, user_headers, 2)
+    one = _queries(client.get("/orders", headers=user_headers))
+    for _ in range(3):
+        _order(client, user_headers, 2)
+    r = client.get("/orders", headers=user_headers)
+    assert [len(o["items"]) for o in r.json()] == [2, 2, 2, 2]
+    assert _queries(r) == one
+    assert_query_budget(r, max_queries=2)
+
+
+def test_recent_orders_budget(client, admin_headers, user_headers):
+    for _ in range(8):
+        _order(client, user_headers, 1)
+    r = client.get("/admin/recent-orders", headers=admin_headers)
+    assert len(r.json()) == 8
+    assert all(o["customer"] != "Guest" for o in r.json())
+    assert_query_budget(r, max_queries=2)
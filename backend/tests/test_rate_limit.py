@@ -0,0 +1,51 @@
+import pytest
+
+from backend.app.core import rate_limit
+from backend.app.core.rate_limit import MemoryBucketStore, Rule, SqliteBucketStore, parse_rules
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    return MemoryBucketStore() if request.param == "memory" else SqliteBucketStore(str(tmp_path / "rate.db"))
+
+
+def test_bucket_refills_at_capacity_per_period(store):
+    rule = Rule("ip", capacity=2, period=10.0)  # one token every 5 s
+    first, second, third = (store.take("k", rule, 100.0) for _ in range(3))
+    assert (first.allowed, first.remaining) == (True, 1)
+    assert (second.allowed, second.remaining, second.reset) == (True, 0, 10.0)
+    assert not third.allowed and third.retry_after == 5.0
+
+    assert not store.take("k", rule, 104.0).allowed
+    refilled = store.take("k", rule, 105.0)
+    assert refilled.allowed and refilled.remaining == 0
+    # after a full period the bucket is full again, never above capacity
+    assert store.take("k", rule, 1000.0).remaining == 1
+    # buckets are per key
+    assert store.take("other", rule, 105.0).remaining == 1
+
+
+def test_429_carries_retry_after_and_ratelimit_headers(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "BUCKETS", MemoryBucketStore())
+    monkeypatch.setitem(rate_limit.RULES, "forgot_password", parse_rules("ip=5/600,email=2/600"))
+
+    def ask(email="nobody@example.com"):
+        return client.post("/auth/forgot-password", json={"email": email})
+
+    r = ask()
+    assert r.status_code == 200
+    # the tightest bucket (email) is reported
+    assert (r.headers["RateLimit-Limit"], r.headers["RateLimit-Remaining"]) == ("2", "1")
+    assert ask().status_code == 200
+
+    r = ask()
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == "300"
+    assert (r.headers["RateLimit-Limit"], r.headers["RateLimit-Remaining"]) == ("2", "0")
+    assert int(r.headers["RateLimit-Reset"]) > 0
+
+    # other addresses still have tokens until the per-IP bucket (5, one spent by the 429 above) runs dry
+    assert ask("someone@example.com").status_code == 200
+    assert ask("else@example.com").status_code == 200
+    assert ask("third@example.com").status_code == 429
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from backend.app.core.database import Base, engine
+from backend.app.core.reset_tokens import consume_reset_token, issue_reset_token, revoke_reset_tokens
+from backend.app.models.password_reset_token import PasswordResetToken
+from backend.app.models.user import User
+
+
+def _user(db: Session, email: str, **kw) -> User:
+    user = User(name="t", email=email, password_hash="x", **kw)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_token_of_deleted_user_does_not_reset_reused_id():
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        a = _user(db, "a@x.io")
+        token = issue_reset_token(db, a.id)
+        revoke_reset_tokens(db, a.id)
+        db.delete(a)
+        db.commit()
+        b = _user(db, "b@x.io")
+        assert consume_reset_token(db, token) is None
+
+
+def test_token_older_than_its_user_is_rejected():
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        # a stale row left behind for an id that now belongs to a newer account
+        user = _user(db, "c@x.io", created_at=datetime.now(timezone.utc) + timedelta(minutes=5))
+        user_id = user.id
+        token = issue_reset_token(db, user_id)
+        assert consume_reset_token(db, token) is None
+        db.rollback()  # what the reset endpoint's session does when it raises the 400
+    with Session(engine) as db:
+        assert db.query(PasswordResetToken).filter(PasswordResetToken.user_id == user_id).count() == 0
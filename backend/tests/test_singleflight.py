@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from backend.app.core.singleflight import SingleFlightMiddleware
+
+
+class _Backend:
+    """ASGI app that holds every request until released and counts executions."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        await self.release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"n": %d}' % self.calls, "more_body": False})
+
+
+def _scope(method="GET", path="/products", query=b"", headers=()):
+    return {"type": "http", "method": method, "path": path, "query_string": query, "headers": list(headers)}
+
+
+async def _request(app, scope):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def _run(scopes) -> tuple[int, list]:
+    async def run():
+        backend = _Backend()
+        app = SingleFlightMiddleware(backend, prefixes=("/products",))
+        tasks = [asyncio.create_task(_request(app, s)) for s in scopes]
+        await asyncio.sleep(0.01)
+        backend.release.set()
+        return backend.calls, await asyncio.gather(*tasks)
+
+    return asyncio.run(run())
+
+
+def test_identical_anonymous_gets_share_one_execution():
+    calls, responses = _run([_scope(query=b"a=1&b=2"), _scope(query=b"b=2&a=1"), _scope(query=b"b=2&a=1")])
+    assert calls == 1
+    assert responses == [(200, b'{"n": 1}')] * 3
+
+
+@pytest.mark.parametrize("scope", [
+    _scope(headers=[(b"authorization", b"Bearer t")]),
+    _scope(headers=[(b"cookie", b"session=1")]),
+    _scope(method="POST"),
+    _scope(path="/cart"),
+])
+def test_only_anonymous_gets_under_the_prefixes_are_coalesced(scope):
+    calls, responses = _run([scope, dict(scope), dict(scope)])
+    assert calls == 3
+    assert sorted(body for _, body in responses) == [b'{"n": 3}'] * 3
+
+
+def test_different_queries_run_separately():
+    calls, _ = _run([_scope(query=b"page=1"), _scope(query=b"page=2")])
+    assert calls == 2
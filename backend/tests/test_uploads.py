@@ -0,0 +1,69 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from backend.app.core import uploads
+from backend.app.core.uploads import receive_upload
+
+BOUNDARY = b"testboundary"
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 8
+CHUNK = 64 * 1024
+
+
+def _multipart(payload: bytes) -> bytes:
+    return (
+        b"--" + BOUNDARY + b"\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="a.png"\r\n'
+        b"Content-Type: image/png\r\n\r\n" + payload + b"\r\n--" + BOUNDARY + b"--\r\n"
+    )
+
+
+def _upload(body: bytes, max_size: int, content_length: bool = False):
+    """Run receive_upload on a body sent in CHUNK pieces; returns (result or exception, chunks read)."""
+    chunks = [body[i:i + CHUNK] for i in range(0, len(body), CHUNK)]
+    reads = 0
+
+    async def receive():
+        nonlocal reads
+        reads += 1
+        return {"type": "http.request", "body": chunks[reads - 1], "more_body": reads < len(chunks)}
+
+    headers = [(b"content-type", b"multipart/form-data; boundary=" + BOUNDARY)]
+    if content_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+    request = Request({"type": "http", "method": "POST", "path": "/upload/avatar", "headers": headers}, receive)
+    try:
+        result = asyncio.run(receive_upload(request, max_size, {"image/png"}))
+    except HTTPException as e:
+        result = e
+    return result, reads, len(chunks)
+
+
+def _leftovers() -> list[str]:
+    return [name for name in os.listdir(uploads.UPLOAD_DIR) if name.startswith(".upload-")]
+
+
+def test_oversized_stream_is_rejected_before_it_is_fully_read():
+    result, reads, total = _upload(_multipart(PNG + b"\0" * (2 * 1024 * 1024)), max_size=256 * 1024)
+    assert isinstance(result, HTTPException) and result.status_code == 413
+    assert reads <= 256 * 1024 // CHUNK + 2 < total
+    assert _leftovers() == []
+
+
+def test_declared_length_over_the_limit_is_rejected_without_reading():
+    result, reads, _ = _upload(_multipart(PNG + b"\0" * (2 * 1024 * 1024)), max_size=256 * 1024, content_length=True)
+    assert isinstance(result, HTTPException) and result.status_code == 413
+    assert reads == 0
+
+
+@pytest.mark.parametrize("extra", [0, 300 * 1024])
+def test_upload_within_the_limit_is_stored(extra):
+    payload = PNG + b"\1" * extra
+    result, _, _ = _upload(_multipart(payload), max_size=512 * 1024)
+    assert result.size == len(payload) and result.content_type == "image/png"
+    with open(os.path.join(uploads.UPLOAD_DIR, result.filename), "rb") as f:
+        assert f.read() == payload
+    assert _leftovers() == []
@@ -0,0 +1,46 @@
+from backend.app.core.database import engine
+
+
+def _register(client, name: str, email: str) -> None:
+    r = client.post("/auth/register", json={"name": name, "email": email, "password": "secret123", "age": 30})
+    assert r.status_code == 200, r.text
+
+
+def test_directory_prefix_search_ignores_case(client, admin_headers):
+    _register(client, "Bob Listing", "Bob.Listing@example.com")
+    for q in ["bob l", "BOB L", "bob.listing@", "Bob.L"]:
+        r = client.get("/admin/users", params={"q": q}, headers=admin_headers)
+        assert r.status_code == 200
+        assert [u["name"] for u in r.json()["items"]] == ["Bob Listing"], q
+    for q in ["\U0010ffff", "b\U0010ffff", "x@"]:
+        assert client.get("/admin/users", params={"q": q}, headers=admin_headers).status_code == 200
+
+
+def test_directory_search_uses_the_nocase_indexes(client):
+    from backend.app.api.admin import _prefix_range
+    from backend.app.models.user import User
+    from sqlalchemy import select
+
+    stmt = select(User.id).where(_prefix_range(User.email, "bob") | _prefix_range(User.name, "bob"))
+    compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        plan = " ".join(r[3] for r in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}"))
+    assert "ix_users_name_nocase" in plan and "ix_users_email_nocase" in plan
+
+
+def test_user_lists_are_paged_by_cursor_without_password_hashes(client, admin_headers):
+    for i in range(3):
+        _register(client, f"Pager {i}", f"pager{i}@example.com")
+    for path in ["/admin/users-full", "/users"]:
+        total = client.get(path, params={"limit": 1000}, headers=admin_headers).json()
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"after_id": cursor} if cursor else {})}
+            r = client.get(path, params=params, headers=admin_headers)
+            assert r.status_code == 200
+            seen += r.json()
+            cursor = r.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        assert [u["id"] for u in seen] == [u["id"] for u in total]
+        assert all("password_hash" not in u for u in seen)
@@ -1,36 +1,48 @@
 "use client"
 
-import { useEffect, useState } from "react"
+import { useCallback, useEffect, useState } from "react"
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table"
 import { Badge } from "@/components/ui/badge"
+import { Button } from "@/components/ui/button"
+import { Input } from "@/components/ui/input"
 import { AdminApi } from "@/lib/api"
 
 export function AdminUsers() {
   const [users, setUsers] = useState<any[]>([])
+  const [total, setTotal] = useState<number | null>(null)
+  const [cursor, setCursor] = useState<number | null>(null)
+  const [query, setQuery] = useState("")
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
 
-  useEffect(() => {
-    ;(async () => {
-      try {
-        const list = await AdminApi.usersFull()
-        setUsers(list || [])
-      } catch (e: any) {
-        setError(e.message || "Failed to load users")
-      } finally {
-        setLoading(false)
-      }
-    })()
+  const load = useCallback(async (q: string, afterId: number | null) => {
+    setLoading(true)
+    try {
+      const page = await AdminApi.users({ q, after_id: afterId, with_count: afterId === null })
+      setUsers((prev) => (afterId === null ? page.items : [...prev, ...page.items]))
+      setCursor(page.next_cursor ?? null)
+      if (afterId === null) setTotal(page.total ?? null)
+      setError(null)
+    } catch (e: any) {
+      setError(e.message || "Failed to load users")
+    } finally {
+      setLoading(false)
+    }
   }, [])
 
-  if (loading) return <div className="text-muted-foreground">Loading users…</div>
+  useEffect(() => {
+    const t = setTimeout(() => load(query.trim(), null), 250)
+    return () => clearTimeout(t)
+  }, [query, load])
+
   if (error) return <div className="text-destructive">{error}</div>
 
   return (
     <Card className="bg-card/50 backdrop-blur border-border/50">
-      <CardHeader>
-        <CardTitle>Users ({users.length})</CardTitle>
+      <CardHeader className="flex flex-row items-center justify-between gap-4">
+        <CardTitle>Users ({total ?? users.length})</CardTitle>
+        <Input className="max-w-xs" placeholder="Search email or name…" value={query} onChange={(e) => setQuery(e.target.value)} />
       </CardHeader>
       <CardContent>
         <Table>
@@ -55,6 +67,12 @@ export function AdminUsers() {
             ))}
           </TableBody>
         </Table>
+        {loading && <div className="text-muted-foreground mt-4">Loading users…</div>}
+        {!loading && cursor !== null && (
+          <div className="flex justify-center mt-4">
+            <Button variant="outline" onClick={() => load(query.trim(), cursor)}>Load more</Button>
+          </div>
+        )}
       </CardContent>
     </Card>
   )
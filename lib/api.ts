@@ -46,7 +46,7 @@ async function maybeRefreshToken() {
   touchActivity()
 }
 
-export async function apiFetch<T = any>(path: string, opts: RequestInit = {}, auth = false): Promise<T> {
+async function apiResponse(path: string, opts: RequestInit = {}, auth = false): Promise<Response> {
   await maybeRefreshToken()
   const headers = new Headers(opts.headers || {})
   if (!headers.has("Content-Type") && !(opts.body instanceof FormData)) {
@@ -66,10 +66,28 @@ export async function apiFetch<T = any>(path: string, opts: RequestInit = {}, au
     } catch {}
     throw new Error(message)
   }
+  return res
+}
+
+export async function apiFetch<T = any>(path: string, opts: RequestInit = {}, auth = false): Promise<T> {
+  const res = await apiResponse(path, opts, auth)
   if (res.status === 204) return undefined as T
   return (await res.json()) as T
 }
 
+// GET every page of a keyset-paginated list: X-Next-Cursor is passed back as after_id
+export async function apiFetchAll<T = any>(path: string, auth = false): Promise<T[]> {
+  const items: T[] = []
+  let cursor: string | null = null
+  do {
+    const sep = path.includes("?") ? "&" : "?"
+    const res = await apiResponse(cursor ? `${path}${sep}after_id=${encodeURIComponent(cursor)}` : path, {}, auth)
+    items.push(...((await res.json()) as T[]))
+    cursor = res.headers.get("X-Next-Cursor")
+  } while (cursor)
+  return items
+}
+
 export async function loginRequest(email: string, password: string) {
   const form = new FormData()
   form.set("username", email)
@@ -170,7 +188,15 @@ export const AdminApi = {
     return apiFetch(`/admin/logs?${params.toString()}`, {}, true)
   },
   clearLogs: () => apiFetch(`/admin/logs`, { method: "DELETE" }, true),
-  usersFull: () => apiFetch("/admin/users-full", {}, true),
+  usersFull: () => apiFetchAll("/admin/users-full?limit=1000", true),
+  // keyset-paginated directory; pass next_cursor back as after_id
+  users: (opts?: { q?: string; after_id?: number | null; limit?: number; with_count?: boolean }) => {
+    const params = new URLSearchParams({ limit: String(opts?.limit ?? 50) })
+    if (opts?.q) params.set("q", opts.q)
+    if (opts?.after_id) params.set("after_id", String(opts.after_id))
+    if (opts?.with_count) params.set("with_count", "true")
+    return apiFetch(`/admin/users?${params.toString()}`, {}, true)
+  },
   promote: (email: string) => apiFetch(`/admin/promote?email=${encodeURIComponent(email)}`, { method: "POST" }, true),
   demote: (email: string) => apiFetch(`/admin/demote?email=${encodeURIComponent(email)}`, { method: "POST" }, true),
   resetPassword: (email: string, newPassword: string) =>
@@ -212,5 +238,5 @@ export const AuthApi = {
 }
 
 export const UsersApi = {
-  list: () => apiFetch("/users", {}, true),
+  list: () => apiFetchAll("/users?limit=1000", true),
 }